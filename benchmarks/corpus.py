@@ -0,0 +1,185 @@
+"""
+Corpus of recorded or synthetic messages, stored as JSONL.
+
+Each line is a message::
+
+    {
+      "chat_id": -100123,
+      "message_id": 42,
+      "sender": {"id": 1, "username": "ads_bot", "is_bot": true},
+      "text": "join t.me/ads_bot",
+      "entities": [{"type": "url", "offset": 5, "length": 12}],
+      "reply_markup": [[{"text": "Go", "url": "https://t.me/ads_bot"}]],
+      "reply": false
+    }
+
+``entities`` may also contain ``url`` (for text links) and ``user``
+(for text mentions, in the same format as ``sender``).
+
+Usage: ``python -m benchmarks.corpus out.jsonl [--count 100000] [--ads 0.3]``
+"""
+
+import argparse
+import json
+import random
+from typing import Any, Generator, Iterable
+
+from pyrogram.enums import ChatType, MessageEntityType
+from pyrogram.types import (
+    Chat,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Message,
+    MessageEntity,
+    User,
+)
+
+_WORDS = (
+    "hello everyone the weather today is great let us meet tomorrow at noon "
+    "привет всем как дела отличная погода сегодня встретимся завтра в обед"
+).split()
+_EMOJI = ("😀", "🔥", "👍", "🎉")
+_USERNAMES = ("alice", "bob", "news_channel", "helper_bot", "promo_bot", "dealsbot")
+
+
+def _make_user(data: dict[str, Any]) -> User:
+    optional = {k: data[k] for k in ("is_bot", "username") if k in data}
+    return User(id=data["id"], **optional)
+
+
+def _make_entity(data: dict[str, Any]) -> MessageEntity:
+    optional: dict[str, Any] = {}
+
+    if "url" in data:
+        optional["url"] = data["url"]
+    if "user" in data:
+        optional["user"] = _make_user(data["user"])
+
+    return MessageEntity(
+        type=MessageEntityType[data["type"].upper()],
+        offset=data["offset"],
+        length=data["length"],
+        **optional,
+    )
+
+
+def to_message(data: dict[str, Any]) -> Message:
+    """
+    Builds the pyrogram message from the corpus record.
+    """
+    chat_id = data.get("chat_id", -1)
+    # Only the fields present in the record are passed.
+    optional: dict[str, Any] = {}
+
+    if (text := data.get("text")) is not None:
+        optional["text"] = text
+    if entities := [_make_entity(e) for e in data.get("entities", ())]:
+        optional["entities"] = entities
+    if markup := data.get("reply_markup"):
+        optional["reply_markup"] = InlineKeyboardMarkup(
+            [[InlineKeyboardButton(**button) for button in line] for line in markup]
+        )
+    if data.get("reply"):
+        # Only the presence of the replied message matters for scanning.
+        optional["reply_to_message"] = Message(id=0)
+
+    return Message(
+        id=data.get("message_id", 1),
+        chat=Chat(id=chat_id, type=ChatType.SUPERGROUP),
+        from_user=_make_user(data["sender"]),
+        **optional,
+    )
+
+
+def load(path: str) -> Generator[dict[str, Any], None, None]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line := line.strip():
+                yield json.loads(line)
+
+
+def dump(path: str, records: Iterable[dict[str, Any]]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _utf16_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def generate(
+    count: int, ads: float, seed: int = 0
+) -> Generator[dict[str, Any], None, None]:
+    """
+    Generates synthetic messages from bots.
+    About ``ads`` of them contain advertising links, mentions or buttons.
+    """
+    rnd = random.Random(seed)
+
+    for i in range(count):
+        parts: list[str] = []
+        entities: list[dict[str, Any]] = []
+        offset = 0
+
+        def add(text: str, entity: dict[str, Any] | None = None) -> None:
+            nonlocal offset
+            if entity is not None:
+                entities.append(
+                    {"offset": offset, "length": _utf16_length(text), **entity}
+                )
+            parts.append(text)
+            offset += _utf16_length(text) + 1
+
+        is_ad = rnd.random() < ads
+
+        for _ in range(rnd.randint(5, 60)):
+            roll = rnd.random()
+            username = rnd.choice(_USERNAMES)
+
+            if roll < 0.05:
+                add(rnd.choice(_EMOJI))
+            elif roll < 0.08:
+                add(f"@{username}", {"type": "mention"})
+            elif roll < 0.10:
+                add(f"t.me/{username}", {"type": "url"})
+            elif roll < 0.12:
+                add(
+                    rnd.choice(_WORDS),
+                    {"type": "text_link", "url": f"https://t.me/{username}"},
+                )
+            elif roll < 0.14:
+                add(rnd.choice(_WORDS), {"type": "bold"})
+            else:
+                add(rnd.choice(_WORDS))
+
+        markup = None
+
+        if is_ad:
+            add("https://example.com/promo", {"type": "url"})
+            markup = [[{"text": "Go", "url": "https://t.me/deals_bot"}]]
+
+        yield {
+            "chat_id": -100 - i % 50,
+            "message_id": i + 1,
+            "sender": {
+                "id": 1 + i % 20,
+                "username": f"sender{i % 20}_bot",
+                "is_bot": True,
+            },
+            "text": " ".join(parts),
+            "entities": entities,
+            "reply_markup": markup,
+            "reply": rnd.random() < 0.2,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--ads", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    dump(args.out, generate(args.count, args.ads, args.seed))
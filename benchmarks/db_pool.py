@@ -0,0 +1,91 @@
+"""
+Measures how query latency scales with the number of concurrent handlers,
+using a single connection and the connection pool.
+
+Requires a running database configured via the usual environment variables.
+Usage: ``python -m benchmarks.db_pool [--queries 200] [--delay 0.002]``
+"""
+
+import argparse
+import asyncio
+from statistics import quantiles
+from time import perf_counter
+
+import peewee_async
+
+from safebot.database.client import connection
+from safebot.database.models import Chat
+from safebot.settings import config
+
+CONCURRENCY_LEVELS = (1, 4, 16, 64)
+
+
+def _make_managers() -> dict[str, peewee_async.Manager]:
+    params = dict(database=connection.database, **connection.connect_params)
+
+    return {
+        "single": peewee_async.Manager(peewee_async.PostgresqlDatabase(**params)),
+        "pool": peewee_async.Manager(
+            peewee_async.PooledPostgresqlDatabase(
+                min_connections=config.postgres_pool_min,
+                max_connections=config.postgres_pool_max,
+                **params,
+            )
+        ),
+    }
+
+
+async def _handler(
+    manager: peewee_async.Manager, queries: int, delay: float, latencies: list[float]
+) -> None:
+    """
+    Imitates a handler that performs queries one after another.
+    ``pg_sleep`` emulates the server-side cost of a real query.
+    """
+    for _ in range(queries):
+        start = perf_counter()
+        await manager.execute(Chat.raw("SELECT pg_sleep(%s)", delay))
+        latencies.append(perf_counter() - start)
+
+
+async def _measure(
+    manager: peewee_async.Manager, concurrency: int, queries: int, delay: float
+) -> tuple[float, float, float]:
+    """
+    :return: p50 and p99 latency (ms) and the total time (s).
+    """
+    latencies: list[float] = []
+    per_handler = max(queries // concurrency, 1)
+
+    start = perf_counter()
+    await asyncio.gather(
+        *(_handler(manager, per_handler, delay, latencies) for _ in range(concurrency))
+    )
+    total = perf_counter() - start
+
+    percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return percentiles[49] * 1000, percentiles[98] * 1000, total
+
+
+async def main(queries: int, delay: float) -> None:
+    managers = _make_managers()
+
+    print(f"{'backend':>8} {'handlers':>9} {'p50, ms':>9} {'p99, ms':>9} {'total, s':>9}")
+
+    for name, manager in managers.items():
+        await manager.connect()
+
+        for concurrency in CONCURRENCY_LEVELS:
+            p50, p99, total = await _measure(manager, concurrency, queries, delay)
+            print(f"{name:>8} {concurrency:>9} {p50:>9.2f} {p99:>9.2f} {total:>9.2f}")
+
+        await manager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.queries, args.delay))
@@ -0,0 +1,76 @@
+"""
+Measures how entity rewriting scales with the number of unsafe entities
+in a long caption.
+
+Usage: ``python -m benchmarks.filters [--repeat 50]``
+"""
+
+import argparse
+from time import perf_counter
+
+from pyrogram.enums import MessageEntityType
+from pyrogram.types import Message, MessageEntity
+
+from safebot.detect.filters import Filter
+from safebot.handlers import emitter
+
+ENTITY_COUNTS = (50, 100, 200, 400, 800)
+# Emoji take two UTF-16 code units, so the offsets mapping is always exercised.
+CHUNK = "😀 https://t.me/adsbot text "
+URL_OFFSET = 3
+URL_LENGTH = len("https://t.me/adsbot")
+CHUNK_LENGTH = len(CHUNK.encode("utf-16-le")) // 2
+
+
+def _make_message(entities: int) -> Message:
+    return Message(
+        id=1,
+        caption=CHUNK * entities,
+        caption_entities=[
+            MessageEntity(
+                type=MessageEntityType.URL,
+                offset=i * CHUNK_LENGTH + URL_OFFSET,
+                length=URL_LENGTH,
+            )
+            for i in range(entities)
+        ],
+    )
+
+
+def _measure(entities: int, repeat: int) -> float:
+    """
+    :return: Average time (ms) of rewriting a single message.
+    """
+    total = 0.0
+
+    for _ in range(repeat):
+        flt = Filter(_make_message(entities))
+
+        start = perf_counter()
+        for ent in list(flt.unsafe_entities):
+            flt.make_entity_safe(ent)
+        flt.apply()
+        total += perf_counter() - start
+
+    return total / repeat * 1000
+
+
+def main(repeat: int) -> None:
+    emitter.init()
+
+    print(f"{'entities':>9} {'length':>8} {'total, ms':>10} {'per entity, us':>15}")
+
+    for entities in ENTITY_COUNTS:
+        elapsed = _measure(entities, repeat)
+        print(
+            f"{entities:>9} {entities * CHUNK_LENGTH:>8} {elapsed:>10.3f} "
+            f"{elapsed / entities * 1000:>15.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    main(args.repeat)
@@ -0,0 +1,126 @@
+"""
+CPU time spent on incoming new messages, with and without the raw pre-screen.
+
+Synthetic group traffic is built as raw MTProto updates, where about ``bots`` of the
+messages come from bots. Without the pre-screen, every update is parsed into
+a ``Message``, as the dispatcher does. With it, only the candidates are parsed.
+
+Usage: ``python -m benchmarks.prescreen [--count 10000] [--bots 0.05]``
+"""
+
+import argparse
+import asyncio
+import random
+from time import process_time
+from typing import Any
+
+from pyrogram import Client, raw
+from pyrogram.types import Message
+
+from safebot.handlers.prescreen import is_candidate
+
+_Update = tuple[raw.types.UpdateNewChannelMessage, dict[int, Any], dict[int, Any]]
+
+_WORDS = "hello everyone the weather today is great let us meet tomorrow".split()
+
+
+def generate(count: int, bots: float, seed: int = 0) -> list[_Update]:
+    rnd = random.Random(seed)
+    updates: list[_Update] = []
+
+    for i in range(count):
+        is_bot = rnd.random() < bots
+        user_id = 1000 + i % 200
+        channel_id = 100 + i % 50
+
+        text = " ".join(rnd.choices(_WORDS, k=rnd.randint(3, 30)))
+        entities: list[raw.base.MessageEntity] = []
+
+        # Humans post links too, but the pre-screen skips them anyway.
+        if rnd.random() < 0.2:
+            entities.append(raw.types.MessageEntityUrl(offset=len(text) + 1, length=12))
+            text += " t.me/channel"
+
+        message = raw.types.Message(
+            id=i + 1,
+            peer_id=raw.types.PeerChannel(channel_id=channel_id),
+            from_id=raw.types.PeerUser(user_id=user_id),
+            date=1700000000 + i,
+            message=text,
+            entities=entities,
+        )
+        users = {
+            user_id: raw.types.User(
+                id=user_id,
+                bot=is_bot,
+                access_hash=user_id,
+                first_name=f"user{user_id}",
+                username=f"user{user_id}_bot" if is_bot else f"user{user_id}",
+                # Vectors are deserialized as empty lists, when not set
+                restriction_reason=[],
+                usernames=[],
+            )
+        }
+        chats = {
+            channel_id: raw.types.Channel(
+                id=channel_id,
+                title=f"chat{channel_id}",
+                photo=raw.types.ChatPhotoEmpty(),
+                date=1700000000,
+                megagroup=True,
+                access_hash=channel_id,
+                restriction_reason=[],
+                usernames=[],
+            )
+        }
+        updates.append(
+            (
+                raw.types.UpdateNewChannelMessage(message=message, pts=i, pts_count=1),
+                users,
+                chats,
+            )
+        )
+
+    return updates
+
+
+async def _parse_all(client: Client, updates: list[_Update], prescreen: bool) -> int:
+    parsed = 0
+
+    for update, users, chats in updates:
+        if prescreen and not is_candidate(update.message, users):
+            continue
+
+        await Message._parse(client, update.message, users, chats)
+        parsed += 1
+
+    return parsed
+
+
+async def main(count: int, bots: float) -> None:
+    client = Client("benchmark", api_id=1, api_hash="x", in_memory=True)
+    updates = generate(count, bots)
+    results: dict[bool, float] = {}
+
+    for prescreen in (False, True):
+        started = process_time()
+        parsed = await _parse_all(client, updates, prescreen)
+        results[prescreen] = elapsed = process_time() - started
+
+        per_10k = elapsed / count * 10_000
+        print(
+            f"prescreen={prescreen!s:5}  parsed {parsed:>7}  "
+            f"CPU {elapsed * 1000:8.1f}ms  ({per_10k * 1000:.1f}ms per 10k updates)"
+        )
+
+    saved = (results[False] - results[True]) / count * 10_000
+    print(f"CPU saved: {saved * 1000:.1f}ms per 10k updates")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--bots", type=float, default=0.05)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.count, args.bots))
@@ -0,0 +1,111 @@
+"""
+Replays the corpus (see ``benchmarks.corpus``) through the quick scan
+and reports throughput, per-message latency and memory allocations.
+
+Usage: ``python -m benchmarks.replay corpus.jsonl [--no-link-cache] [--batch 100]
+[--log-level DEBUG]``
+
+With ``--batch``, the messages are scanned in batches (see ``Reader.scan_batch``),
+and the latency is reported per batch.
+"""
+
+import argparse
+import tracemalloc
+from statistics import quantiles
+from time import perf_counter
+
+from pyrogram.types import Message
+
+from benchmarks import corpus
+from safebot.detect import link
+from safebot.detect.scan import Reader
+from safebot.handlers import emitter
+from safebot.logger import setup
+from safebot.lru import LRUCache
+
+
+def _scan(messages: list[Message]) -> tuple[list[float], int]:
+    """
+    :return: Latency of every scan (s) and the number of messages with adv.
+    """
+    latencies: list[float] = []
+    found = 0
+
+    for message in messages:
+        start = perf_counter()
+        found += Reader(message).quick_scan()
+        latencies.append(perf_counter() - start)
+
+    return latencies, found
+
+
+def _scan_batches(messages: list[Message], size: int) -> tuple[list[float], int]:
+    """
+    :return: Latency of every batch scan (s) and the number of messages with adv.
+    """
+    latencies: list[float] = []
+    found = 0
+
+    for i in range(0, len(messages), size):
+        start = perf_counter()
+        found += sum(r.unsafe for r in Reader.scan_batch(messages[i : i + size]))
+        latencies.append(perf_counter() - start)
+
+    return latencies, found
+
+
+def _allocations(messages: list[Message]) -> tuple[float, float]:
+    """
+    Replays the messages again under ``tracemalloc``.
+
+    :return: Peak traced memory (KiB) and traced memory per message (KiB).
+    """
+    tracemalloc.start()
+
+    for message in messages:
+        Reader(message).quick_scan()
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak / 1024, current / 1024 / len(messages)
+
+
+def main(path: str, link_cache: bool, batch: int, log_level: str) -> None:
+    setup(log_level)
+
+    emitter.init()
+    link.init()
+
+    if not link_cache:
+        link.verdicts = LRUCache(0)
+
+    # Messages are parsed twice, since the scan changes their entities.
+    records = list(corpus.load(path))
+    messages = [corpus.to_message(r) for r in records]
+
+    start = perf_counter()
+    latencies, found = _scan_batches(messages, batch) if batch else _scan(messages)
+    total = perf_counter() - start
+
+    percentiles = quantiles(latencies, n=100)
+    peak, per_message = _allocations([corpus.to_message(r) for r in records])
+
+    print(f"messages:      {len(messages)} ({found} with adv)")
+    print(f"throughput:    {len(messages) / total:.0f} msg/s")
+    print(f"latency p50:   {percentiles[49] * 1e6:.1f} us")
+    print(f"latency p99:   {percentiles[98] * 1e6:.1f} us")
+    print(f"memory peak:   {peak:.1f} KiB")
+    print(f"memory kept:   {per_message:.3f} KiB/msg")
+    print(f"link cache:    {link.verdicts}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("corpus")
+    parser.add_argument("--no-link-cache", dest="link_cache", action="store_false")
+    parser.add_argument("--batch", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    main(args.corpus, args.link_cache, args.batch, args.log_level)
@@ -0,0 +1,127 @@
+"""
+Size of the session file, time to open it and latency of peer lookups,
+with the default storage of pyrogram and the lean one (see ``LeanFileStorage``),
+after an account has seen ``peers`` users in ``chats`` moderated chats.
+
+Peers are stored by batches of 100, as they come with updates. The lean storage
+is pruned once, as it's done periodically. Lookups ask for the moderated chats
+and the recently seen users, which are kept by both storages.
+
+Usage: ``python -m benchmarks.sessions [--peers 200000] [--chats 1000]
+[--max-peers 50000] [--lookups 10000]``
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter
+
+from pyrogram.storage import FileStorage
+
+from safebot.session import LeanFileStorage
+
+# Peers received with a single update (users and chats of a page of messages).
+_BATCH = 100
+
+
+# ID, access hash, type, username and phone number of a peer.
+_Peer = tuple[int, int, str, str, str]
+
+
+def _chats(count: int) -> list[_Peer]:
+    return [(-1000000000000 - i, i, "supergroup", f"chat{i}", "") for i in range(count)]
+
+
+def _users(start: int, count: int) -> list[_Peer]:
+    return [(i, i, "user", f"user{i}", "") for i in range(start, start + count)]
+
+
+async def _fill(storage: FileStorage, peers: int, chats: int) -> None:
+    await storage.open()
+    await storage.update_peers(_chats(chats))
+
+    for start in range(1, peers + 1, _BATCH):
+        await storage.update_peers(_users(start, min(_BATCH, peers + 1 - start)))
+
+    if isinstance(storage, LeanFileStorage):
+        # Users are seen over time, a batch per second.
+        storage.conn.execute(
+            "UPDATE peers SET last_update_on = ? - (? - id) / ? WHERE id > 0",
+            (int(time.time()), peers, _BATCH),
+        )
+        storage.pinned = {peer[0] for peer in _chats(chats)}
+        storage.prune()
+
+    await storage.save()
+    await storage.close()
+
+
+async def _measure(
+    storage: FileStorage, peers: int, chats: int, kept: int, lookups: int
+) -> dict[str, float]:
+    await _fill(storage, peers, chats)
+
+    # Reopened, as on restart.
+    start = perf_counter()
+    await storage.open()
+    open_time = perf_counter() - start
+
+    rnd = random.Random(0)
+    candidates = [peer[0] for peer in _chats(chats)] + list(
+        range(peers - kept + chats + 1, peers + 1)
+    )
+    latencies: list[float] = []
+
+    for peer_id in rnd.choices(candidates, k=lookups):
+        start = perf_counter()
+        await storage.get_peer_by_id(peer_id)
+        latencies.append(perf_counter() - start)
+
+    count = storage.conn.execute("SELECT COUNT(*) FROM peers").fetchone()[0]
+    await storage.close()
+
+    percentiles = quantiles(latencies, n=100)
+    return {
+        "peers": count,
+        "size": os.path.getsize(storage.database) / 1024 / 1024,
+        "open": open_time * 1000,
+        "p50": percentiles[49] * 1e6,
+        "p99": percentiles[98] * 1e6,
+    }
+
+
+async def main(peers: int, chats: int, max_peers: int, lookups: int) -> None:
+    print(
+        f"{'storage':<8} {'peers':>8} {'file':>10} {'open':>10} "
+        f"{'lookup p50':>11} {'lookup p99':>11}"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        workdir = Path(directory)
+        storages = {
+            "file": FileStorage("file", workdir),
+            "lean": LeanFileStorage("lean", workdir, max_peers, max_age=7 * 24 * 3600),
+        }
+
+        for name, storage in storages.items():
+            r = await _measure(storage, peers, chats, max_peers - chats, lookups)
+            print(
+                f"{name:<8} {r['peers']:>8.0f} {r['size']:>7.1f} MB {r['open']:>7.1f} ms "
+                f"{r['p50']:>8.1f} us {r['p99']:>8.1f} us"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--peers", type=int, default=200_000)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--max-peers", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.peers, args.chats, args.max_peers, args.lookups))
@@ -0,0 +1,65 @@
+import json
+import random
+from time import time
+from typing import Any
+
+from safebot.logger import VERDICT_KEY, logger
+from safebot.settings import config
+
+
+class VerdictLog:
+    """
+    Structured log of scan verdicts (one JSON object per line), used to audit
+    false positives. Only a sample of the verdicts is written, separately for
+    the safe and unsafe ones, and nothing is serialized for the rest.
+
+    The file is written through a queue by a separate thread,
+    and rotated by size (see ``init``).
+    """
+
+    def __init__(self, sample_safe: float, sample_unsafe: float) -> None:
+        # Share of the verdicts written (0 disables, 1 writes all).
+        self.sample_safe: float = sample_safe
+        self.sample_unsafe: float = sample_unsafe
+        # Disabled until the file sink is added.
+        self.enabled: bool = False
+
+        self._logger = logger.bind(**{VERDICT_KEY: True})
+
+    def sampled(self, unsafe: bool) -> bool:
+        rate = self.sample_unsafe if unsafe else self.sample_safe
+        return self.enabled and rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def record(self, unsafe: bool, **fields: Any) -> None:
+        """
+        Writes the verdict, if it gets into the sample.
+
+        :param fields: Details of the verdict (chat, message, rule, timings).
+        """
+        if self.sampled(unsafe):
+            self._logger.info(
+                json.dumps(
+                    {"time": round(time(), 3), "unsafe": unsafe, **fields},
+                    ensure_ascii=False,
+                )
+            )
+
+
+verdicts = VerdictLog(config.verdict_log_sample_safe, config.verdict_log_sample_unsafe)
+
+
+def init() -> None:
+    if not config.verdict_log_path:
+        return
+
+    logger.add(
+        config.verdict_log_path,
+        format="{message}",
+        filter=lambda record: VERDICT_KEY in record["extra"],
+        enqueue=True,
+        rotation=config.verdict_log_rotation,
+        retention=config.verdict_log_retention,
+    )
+    verdicts.enabled = True
+
+    logger.info(f"Verdicts are logged to {config.verdict_log_path}")
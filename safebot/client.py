@@ -1,5 +1,6 @@
 from pyrogram import Client
 
+from safebot.session import LeanFileStorage
 from safebot.settings import config
 
 __client_name = "safebot"
@@ -7,10 +8,34 @@ __client_name = "safebot"
 if not config.production:
     __client_name += "_dev"
 
-client = Client(
-    name=__client_name,
-    api_id=config.api_id,
-    api_hash=config.api_hash,
-    phone_number=config.phone_number,
-    workdir="session",
-)
+
+def _make_client(name: str, phone_number: str) -> Client:
+    client = Client(
+        name=name,
+        api_id=config.api_id,
+        api_hash=config.api_hash,
+        phone_number=phone_number,
+        workdir="session",
+    )
+
+    if config.session_storage == "lean":
+        # The storage isn't opened until the client is started.
+        # Pyrogram annotates the attribute with the type of its first assignment
+        # (the in-memory storage), while any ``Storage`` is accepted.
+        client.storage = LeanFileStorage(  # type: ignore[assignment]
+            name, client.workdir, config.session_max_peers, config.session_peer_ttl
+        )
+
+    return client
+
+
+client = _make_client(__client_name, config.phone_number)
+# All the accounts, the main one is always first.
+# Additional sessions are named after the main one with their number.
+clients = [
+    client,
+    *(
+        _make_client(f"{__client_name}_{i}", phone_number)
+        for i, phone_number in enumerate(config.extra_phone_numbers, start=1)
+    ),
+]
@@ -0,0 +1,131 @@
+import asyncio
+from dataclasses import dataclass
+
+import aiopg
+import psycopg2
+
+from safebot import metrics
+from safebot.database.client import connection, manager
+from safebot.database.models import Chat
+from safebot.logger import logger
+from safebot.lru import LRUCache
+from safebot.settings import config
+
+# Channel through which Postgres notifies about changed chat rows.
+NOTIFY_CHANNEL = "chat_settings"
+# Delay before reconnecting the listener after a connection loss.
+LISTEN_RECONNECT_DELAY = 5.0
+
+# Columns cached as the chat settings. Changes of the other columns
+# (e.g. the last processed message) aren't published.
+_SETTINGS_COLUMNS = ", ".join(
+    f.column_name for f in (Chat.silent_mode, Chat.echo_mode, Chat.language)
+)
+
+# Trigger that publishes the Telegram chat ID of every row with changed settings.
+# Executed on each startup, so it is written to be idempotent.
+_NOTIFY_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION notify_chat_settings() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('{NOTIFY_CHANNEL}', OLD.t_id::text);
+    ELSE
+        PERFORM pg_notify('{NOTIFY_CHANNEL}', NEW.t_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER chat_settings_notify
+    AFTER INSERT OR UPDATE OF {_SETTINGS_COLUMNS} OR DELETE ON {Chat._meta.table_name}
+    FOR EACH ROW EXECUTE FUNCTION notify_chat_settings();
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class ChatSettings:
+    silent_mode: bool
+    echo_mode: bool
+    language: str | None
+
+    @classmethod
+    def from_model(cls, chat: Chat) -> "ChatSettings":
+        return cls(
+            silent_mode=chat.silent_mode, echo_mode=chat.echo_mode, language=chat.language
+        )
+
+
+chat_cache: LRUCache[int, ChatSettings] = LRUCache(
+    config.chat_cache_size, config.chat_cache_ttl
+)
+
+metrics.Gauge(
+    "safebot_chat_cache_hit_ratio", "Share of chat settings served from memory",
+    lambda: chat_cache.hit_rate,
+)  # fmt: skip
+
+_listener: asyncio.Task | None = None
+
+
+async def _load() -> None:
+    """
+    Fills the cache with every known chat (as much as its size allows).
+    """
+    query = Chat.select().order_by(Chat.id.desc()).limit(chat_cache.maxsize)
+
+    for chat in await manager.execute(query):
+        chat_cache.put(chat.t_id, ChatSettings.from_model(chat))
+
+
+async def _listen(subscribed: asyncio.Event) -> None:
+    """
+    Subscribes to row changes and drops the changed chats from the cache.
+    The connection is restored after any failure.
+    Since notifications may be missed while disconnected, the cache is cleared
+    on every reconnection.
+
+    :param subscribed: Set once the first subscription is established.
+    """
+    while True:
+        try:
+            async with aiopg.connect(
+                database=connection.database, **connection.connect_params
+            ) as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(_NOTIFY_TRIGGER_SQL)
+                    await cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+                if subscribed.is_set():
+                    chat_cache.clear()
+                else:
+                    subscribed.set()
+
+                logger.debug("Listening for chat settings changes")
+
+                while True:
+                    notify = await conn.notifies.get()
+                    chat_cache.invalidate(int(notify.payload))
+        except (psycopg2.Error, OSError) as e:
+            logger.warning(f"Chat settings listener disconnected: {e}")
+
+        await asyncio.sleep(LISTEN_RECONNECT_DELAY)
+
+
+async def init() -> None:
+    global _listener
+
+    # Subscribe before loading, so no change is lost in between.
+    subscribed = asyncio.Event()
+    _listener = asyncio.create_task(_listen(subscribed))
+
+    await subscribed.wait()
+    await _load()
+
+    logger.info(f"{len(chat_cache)} chats loaded to settings cache")
+
+
+async def close() -> None:
+    if _listener is not None:
+        _listener.cancel()
+
+    logger.info(f"Chat settings cache: {chat_cache}")
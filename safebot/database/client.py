@@ -2,11 +2,15 @@ import peewee_async
 
 from safebot.settings import config
 
-connection = peewee_async.PostgresqlDatabase(
+# Every concurrent handler acquires its own connection from the pool,
+# so a slow query doesn't serialize the rest.
+connection = peewee_async.PooledPostgresqlDatabase(
     host=config.postgres_host,
     port=config.postgres_port,
     user=config.postgres_user,
     password=config.postgres_password,
     database=config.postgres_db,
+    min_connections=config.postgres_pool_min,
+    max_connections=config.postgres_pool_max,
 )
 manager = peewee_async.Manager(connection)
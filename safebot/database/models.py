@@ -1,3 +1,5 @@
+from datetime import datetime
+
 import peewee
 
 from safebot.database.client import connection
@@ -13,3 +15,55 @@ class Chat(BaseModel):
     t_id = peewee.BigIntegerField(unique=True)
     # This mode means that every action or error will not be displayed in the chat
     silent_mode = peewee.BooleanField(default=False)
+    # When enabled, a reply containing advertising is re-sent without unsafe content
+    echo_mode = peewee.BooleanField(default=True)
+    # Language code of the messages sent to the chat (the default one if not set)
+    language = peewee.CharField(max_length=16, null=True)
+    # Number of the account acting in the chat (see "extra_phone_numbers" setting)
+    account = peewee.SmallIntegerField(null=True)
+    # ID of the last processed message, from which scanning continues after restart
+    last_message_id = peewee.BigIntegerField(null=True)
+
+
+class JoinRequest(BaseModel):
+    # Hash of the invitation link, the same for all requests to join the chat
+    invite_hash = peewee.CharField()
+    # Invitation link as it was sent
+    url = peewee.TextField()
+    # Telegram ID of the user who sent the link, and the account which received it
+    user_id = peewee.BigIntegerField()
+    account = peewee.SmallIntegerField(default=0)
+    created_at = peewee.DateTimeField(default=datetime.now)
+
+    class Meta:
+        # The same user sending the same link again doesn't create a new request
+        indexes = ((("invite_hash", "user_id"), True),)
+
+
+class JoinCooldown(BaseModel):
+    # Number of the account that isn't allowed to join chats until the time,
+    # since it received FloodWait
+    account = peewee.SmallIntegerField(unique=True)
+    until = peewee.DateTimeField()
+
+
+class ModerationEvent(BaseModel):
+    # Message found unsafe, and its sender
+    chat_id = peewee.BigIntegerField()
+    message_id = peewee.BigIntegerField()
+    sender_id = peewee.BigIntegerField(null=True)
+    # Scan that found the message: "quick", "deep" or "catchup"
+    stage = peewee.CharField(max_length=16)
+    # Name of the matched rule (see ``ScanResult.rule``)
+    rule = peewee.CharField(max_length=64, null=True)
+    # Whether the message has been deleted
+    deleted = peewee.BooleanField()
+    created_at = peewee.DateTimeField(default=datetime.now)
+
+    class Meta:
+        # The table is partitioned by day, so old events are dropped with partitions.
+        # Created on startup (see ``database.partitions``), since the generated
+        # migrations can't declare partitioning.
+        primary_key = False
+        table_settings = ["PARTITION BY RANGE (created_at)"]
+        indexes = ((("chat_id", "created_at"), False),)
@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+from typing import Type
+
+import aiopg
+from peewee import Model, Node
+
+from safebot.database.client import connection
+from safebot.logger import logger
+
+# Suffix of the partition names, the first day of the partition.
+_DAY_FORMAT = "%Y%m%d"
+
+_PARTITIONS_SQL = """
+SELECT child.relname FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname = %s
+"""
+
+
+def _sql(node: Node) -> str:
+    return connection.get_sql_context().sql(node).query()[0]
+
+
+class DailyPartitions:
+    """
+    Maintains the daily partitions of the table partitioned by range of time
+    (see ``table_settings`` of the model).
+
+    Partitions are created a few days ahead, and the ones older than ``retention``
+    days are dropped, which is much cheaper than deleting their rows.
+    Each statement is idempotent, so the maintenance may run on every startup
+    and by several instances.
+    """
+
+    def __init__(self, model: Type[Model], retention: int, ahead: int = 2) -> None:
+        self.model: Type[Model] = model
+        self.retention: int = retention
+        self.ahead: int = ahead
+
+    @property
+    def table(self) -> str:
+        return self.model._meta.table_name
+
+    def partition_name(self, day: date) -> str:
+        return f"{self.table}_{day.strftime(_DAY_FORMAT)}"
+
+    def create_sql(self, today: date) -> list[str]:
+        """
+        Statements creating the table, its indexes and the partitions
+        from today up to ``ahead`` days.
+        """
+        statements = [_sql(self.model._schema._create_table(safe=True))]
+        statements.extend(
+            _sql(index.safe(True)) for index in self.model._meta.fields_to_index()
+        )
+
+        for offset in range(self.ahead + 1):
+            day = today + timedelta(days=offset)
+            statements.append(
+                f'CREATE TABLE IF NOT EXISTS "{self.partition_name(day)}" '
+                f'PARTITION OF "{self.table}" '
+                f"FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')"
+            )
+
+        return statements
+
+    def expired(self, partitions: list[str], today: date) -> list[str]:
+        """
+        Partitions (by name) which only contain rows older than ``retention`` days.
+        """
+        oldest = today - timedelta(days=self.retention)
+        prefix = f"{self.table}_"
+        expired: list[str] = []
+
+        for name in partitions:
+            try:
+                day = datetime.strptime(name.removeprefix(prefix), _DAY_FORMAT).date()
+            except ValueError:
+                # Not created by us
+                continue
+
+            if day < oldest:
+                expired.append(name)
+
+        return expired
+
+    async def maintain(self) -> None:
+        today = date.today()
+
+        async with aiopg.connect(
+            database=connection.database, **connection.connect_params
+        ) as conn:
+            async with conn.cursor() as cursor:
+                for statement in self.create_sql(today):
+                    await cursor.execute(statement)
+
+                await cursor.execute(_PARTITIONS_SQL, (self.table,))
+                partitions = [row[0] for row in await cursor.fetchall()]
+
+                for name in self.expired(partitions, today):
+                    await cursor.execute(f'DROP TABLE IF EXISTS "{name}"')
+                    logger.info(f"Expired partition dropped: {name}")
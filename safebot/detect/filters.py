@@ -1,9 +1,11 @@
+from bisect import bisect_right
 from typing import Generator
 
 from pyrogram.enums import MessageEntityType as EntityType
 from pyrogram.types import MessageEntity, Message
 
-from safebot.handlers.emitter import Emitter
+from safebot import localization
+from safebot.detect.link import standardize_url
 from safebot.settings import config
 
 # Potentially entities where unsafe content MAY be contained.
@@ -21,58 +23,93 @@ LOCALE_REPLACE_ENTITY = "cut_unsafe"
 
 
 class Filter:
-    def __init__(self, message: Message) -> None:
+    def __init__(self, message: Message, *, language: str | None = None) -> None:
         self.message: Message = message
+        # Language of the text replacing unsafe content
+        self.language: str | None = language
 
-        self.text: str = message.text or message.caption
+        self.text: str = message.text or message.caption or ""
         self.entities: list[MessageEntity] = (
             message.entities or message.caption_entities or []
         )
 
-        # Offset relative to the previous entity.
-        # Used for correct replacement of entity positions.
-        self._entity_shift: int = 0
+        # Telegram counts offsets in UTF-16 code units, while Python counts
+        # code points. Maps the former to the latter, ``None`` if they match.
+        self._index: list[int] | None = _map_utf16_to_index(self.text)
+        # Entities whose text will be replaced by ``apply``.
+        self._pending: list[MessageEntity] = []
 
-    def _replace_entity(self, target: MessageEntity) -> None:
+    def _to_index(self, offset: int) -> int:
         """
-        Replaces the entity text (using ``LOCAL_REPLACE_ENTITY``),
-        updating its formatting and length.
-        Applies the ``_entity_shift`` offset, which needs to be
-        added/subtracted for the next entity.
+        Converts the UTF-16 offset to the string index.
         """
-        # Retrieve the text that we will insert instead.
-        locale = Emitter.prepare_text(LOCALE_REPLACE_ENTITY)
-
-        # Change formatting.
-        target.type = EntityType.ITALIC
-        # Trim the text on both sides and inserts the obtained localization.
-        self.text = self.replace(target.offset, target.length, locale)
-
-        # Update the shift to the next entity.
-        # This can be either a positive or negative value.
-        # Fortunately, Python automatically decrements the variable
-        # if the value turns out to be negative.
-        self._entity_shift += len(locale) - target.length
-        # Finally, update the length of the entity itself.
-        target.length = len(locale)
-
-    def _shift_entity(self, target: MessageEntity) -> None:
-        """
-        Applies the current shift to the entity offset.
-        """
-        target.offset += self._entity_shift
+        return offset if self._index is None else self._index[offset]
 
     def slice(self, offset: int, length: int) -> str:
         """
-        Gets a slice of text using the offset and length.
+        Gets a slice of text using the (UTF-16) offset and length.
         """
-        return self.text[offset:][:length]  # fmt: skip
+        return self.text[self._to_index(offset) : self._to_index(offset + length)]
 
-    def replace(self, offset: int, length: int, data: str) -> str:
+    def apply(self) -> None:
         """
-        Cuts out the specified segment and inserts the provided data in its place.
+        Replaces the text of all entities made safe (using ``LOCALE_REPLACE_ENTITY``)
+        in a single pass, updating their formatting and length.
+        Offsets and lengths of the remaining entities are shifted accordingly.
         """
-        return self.text[:offset] + data + self.text[offset + length:]  # fmt: skip
+        if not self._pending:
+            return
+
+        # Retrieve the text that we will insert instead.
+        locale = localization.locales.text(LOCALE_REPLACE_ENTITY, self.language)
+        locale_length = _utf16_length(locale)
+
+        replaced = sorted(self._pending, key=lambda e: e.offset)
+        parts: list[str] = []
+        position = 0
+
+        # Boundaries (in UTF-16) of the replaced segments and the accumulated shift
+        # right after each of them. Used to move the rest of the entities.
+        ends: list[int] = []
+        shifts: list[int] = []
+        shift = 0
+
+        applied: set[int] = set()
+
+        for ent in replaced:
+            start = self._to_index(ent.offset)
+
+            if start < position:
+                # Overlaps with the previous replacement, which already covers it.
+                continue
+
+            parts.append(self.text[position:start])
+            parts.append(locale)
+            position = self._to_index(ent.offset + ent.length)
+            applied.add(id(ent))
+
+            ends.append(ent.offset + ent.length)
+            shift += locale_length - ent.length
+            shifts.append(shift)
+
+            # Change formatting.
+            ent.offset += shift - (locale_length - ent.length)
+            ent.type = EntityType.ITALIC
+            ent.length = locale_length
+
+        parts.append(self.text[position:])
+        self.text = "".join(parts)
+
+        for ent in self.entities:
+            if id(ent) not in applied:
+                start = _shift_position(ent.offset, ends, shifts)
+                ent.length = (
+                    _shift_position(ent.offset + ent.length, ends, shifts) - start
+                )
+                ent.offset = start
+
+        self._pending.clear()
+        self._index = _map_utf16_to_index(self.text)
 
     @property
     def first_url(self) -> str | None:
@@ -83,7 +120,7 @@ class Filter:
             if ent.type == EntityType.URL:
                 # Telegram can send links without a protocol.
                 # This breaks the "urlparse" algorithm, so standardize it to RFC format.
-                return _standardize_url(self.slice(ent.offset, ent.length))
+                return standardize_url(self.slice(ent.offset, ent.length))
             elif ent.type == EntityType.TEXT_LINK:
                 return ent.url
 
@@ -94,14 +131,12 @@ class Filter:
         """
         for ent in self.entities:
             if ent.type in UNSAFE_ENTITIES:
-                # Shift the entity's offset before yielding to ensure proper replacement.
-                # This is safe, as if the shift is 0, nothing will change.
-                self._shift_entity(ent)
                 yield ent
 
     def make_entity_safe(self, entity: MessageEntity) -> None:
         """
         Ensures the entity is safe by replacing its content.
+        The text itself is replaced only after calling ``apply``.
         Only available for entities of type:
         **URL**, **TEXT_LINK**, **MENTION**, **TEXT_MENTION**.
 
@@ -109,7 +144,7 @@ class Filter:
         """
         match entity.type:
             case EntityType.TEXT_LINK:
-                self._replace_entity(entity)
+                self._pending.append(entity)
                 # Since the entity is being replaced,
                 # it means that the link is no longer there.
                 entity.url = None  # type: ignore
@@ -120,19 +155,39 @@ class Filter:
                 entity.user = self.message.from_user
             case EntityType.URL | EntityType.MENTION:
                 # Replace the text, as removing it would be too costly.
-                self._replace_entity(entity)
+                self._pending.append(entity)
             case _:
                 raise ValueError(f"Unsupported entity type: {entity.type}")
 
 
-def _standardize_url(url: str) -> str:
+def _utf16_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _map_utf16_to_index(text: str) -> list[int] | None:
     """
-    Converts (if needed) the URL to a standard web URI (RFC 3986).
+    Builds a table mapping each UTF-16 offset to the index in the string.
+    Characters outside the BMP (e.g. emoji) take two UTF-16 code units.
 
-    :param url: String URL;
-    :return: RFC-compliant URI.
+    :return: Mapping table, or ``None`` if offsets and indexes are the same.
     """
-    if "://" not in url:
-        return "https://" + url
+    if text.isascii() or _utf16_length(text) == len(text):
+        return None
 
-    return url
+    index: list[int] = []
+
+    for i, char in enumerate(text):
+        index.append(i)
+        if ord(char) > 0xFFFF:
+            index.append(i)
+
+    index.append(len(text))
+    return index
+
+
+def _shift_position(position: int, ends: list[int], shifts: list[int]) -> int:
+    """
+    Moves the UTF-16 position by the shift accumulated from all the replaced
+    segments ending before (or at) it.
+    """
+    return position + (shifts[i - 1] if (i := bisect_right(ends, position)) else 0)
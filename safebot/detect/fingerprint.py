@@ -0,0 +1,131 @@
+from hashlib import blake2b
+
+from pyrogram.types import InlineKeyboardMarkup, Message
+
+from safebot import metrics
+from safebot.database.cache import chat_cache
+from safebot.detect import link
+from safebot.detect.scan import Reader, ScanResult, items
+from safebot.lru import LRUCache
+from safebot.settings import config
+
+
+# Results of the recently scanned messages.
+# An entry lives while the same message keeps being posted.
+results: LRUCache[bytes, ScanResult] = LRUCache(
+    config.fingerprint_cache_size, config.fingerprint_window, sliding=True
+)
+# Hashes of the items (see ``items``) of the recently scanned messages
+# found safe, by chat and message ID. Edits are checked against them.
+snapshots: LRUCache[tuple[int, int], tuple[int, ...]] = LRUCache(
+    config.edit_cache_size, config.edit_window
+)
+
+
+def _get_language(chat_id: int) -> str | None:
+    """
+    Language of the chat, if its settings are cached (otherwise the default one).
+    The scan is synchronous, so the database isn't queried.
+    """
+    settings = chat_cache.get(chat_id)
+    return settings.language if settings is not None else None
+
+
+def fingerprint(message: Message, language: str | None = None) -> bytes:
+    """
+    Computes a digest of everything the scan result depends on:
+    the sender, whether it is a reply, the text, entities, button links
+    and the language of the text replacing unsafe content.
+
+    The text is taken as is, since the rendered safe text is reused for echoing.
+    """
+    entities = message.entities or message.caption_entities or ()
+    markup = message.reply_markup
+    buttons = (
+        [b.url for line in markup.inline_keyboard for b in line if b.url]
+        if isinstance(markup, InlineKeyboardMarkup)
+        else ()
+    )
+
+    data = (
+        (message.from_user.username or "").lower(),
+        message.reply_to_message is not None,
+        message.text or message.caption or "",
+        [
+            (e.type.value, e.offset, e.length, e.url, e.user.id if e.user else None)
+            for e in entities
+        ],
+        buttons,
+        language,
+    )
+    return blake2b(repr(data).encode(), digest_size=16).digest()
+
+
+def scan(message: Message) -> ScanResult:
+    """
+    Performs a quick scan of the message,
+    reusing the result if the same message has been scanned recently.
+    """
+    language = _get_language(message.chat.id) if message.chat else None
+    key = fingerprint(message, language)
+
+    if (result := results.get(key)) is None:
+        with metrics.scan_seconds.time():
+            result = Reader(message, language=language).scan()
+
+        results.put(key, result)
+
+    if not result.unsafe and message.chat:
+        snapshots.put((message.chat.id, message.id), tuple(items(message)))
+
+    return result
+
+
+def rescan(message: Message) -> ScanResult:
+    """
+    Scans the edited message, checking only the items added by the edit
+    (e.g. a link edited into the text). The message is scanned in full
+    if it hasn't been scanned recently, or if it's unsafe, to cut the content out.
+    """
+    snapshot_key = (message.chat.id, message.id)
+
+    if (previous := snapshots.get(snapshot_key)) is None:
+        return scan(message)
+
+    current = items(message)
+    reader = Reader(message, language=_get_language(message.chat.id))
+    added = [item for h, item in current.items() if h not in previous]
+
+    with metrics.scan_seconds.time():
+        unsafe = reader.scan_items(added)
+
+    if unsafe:
+        return scan(message)
+
+    snapshots.put(snapshot_key, tuple(current))
+    return ScanResult(
+        unsafe=False,
+        is_reply_message=reader.is_reply_message,
+        text=message.text or message.caption or "",
+        entities=message.entities or message.caption_entities or [],
+        # The rest have been left to the deep scan already.
+        targets=reader.find_targets(added),
+    )
+
+
+def _clear() -> None:
+    """
+    Drops the results made by the previous rules.
+    Otherwise, a message reposted within the window would never be rescanned.
+    """
+    results.clear()
+    snapshots.clear()
+
+
+link.reload_callbacks.append(_clear)
+
+metrics.Gauge(
+    "safebot_fingerprint_cache_hit_ratio",
+    "Share of messages not rescanned",
+    lambda: results.hit_rate,
+)
@@ -1,32 +1,39 @@
+import asyncio
+import re
 from dataclasses import dataclass
+from typing import Callable
 from urllib.parse import ParseResult, urlparse
 
-from safebot.logger import logger
-
-INVITE_HASH_LENGTH = 16
+from safebot import metrics
+from safebot.detect import lists, rules
+from safebot.logger import debug_enabled, logger
+from safebot.lru import LRUCache
+from safebot.settings import config
 
 DOMAINS_TG = (
     "t.me",
     "telegram.org",
 )
 DOMAIN_TG_SHORT = DOMAINS_TG[0]
-
-_ScannerMethods = tuple[[property, bool], ...]  # type: ignore
+# Public username of a user, bot or chat (lowercase)
+USERNAME_PATTERN = re.compile(r"[a-z][a-z0-9_]{3,31}")
 
 
-@dataclass
-class _LinkCheck:
-    # Quick checks that are not highly resource-intensive
-    quick: _ScannerMethods
-    # Deep checks that conduct detailed analysis and,
-    # accordingly, are more resource-intensive
-    deep: _ScannerMethods
+@dataclass(frozen=True, slots=True)
+class Verdict:
+    # Whether the link is considered unsafe
+    unsafe: bool
+    # Lowercase path, needed to check the reference to the sender
+    path: str
+    # Name of the rule that marked the link as unsafe (if any)
+    rule: str | None
 
 
 class Scanner:
-    # For the sake of conciseness, it is updated in the "init" function.
-    # Maps a domain to its validation methods.
-    methods: dict[str, _LinkCheck]
+    # Updated in the "init" function and replaced as a whole on every reload,
+    # so a scan always sees a consistent set of rules.
+    # Maps a domain to its compiled rules.
+    table: rules.RuleTable = {}
 
     def __init__(self, domain: str, path: str, *, deep_scan: bool = False) -> None:
         self.domain: str = domain
@@ -35,6 +42,9 @@ class Scanner:
         self._deep_scan: bool = deep_scan
         self._is_tg_shortlink: bool = domain == DOMAIN_TG_SHORT
 
+        # Name of the rule that marked the link as unsafe (if any).
+        self.matched_rule: str | None = None
+
     @property
     def is_tg_shortlink(self) -> bool:
         """
@@ -42,27 +52,15 @@ class Scanner:
         """
         return self._is_tg_shortlink
 
-    @property
-    def is_bot(self) -> bool:
-        """
-        Determines whether the bot username is specified in the path.
-        """
-        return self.path.split("?")[0].endswith("bot")
-
     @property
     def is_invite_link(self) -> bool:
         """
         Determines whether the path matches the pattern of an invitation link.
         """
-        offset = -1
-
-        if 20 > (length := len(self.path)) > 0:
-            if self.path[0] == "+":
-                offset = 1
-            elif self.path[:9] == "joinchat/":
-                offset = 9
+        if not (checks := self.table.get(self.domain)):
+            return False
 
-        return (length - offset) == INVITE_HASH_LENGTH if offset != -1 else False
+        return checks.quick.is_invite(self.path)
 
     def is_references_to(self, username: str) -> bool:
         """
@@ -72,38 +70,42 @@ class Scanner:
         """
         return self.path == username.lower()
 
-    def _call_and_check(self, methods: _ScannerMethods) -> bool:
+    def check_lists(self) -> bool | None:
         """
-        Invokes each passed method in turn.
+        Looks the domain up in the blocklist and allowlist,
+        and the username for Telegram short links.
 
-        :param methods: Check methods;
-        :return: ``True``, if any of the methods return True,
-            otherwise ``False``.
+        :return: ``True`` if blocked, ``False`` if allowed, ``None`` if not listed.
         """
-        for check in methods:
-            if check.fget(self):
-                return True
+        if (listed := lists.check(self.domain)) is None and self._is_tg_shortlink:
+            listed = lists.check(self.path.split("/", 1)[0])
 
-        return False
+        return listed
 
     def find(self) -> bool:
         """
-        Performs a series of checks on the specified domain.
+        Matches the path against the rules of the specified domain.
+        The lists take precedence over the rules.
         If the domain is not found, it will return True.
+        The matched rule is stored in ``matched_rule``.
 
         :return: Whether any prohibited content was found in the link.
         """
-        if not (checkers := self.methods.get(self.domain)):
-            return True
+        if (listed := self.check_lists()) is not None:
+            self.matched_rule = rules.RULE_BLOCKLIST if listed else None
+        elif not (checks := self.table.get(self.domain)):
+            self.matched_rule = rules.RULE_UNKNOWN_DOMAIN
+        else:
+            self.matched_rule = (
+                checks.quick if not self._deep_scan else checks.deep
+            ).match(self.path)
 
-        return self._call_and_check(
-            checkers.quick if not self._deep_scan else checkers.deep
-        )
+        return self.matched_rule is not None
 
 
 class Link:
     def __init__(self, url: str, *, deep_scan: bool = False) -> None:
-        self.url: str = url
+        self.url: str = normalize_url(url)
         self.parsed_url: ParseResult = urlparse(url)
         self.scanner: Scanner = Scanner(
             self.parsed_url.netloc,
@@ -143,52 +145,169 @@ class Link:
         """
         return self.scanner.is_tg_shortlink and self.scanner.is_invite_link
 
+    @property
+    def invite_hash(self) -> str | None:
+        """
+        Hash of the invitation link (case-sensitive), the same for all the links
+        to the chat, or ``None`` if the link isn't an invitation.
+        """
+        if not self.scanner.is_tg_shortlink or not (
+            checks := Scanner.table.get(self.scanner.domain)
+        ):
+            return None
+
+        if (prefix := checks.quick.invite_prefix(self.scanner.path)) is None:
+            return None
+
+        # The scanner path is lowercase, while the hash isn't.
+        return self.parsed_url.path[1 + len(prefix) :]
+
     def scan(self) -> bool:
         """
         Scans the link for advertising using the selected scanning mode
         *(quick or deep)*.
         If the link is broken, it will be marked as safe without any scanning.
-        If there are no checks for a domain, the link will be marked as unsafe.
+        If there are no rules for a domain, the link will be marked as unsafe.
 
         :return: Whether the link is considered unsafe.
         """
         if self._is_broken():
             self._is_safe = True
-        elif self.scanner.is_tg_shortlink and self.parsed_url.path != "":
+        elif self.parsed_url.path != "":
             self._is_safe = not self.scanner.find()
 
-        logger.debug(f"Link scan complete: {self.url=} {self._is_safe=}")
+        if debug_enabled():
+            logger.debug(f"Link scan complete: {self.url=} {self._is_safe=}")
         return not self._is_safe
 
 
-def _init_scanner_methods() -> None:
+# Verdicts of the recently scanned links.
+# Keyed by the normalized URL and the scanning mode.
+verdicts: LRUCache[tuple[str, bool], Verdict] = LRUCache(
+    config.link_cache_size, config.link_cache_ttl
+)
+
+
+metrics.Gauge(
+    "safebot_link_cache_hit_ratio",
+    "Share of links not rescanned",
+    lambda: verdicts.hit_rate,
+)
+
+
+def scan(url: str, *, deep_scan: bool = False) -> Verdict:
     """
-    Adds validation methods to the ``Scanner`` corresponding to each domain.
+    Scans the link, reusing the verdict of a previous scan of the same URL.
+    The verdict doesn't depend on the sender, so checking the reference
+    to the sender is left to the caller.
     """
-    Scanner.methods = {
-        DOMAIN_TG_SHORT: _LinkCheck(
-            quick=(
-                Scanner.is_bot,
-                Scanner.is_invite_link,
-            ),
-            deep=(),
-        ),
-    }
-
-
-def _add_scanner_aliases() -> None:
+    key = (normalize_url(url), deep_scan)
+
+    if (verdict := verdicts.get(key)) is None:
+        link = Link(key[0], deep_scan=deep_scan)
+        verdict = Verdict(
+            unsafe=link.scan(), path=link.scanner.path, rule=link.scanner.matched_rule
+        )
+        verdicts.put(key, verdict)
+
+    return verdict
+
+
+def get_username(url: str) -> str | None:
     """
-    Adds aliases to the domains by creating references to the original.
+    Extracts the username from a Telegram short link (e.g. "t.me/username").
+
+    :return: Lowercase username, or ``None`` if the link leads elsewhere.
     """
-    for service in (DOMAINS_TG,):
-        original = service[0]
+    parsed_url = urlparse(normalize_url(url))
 
-        for domain in service[1:]:
-            Scanner.methods[domain] = Scanner.methods[original]
+    if parsed_url.netloc != DOMAIN_TG_SHORT:
+        return None
 
+    path = parsed_url.path[1:]
+    return path if USERNAME_PATTERN.fullmatch(path) else None
 
-def init() -> None:
-    _init_scanner_methods()
-    _add_scanner_aliases()
 
-    logger.info(f"{len(Scanner.methods)} domains added to link scanner")
+def standardize_url(url: str) -> str:
+    """
+    Converts (if needed) the URL to a standard web URI (RFC 3986).
+
+    :param url: String URL;
+    :return: RFC-compliant URI.
+    """
+    if "://" not in url:
+        return "https://" + url
+
+    return url
+
+
+def normalize_url(url: str) -> str:
+    """
+    Brings the URL to the form in which equivalent links are equal:
+    standardized, lowercase and without the trailing slash.
+    """
+    return standardize_url(url.strip()).lower().rstrip("/")
+
+
+# Called after the rules (or the lists) are replaced, to drop anything
+# depending on the previous ones (e.g. the results of message scans).
+reload_callbacks: list[Callable[[], None]] = []
+
+
+def reload() -> bool:
+    """
+    Compiles the rules file, maps the lists and atomically replaces the current rules.
+    If the file is broken, the current rules are kept.
+
+    :return: Whether the rules were replaced.
+    """
+    try:
+        table = rules.load(config.link_rules_path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Unable to load link rules: {e}")
+        return False
+
+    try:
+        lists.reload(config.blocklist_path, config.allowlist_path)
+    except (OSError, ValueError) as e:
+        # The lists are optional, so the rules are still applied.
+        logger.error(f"Unable to load the blocklist or allowlist: {e}")
+
+    Scanner.table = table
+    # Verdicts made by the previous rules are no longer valid.
+    verdicts.clear()
+
+    for callback in reload_callbacks:
+        callback()
+
+    logger.info(
+        f"{len(table)} domains added to link scanner, "
+        f"{len(lists.blocklist)} blocked and {len(lists.allowlist)} allowed entries"
+    )
+
+    return True
+
+
+async def watch() -> None:
+    """
+    Reloads the rules every time the file (or any of the lists) is modified.
+    """
+    mtime = _get_rules_mtime()
+
+    while True:
+        await asyncio.sleep(config.link_rules_reload_interval)
+
+        if (current := _get_rules_mtime()) != mtime:
+            mtime = current
+            reload()
+
+
+def _get_rules_mtime() -> tuple[float | None, ...]:
+    return lists.get_mtimes(
+        config.link_rules_path, config.blocklist_path, config.allowlist_path
+    )
+
+
+def init() -> None:
+    if not reload():
+        exit(1)
@@ -0,0 +1,234 @@
+"""
+Blocklist and allowlist of usernames and domains, stored as compact indexes
+which are memory-mapped, so even a million entries cost almost no resident memory.
+
+An index is built from text lists (one entry per line, "#" starts a comment)::
+
+    python -m safebot.detect.lists blocklist.txt [more.txt ...] rules/blocklist.idx
+
+The index file is replaced atomically, so a running app picks it up on the next
+reload without ever seeing a partially written file.
+
+Index format (little-endian): header (see ``_HEADER``), Bloom filter bits,
+then the sorted 64-bit hashes of the entries.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+from typing import Iterable
+
+_MAGIC = b"SBIX"
+_VERSION = 1
+# Magic, version, number of hash functions, number of entries, Bloom filter bits
+_HEADER = struct.Struct("<4sHHQQ")
+# Bits of the Bloom filter per entry, and the number of hash functions.
+# Gives about 1.5% of false positives, which are then ruled out by the search.
+_BITS_PER_ENTRY = 16
+_HASHES = 2
+
+
+def normalize(entry: str) -> str:
+    """
+    Brings the entry to the form in which it's looked up:
+    lowercase username without "@" or domain.
+    """
+    return entry.strip().removeprefix("@").lower()
+
+
+def _hash(data: bytes) -> int:
+    """
+    Hash of the entry stored in the index.
+    """
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "little")
+
+
+def _probes(data: bytes, bits: int) -> tuple[int, int]:
+    """
+    Bits of the Bloom filter for the entry. CRC is much cheaper than the stored
+    hash, so the misses are answered without computing the latter.
+    """
+    return zlib.crc32(data) % bits, zlib.crc32(data[::-1]) % bits
+
+
+class MembershipIndex:
+    """
+    Read-only set of keys, memory-mapped from the file.
+
+    A Bloom filter answers most misses without touching the array of hashes,
+    and the rest are found by binary search.
+    """
+
+    def __init__(self, path: str) -> None:
+        if sys.byteorder != "little":
+            raise ValueError("Indexes are only supported on little-endian machines")
+
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+
+            if size < _HEADER.size:
+                raise ValueError(f"{path} is not an index")
+
+            self._mmap: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, hashes, count, bits = _HEADER.unpack_from(self._mmap)
+        bloom_size = (bits + 7) // 8
+
+        if magic != _MAGIC or version != _VERSION or hashes != _HASHES:
+            raise ValueError(f"{path} is not an index of version {_VERSION}")
+        if size != _HEADER.size + bloom_size + count * 8:
+            raise ValueError(f"{path} is truncated")
+
+        self._bits: int = bits
+        view = memoryview(self._mmap)
+        self._bloom: memoryview = view[_HEADER.size : _HEADER.size + bloom_size]
+        self._hashes: memoryview = view[_HEADER.size + bloom_size :].cast("Q")
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, key: str) -> bool:
+        if not self._bits:
+            return False
+
+        data = key.encode()
+        bloom = self._bloom
+
+        for position in _probes(data, self._bits):
+            if not bloom[position >> 3] & (1 << (position & 7)):
+                return False
+
+        h = _hash(data)
+        i = bisect_left(self._hashes, h)
+        return i < len(self._hashes) and self._hashes[i] == h
+
+    def close(self) -> None:
+        self._bloom.release()
+        self._hashes.release()
+        self._mmap.close()
+
+    @staticmethod
+    def build(keys: Iterable[str], path: str) -> int:
+        """
+        Writes the index of the keys, replacing the file atomically.
+
+        :return: Number of unique entries.
+        """
+        entries = {data for k in keys if (data := normalize(k).encode())}
+        bits = len(entries) * _BITS_PER_ENTRY
+        bloom = bytearray((bits + 7) // 8)
+
+        for data in entries:
+            for position in _probes(data, bits):
+                bloom[position >> 3] |= 1 << (position & 7)
+
+        hashes = sorted({_hash(data) for data in entries})
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(_HEADER.pack(_MAGIC, _VERSION, _HASHES, len(hashes), bits))
+                file.write(bloom)
+                # Native order, which is checked to be little-endian on load.
+                file.write(array("Q", hashes).tobytes())
+                file.flush()
+                os.fsync(file.fileno())
+
+            # Temporary files are only readable by the owner.
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        return len(hashes)
+
+
+# Indexes replaced as a whole on every reload (see ``reload``).
+# Empty until loaded, and if their files don't exist.
+blocklist: MembershipIndex | frozenset[str] = frozenset()
+allowlist: MembershipIndex | frozenset[str] = frozenset()
+
+
+def check(key: str) -> bool | None:
+    """
+    Looks the (normalized) username or domain up in the lists.
+    The allowlist takes precedence.
+
+    :return: ``True`` if blocked, ``False`` if allowed, ``None`` if not listed.
+    """
+    if key in allowlist:
+        return False
+    if key in blocklist:
+        return True
+
+    return None
+
+
+def load(path: str) -> MembershipIndex | frozenset[str]:
+    """
+    :raise ValueError: If the file isn't a valid index.
+    """
+    try:
+        return MembershipIndex(path)
+    except FileNotFoundError:
+        # The lists are optional.
+        return frozenset()
+
+
+def reload(blocklist_path: str, allowlist_path: str) -> None:
+    """
+    Maps the index files and replaces the current lists.
+    If any of them is broken, the current lists are kept.
+
+    :raise ValueError: If an index is broken.
+    """
+    global blocklist, allowlist
+
+    block, allow = load(blocklist_path), load(allowlist_path)
+    previous = (blocklist, allowlist)
+    blocklist, allowlist = block, allow
+
+    # Lookups are synchronous, so nothing uses the previous indexes anymore.
+    for index in previous:
+        if isinstance(index, MembershipIndex):
+            index.close()
+
+
+def get_mtimes(*paths: str) -> tuple[float | None, ...]:
+    mtimes: list[float | None] = []
+
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime)
+        except OSError:
+            mtimes.append(None)
+
+    return tuple(mtimes)
+
+
+def _read_entries(paths: Iterable[str]) -> Iterable[str]:
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if entry := line.split("#", 1)[0].strip():
+                    yield entry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds an index from text lists.")
+    parser.add_argument("sources", nargs="+", help="text lists, one entry per line")
+    parser.add_argument("index", help="index file to replace")
+    args = parser.parse_args()
+
+    count = MembershipIndex.build(_read_entries(args.sources), args.index)
+    print(f"{count} entries written to {args.index}")
@@ -0,0 +1,149 @@
+"""
+Detection of links and mentions written as plain text, without entities
+(e.g. "t . me/ads_bot", with invisible characters or look-alike letters).
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, Iterator
+
+from safebot.detect.link import USERNAME_PATTERN
+
+KIND_LINK = "link"
+KIND_MENTION = "mention"
+
+# Characters that aren't displayed, inserted to break up links and mentions.
+_INVISIBLE = (
+    "\u00ad\u034f\u061c\u115f\u1160\u17b4\u17b5\u180b\u180c\u180d\u180e"
+    "\u200b\u200c\u200d\u200e\u200f\u202a\u202b\u202c\u202d\u202e"
+    "\u2060\u2061\u2062\u2063\u2064\u206a\u206b\u206c\u206d\u206e\u206f"
+    "\u3164\ufe00\ufe01\ufe02\ufe03\ufe0e\ufe0f\ufeff\uffa0"
+)
+# Letters (lowercase) that look like the Latin ones, and punctuation that
+# looks like a dot or a slash. Applied after NFKC, which folds the rest
+# (e.g. fullwidth and mathematical letters).
+_CONFUSABLES = {
+    # Cyrillic: а в е ё і ї ј к м н о р с т у х ѕ ԁ ԛ ԝ ӏ һ ү
+    "\u0430": "a", "\u0432": "b", "\u0435": "e", "\u0451": "e", "\u0456": "i",
+    "\u0457": "i", "\u0458": "j", "\u043a": "k", "\u043c": "m", "\u043d": "h",
+    "\u043e": "o", "\u0440": "p", "\u0441": "c", "\u0442": "t", "\u0443": "y",
+    "\u0445": "x", "\u0455": "s", "\u0501": "d", "\u051b": "q", "\u051d": "w",
+    "\u04cf": "l", "\u04bb": "h", "\u04af": "y",
+    # Greek: α β ε η ι κ ν ο ρ τ υ χ
+    "\u03b1": "a", "\u03b2": "b", "\u03b5": "e", "\u03b7": "n", "\u03b9": "i",
+    "\u03ba": "k", "\u03bd": "v", "\u03bf": "o", "\u03c1": "p", "\u03c4": "t",
+    "\u03c5": "u", "\u03c7": "x",
+    # Dots and slashes
+    "\u3002": ".", "\u00b7": ".", "\u2027": ".", "\u2219": ".", "\u22c5": ".",
+    "\u2215": "/", "\u2044": "/", "\u29f8": "/",
+}  # fmt: skip
+
+
+# Translation table indexed by code point (the Basic Multilingual Plane).
+# Looking up a list is much faster than a dict, and the characters out of it
+# are left as is.
+_TRANSLATION: list[str | None] = [chr(i) for i in range(0x10000)]
+
+for _char in _INVISIBLE:
+    _TRANSLATION[ord(_char)] = None
+
+for _char, _replacement in _CONFUSABLES.items():
+    _TRANSLATION[ord(_char)] = _replacement
+
+# Dots written as words, e.g. "t [dot] me" or "t dot me".
+# Spaces around dots and slashes are allowed by the matcher itself.
+_DOT = re.compile(r"[\[(]\s*(?:\.|dot)\s*[\])]|(?<=\s)dot(?=\s)")
+_SPACES = re.compile(r"\s+")
+# Spaces after "@".
+_SPACED_MENTION = re.compile(r"@\s+")
+
+# Characters preceding a link which is a part of a longer domain or an e-mail.
+_LINK_BOUNDARY = r"[\w.\-@]"
+# Dot, possibly surrounded by spaces.
+_SPACED_DOT = r"\s*\.\s*"
+# Path of a link (username, invitation, post, etc.)
+_PATH = r"\s*/\s*[\w+\-/]+"
+
+
+@dataclass(frozen=True, slots=True)
+class Candidate:
+    # Either ``KIND_LINK`` or ``KIND_MENTION``
+    kind: str
+    # URL of the link, or the lowercase username
+    value: str
+
+
+def normalize(text: str) -> str:
+    """
+    Brings the text to the form in which obfuscated links and mentions look
+    like regular ones (except spaces around dots and slashes): NFKC, lowercase,
+    without invisible characters and with look-alike characters replaced.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_TRANSLATION)
+    return _SPACED_MENTION.sub("@", _DOT.sub(".", text))
+
+
+def _trie_pattern(words: Iterable[str], boundary: str = "") -> str:
+    """
+    Builds a regular expression matching any of the words, structured as a trie,
+    so that matching at a position costs at most the length of the longest word,
+    however many words there are. Dots may be surrounded by spaces.
+
+    :param boundary: Character class that mustn't precede the words.
+    """
+    root: dict[str, Any] = {}
+
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict[str, Any], boundary: str = "") -> str:
+        branches = [
+            (_SPACED_DOT if char == "." else re.escape(char))
+            # Checked after the first character, which is much faster than
+            # checking it at every position of the text.
+            + (f"(?<!{boundary}{re.escape(char)})" if boundary else "") + build(child)
+            for char, child in node.items()
+            if char
+        ]
+        optional = "" in node
+
+        if not branches:
+            return ""
+        if len(branches) == 1 and not optional:
+            return branches[0]
+
+        return f"(?:{'|'.join(branches)}){'?' if optional else ''}"
+
+    return build(root, boundary)
+
+
+@lru_cache(maxsize=4)
+def _compile(domains: tuple[str, ...]) -> re.Pattern[str]:
+    """
+    Compiles the matcher of the links to the domains and the mentions,
+    which finds all of them in a single pass over the text.
+    """
+    links = f"{_trie_pattern(domains, _LINK_BOUNDARY)}{_PATH}" if domains else "(?!)"
+    return re.compile(rf"{links}|@(?<!\w@)(?P<mention>{USERNAME_PATTERN.pattern})\b")
+
+
+def find_candidates(text: str, domains: Iterable[str]) -> Iterator[Candidate]:
+    """
+    Finds the links to the domains and the mentions in the text,
+    including the obfuscated ones.
+
+    :param domains: Domains of the links (e.g. the ones having rules).
+    """
+    pattern = _compile(tuple(sorted(domains)))
+
+    for match in pattern.finditer(normalize(text)):
+        if match.group("mention") is not None:
+            yield Candidate(KIND_MENTION, match.group("mention"))
+        else:
+            url = _SPACES.sub("", match.group()).rstrip("/")
+            yield Candidate(KIND_LINK, "https://" + url)
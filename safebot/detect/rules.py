@@ -0,0 +1,174 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Generator, Iterable
+
+# Names of the matched rules, reported alongside the verdict.
+RULE_DENY = "deny"
+RULE_PREFIX = "prefix"
+RULE_SUFFIX = "suffix"
+RULE_INVITE = "invite"
+RULE_UNKNOWN_DOMAIN = "unknown_domain"
+RULE_KIND = "kind"
+# Listed in the blocklist (see ``safebot.detect.lists``)
+RULE_BLOCKLIST = "blocklist"
+
+
+class _Node:
+    __slots__ = ("children", "word")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        # Word ending at the node, if any
+        self.word: str | None = None
+
+
+class _Trie:
+    """
+    Character trie, where lookup cost depends only on the length of the text,
+    not on the number of stored words.
+    """
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self._root: _Node = _Node()
+
+        for word in words:
+            node = self._root
+            for char in word:
+                node = node.children.setdefault(char, _Node())
+            node.word = word
+
+    def __bool__(self) -> bool:
+        return bool(self._root.children) or self._root.word is not None
+
+    def prefixes(self, text: Iterable[str]) -> Generator[str, None, None]:
+        """
+        Yields every stored word which is a prefix of the text (shortest first).
+        """
+        node = self._root
+
+        for char in text:
+            if node.word is not None:
+                yield node.word
+            if (child := node.children.get(char)) is None:
+                return
+            node = child
+
+        if node.word is not None:
+            yield node.word
+
+
+@dataclass(frozen=True)
+class PathRules:
+    # Paths that are always safe or always unsafe
+    allow: frozenset[str] = frozenset()
+    deny: frozenset[str] = frozenset()
+    # Unsafe path beginnings and endings
+    prefix: _Trie = field(default_factory=lambda: _Trie(()))
+    # Stored reversed, so the ending can be matched as a beginning
+    suffix: _Trie = field(default_factory=lambda: _Trie(()))
+    # Invitation links: a prefix followed by a hash of the fixed length
+    invite: _Trie = field(default_factory=lambda: _Trie(()))
+    invite_hash_length: int = 0
+    # Kinds of the resolved targets (e.g. "bot", "channel") that are unsafe.
+    # Only the deep scan resolves the targets. Channels are safe unless listed.
+    kinds: frozenset[str] = frozenset()
+
+    @classmethod
+    def compile(cls, data: dict[str, Any]) -> "PathRules":
+        invite = data.get("invite", {})
+
+        return cls(
+            allow=frozenset(p.lower() for p in data.get("allow", ())),
+            deny=frozenset(p.lower() for p in data.get("deny", ())),
+            prefix=_Trie(p.lower() for p in data.get("prefix", ())),
+            suffix=_Trie(s.lower()[::-1] for s in data.get("suffix", ())),
+            invite=_Trie(p.lower() for p in invite.get("prefixes", ())),
+            invite_hash_length=invite.get("hash_length", 0),
+            kinds=frozenset(k.lower() for k in data.get("kinds", ())),
+        )
+
+    def invite_prefix(self, path: str) -> str | None:
+        """
+        Finds the prefix of the invitation link, followed by its hash.
+
+        :return: Matched prefix, or ``None`` if the path isn't an invitation.
+        """
+        for prefix in self.invite.prefixes(path):
+            if len(path) - len(prefix) == self.invite_hash_length:
+                return prefix
+
+        return None
+
+    def is_invite(self, path: str) -> bool:
+        """
+        Determines whether the path matches the pattern of an invitation link.
+        """
+        return self.invite_prefix(path) is not None
+
+    def match(self, path: str) -> str | None:
+        """
+        Matches the (lowercase) path against the rules.
+
+        :return: Name of the first matched rule, or ``None`` if the path is safe.
+        """
+        if path in self.allow:
+            return None
+        if path in self.deny:
+            return RULE_DENY
+        if self.prefix and next(self.prefix.prefixes(path), None) is not None:
+            return RULE_PREFIX
+        if self.suffix and next(self.suffix.prefixes(reversed(path)), None) is not None:
+            return RULE_SUFFIX
+        if self.invite and self.is_invite(path):
+            return RULE_INVITE
+
+        return None
+
+
+@dataclass(frozen=True)
+class LinkCheck:
+    # Quick checks that are not highly resource-intensive
+    quick: PathRules
+    # Deep checks that conduct detailed analysis and,
+    # accordingly, are more resource-intensive
+    deep: PathRules
+
+
+# Maps a domain (including aliases) to its compiled rules.
+RuleTable = dict[str, LinkCheck]
+
+
+def compile_rules(data: dict[str, Any]) -> RuleTable:
+    """
+    Compiles the raw rules into a lookup table.
+    Aliases reference the same rules as the original domain.
+
+    :param data: Maps a domain to its rules;
+    :raise ValueError: If the rules are malformed.
+    """
+    table: RuleTable = {}
+
+    try:
+        for domain, rules in data.items():
+            check = LinkCheck(
+                quick=PathRules.compile(rules.get("quick", {})),
+                deep=PathRules.compile(rules.get("deep", {})),
+            )
+
+            for name in (domain, *rules.get("aliases", ())):
+                table[name.lower()] = check
+    except (AttributeError, TypeError) as e:
+        raise ValueError(f"Malformed link rules: {e}") from e
+
+    return table
+
+
+def load(path: str) -> RuleTable:
+    """
+    Reads and compiles the rules file.
+
+    :raise OSError: If the file can't be read;
+    :raise ValueError: If the file contains malformed rules.
+    """
+    with open(path, encoding="utf-8") as f:
+        return compile_rules(json.load(f))
@@ -1,4 +1,7 @@
-from typing import Callable
+from copy import copy
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, Iterable, Mapping, Sequence
 
 from pyrogram.enums import MessageEntityType as EntityType
 from pyrogram.types import (
@@ -8,18 +11,114 @@ from pyrogram.types import (
     MessageEntity,
 )
 
+from safebot.detect import link, lists, plaintext, rules
 from safebot.detect.filters import Filter
-from safebot.detect.link import Link
+from safebot.settings import config
 
 InlineKeyboardType = list[list[InlineKeyboardButton]]
 
+# Kinds of the scanned items of a message (see ``items``)
+ITEM_LINK = "link"
+ITEM_MENTION = "mention"
+ITEM_TEXT_MENTION = "text_mention"
+ITEM_TEXT = "text"
+
+Item = tuple[str, Any]
+
+
+@dataclass(frozen=True, slots=True)
+class ScanResult:
+    # Whether the message contains advertising
+    unsafe: bool
+    # Whether the message is addressed to someone (see ``Reader.is_reply_message``)
+    is_reply_message: bool
+    # Message text with unsafe content cut out and its entities
+    text: str
+    entities: list[MessageEntity]
+    # Usernames left to the deep scan (only if nothing was found)
+    targets: tuple[str, ...] = ()
+    # Name of the first matched rule (the entity type for mentions of bots)
+    rule: str | None = None
+    # Whether the text is safe to be echoed. Unsafe content found in plain text
+    # (without entities) can't be cut out.
+    echoable: bool = True
+
+
+def items(message: Message) -> dict[int, Item]:
+    """
+    Collects everything the quick scan checks, without building the ``Filter``:
+    links of the entities and the buttons, mentions, text mentions
+    and the text itself (for the plain text scan).
+
+    :return: Items (kind and value) by their hashes, in the order of appearance.
+    """
+    text = message.text or message.caption or ""
+    # Entity offsets are counted in UTF-16 code units (see ``Filter.slice``).
+    encoded = None if text.isascii() else text.encode("utf-16-le")
+
+    def slice_text(offset: int, length: int) -> str:
+        if encoded is None:
+            return text[offset : offset + length]
+        return encoded[offset * 2 : (offset + length) * 2].decode("utf-16-le", "ignore")
+
+    found: dict[int, Item] = {}
+
+    for entity in message.entities or message.caption_entities or ():
+        match entity.type:
+            case EntityType.URL:
+                item: Item = (ITEM_LINK, slice_text(entity.offset, entity.length))
+                key: Any = item
+            case EntityType.TEXT_LINK:
+                item = key = (ITEM_LINK, entity.url)
+            case EntityType.MENTION:
+                username = slice_text(entity.offset, entity.length)[1:].lower()
+                item = key = (ITEM_MENTION, username)
+            case EntityType.TEXT_MENTION:
+                item = (ITEM_TEXT_MENTION, entity)
+                user = entity.user
+                key = (ITEM_TEXT_MENTION, user.id, user.username, user.is_bot)
+            case _:
+                continue
+
+        found.setdefault(hash(key), item)
+
+    markup = message.reply_markup
+
+    if isinstance(markup, InlineKeyboardMarkup):
+        for line in markup.inline_keyboard:
+            for button in line:
+                if button.url is not None:
+                    item = key = (ITEM_LINK, button.url)
+                    found.setdefault(hash(key), item)
+
+    found[hash((ITEM_TEXT, text))] = (ITEM_TEXT, text)
+    return found
+
 
 class Reader:
-    def __init__(self, message: Message, *, deep_scan: bool = False) -> None:
+    def __init__(
+        self,
+        message: Message,
+        *,
+        deep_scan: bool = False,
+        language: str | None = None,
+        verdicts: Mapping[str, link.Verdict] | None = None,
+        listed: Mapping[str, bool | None] | None = None,
+    ) -> None:
         self.message: Message = message
         self.deep_scan: bool = deep_scan
-
-        self.filter: Filter = Filter(message)
+        # Verdicts of the links (by URL) and the lists (by username) evaluated
+        # in advance for a batch (see ``scan_batch``). The rest are evaluated on use.
+        self.verdicts: Mapping[str, link.Verdict] = (
+            verdicts if verdicts is not None else {}
+        )
+        self.listed: Mapping[str, bool | None] = listed if listed is not None else {}
+
+        self.language: str | None = language
+        # Name of the first matched rule (see ``ScanResult.rule``)
+        self.rule: str | None = None
+        # Whether unsafe content has been found in plain text
+        self.found_in_plain_text: bool = False
 
         # Naturally, the bot must always have a username,
         # but this protection won't be excessive.
@@ -29,6 +128,14 @@ class Reader:
             message.reply_to_message is not None
         ) or self._contain_text_mention()
 
+    @cached_property
+    def filter(self) -> Filter:
+        """
+        Text and entities of the message, with unsafe content cut out by the scan.
+        Built on first use, so that checking the items of an edit doesn't need it.
+        """
+        return Filter(self.message, language=self.language)
+
     def _contain_text_mention(self) -> bool:
         """
         Checks if there is any text mention in the entities.
@@ -44,15 +151,15 @@ class Reader:
     def _is_unsafe_link(self, url: str) -> bool:
         """
         Checks if the link is **unsafe** by running a scanner.
+        The link referencing to the sender itself is considered safe.
         """
-        link = Link(url, deep_scan=self.deep_scan)
-        return link.scan() and not self._is_self_reference(link)
+        if (verdict := self.verdicts.get(url)) is None:
+            verdict = link.scan(url, deep_scan=self.deep_scan)
 
-    def _is_self_reference(self, link: Link) -> bool:
-        """
-        Checks if the link references to itself.
-        """
-        return link.scanner.is_references_to(self.from_username)
+        if unsafe := verdict.unsafe and verdict.path != self.from_username:
+            self.rule = self.rule or verdict.rule
+
+        return unsafe
 
     def _scan_entity_url(self, entity: MessageEntity) -> bool:
         return self._is_unsafe_link(self.filter.slice(entity.offset, entity.length))
@@ -60,12 +167,44 @@ class Reader:
     def _scan_entity_text_link(self, entity: MessageEntity) -> bool:
         return self._is_unsafe_link(entity.url)
 
+    def _check_lists(self, username: str) -> bool | None:
+        """
+        Looks the (lowercase) username up in the lists (see ``lists.check``).
+        The sender itself is always allowed.
+        """
+        if username == self.from_username:
+            return False
+
+        if username in self.listed:
+            listed = self.listed[username]
+        else:
+            listed = lists.check(username)
+
+        if listed:
+            self.rule = self.rule or rules.RULE_BLOCKLIST
+
+        return listed
+
+    def _is_unsafe_username(self, username: str) -> bool:
+        """
+        Unless the username is listed, any bot (judging by the username)
+        is considered unsafe.
+        """
+        if (listed := self._check_lists(username)) is not None:
+            return listed
+
+        return username.endswith("bot")
+
     def _scan_entity_mention(self, entity: MessageEntity) -> bool:
         username = self.filter.slice(entity.offset, entity.length)[1:].lower()
-        return username.endswith("bot") and username != self.from_username
+        return self._is_unsafe_username(username)
 
     def _scan_entity_text_mention(self, entity: MessageEntity) -> bool:
-        return entity.user.is_bot and (entity.user.username != self.from_username)
+        if username := (entity.user.username or "").lower():
+            if (listed := self._check_lists(username)) is not None:
+                return listed
+
+        return entity.user.is_bot
 
     @property
     def inline_keyboard(self) -> InlineKeyboardType:
@@ -127,7 +266,11 @@ class Reader:
             case _:
                 return False
 
-        return method(entity)
+        if (unsafe := method(entity)) and self.rule is None:
+            # Links set the rule themselves.
+            self.rule = entity.type.name.lower()
+
+        return unsafe
 
     def secure_filter(self, *, cut_unsafe: bool) -> bool:
         """
@@ -152,8 +295,82 @@ class Reader:
                 if not found:
                     found = True
 
+        if found:
+            # Rewrite the text once for all unsafe entities.
+            self.filter.apply()
+
         return found
 
+    def find_targets(self, scanned: Iterable[Item] | None = None) -> tuple[str, ...]:
+        """
+        Collects usernames referenced by the message (using mentions, Telegram links
+        and buttons), except the sender itself. They can't be checked without
+        resolving, so they are left to the deep scan.
+
+        :param scanned: Items to collect from (see ``items``), all by default.
+        :return: Unique lowercase usernames, in the order of appearance.
+        """
+        usernames: list[str | None] = []
+
+        for kind, value in items(self.message).values() if scanned is None else scanned:
+            if kind == ITEM_MENTION:
+                usernames.append(value)
+            elif kind == ITEM_LINK:
+                usernames.append(link.get_username(value))
+
+        return tuple(u for u in dict.fromkeys(usernames) if u and u != self.from_username)
+
+    def scan_items(self, scanned: Iterable[Item]) -> bool:
+        """
+        Checks only the given items (see ``items``), e.g. the ones added by an edit,
+        by the same rules as the quick scan. Nothing is cut out.
+
+        :return: Whether any of the items is unsafe.
+        """
+        for kind, value in scanned:
+            if kind == ITEM_LINK:
+                unsafe = self._is_unsafe_link(value)
+            elif kind == ITEM_MENTION:
+                unsafe = self._is_unsafe_username(value)
+            elif kind == ITEM_TEXT_MENTION:
+                unsafe = self._scan_entity_text_mention(value)
+            else:
+                unsafe = config.plain_text_scan and self.scan_plain_text()
+
+            if unsafe:
+                return True
+
+        return False
+
+    def scan_plain_text(
+        self, candidates: Iterable[plaintext.Candidate] | None = None
+    ) -> bool:
+        """
+        Scans the text for links and mentions without entities,
+        including obfuscated ones (see ``plaintext.normalize``).
+        The links are checked by the same rules. Content which is already cut out
+        isn't scanned again.
+
+        :param candidates: Candidates found in advance, in the text by default.
+        """
+        if candidates is None:
+            candidates = plaintext.find_candidates(self.filter.text, link.Scanner.table)
+
+        for candidate in candidates:
+            if candidate.kind == plaintext.KIND_LINK:
+                unsafe = self._is_unsafe_link(candidate.value)
+            else:
+                unsafe = self._is_unsafe_username(candidate.value)
+
+                if unsafe and self.rule is None:
+                    self.rule = plaintext.KIND_MENTION
+
+            if unsafe:
+                self.found_in_plain_text = True
+                return True
+
+        return False
+
     def quick_scan(self) -> bool:
         """
         Performs a superficial check of the message for unsafe links.
@@ -161,4 +378,130 @@ class Reader:
 
         :return: ``True`` if the message contains adv, otherwise ``False``
         """
-        return self.secure_filter(cut_unsafe=True) or self.scan_unsafe_inline_button()
+        found = self.secure_filter(cut_unsafe=True) or self.scan_unsafe_inline_button()
+
+        # Only replies are echoed, so the plain text of the rest
+        # doesn't matter once something is found.
+        if config.plain_text_scan and (not found or self.is_reply_message):
+            found = self.scan_plain_text() or found
+
+        return found
+
+    def scan(self) -> ScanResult:
+        """
+        Performs the quick scan and collects its result.
+        """
+        unsafe = self.quick_scan()
+
+        return ScanResult(
+            unsafe=unsafe,
+            is_reply_message=self.is_reply_message,
+            text=self.filter.text,
+            # Copied, since the entities of the scanned message may be changed.
+            entities=[copy(e) for e in self.filter.entities],
+            targets=self.find_targets() if not unsafe else (),
+            rule=self.rule,
+            echoable=not self.found_in_plain_text,
+        )
+
+    @classmethod
+    def scan_batch(
+        cls,
+        messages: Sequence[Message],
+        *,
+        deep_scan: bool = False,
+        language: str | None = None,
+    ) -> list[ScanResult]:
+        """
+        Scans a batch of messages (e.g. a page of chat history),
+        so that the time depends on the number of unique links and mentions,
+        not their occurrences.
+
+        The items of each message (see ``items``) are collected once,
+        and every unique link and username (including the ones found in plain text)
+        is evaluated once for the whole batch. Each message is checked
+        by the mapped verdicts (the reference to the sender is still checked
+        per message), and only the unsafe ones are filtered to cut out their content.
+
+        :return: Results in the order of the messages.
+        """
+        verdicts: dict[str, link.Verdict] = {}
+        listed: dict[str, bool | None] = {}
+
+        def evaluate(value: str, is_link: bool) -> None:
+            if is_link:
+                if value not in verdicts:
+                    verdicts[value] = link.scan(value, deep_scan=deep_scan)
+            elif value not in listed:
+                listed[value] = lists.check(value)
+
+        found: list[list[Item]] = []
+
+        for message in messages:
+            scanned = [i for i in items(message).values() if i[0] != ITEM_TEXT]
+            found.append(scanned)
+
+            for kind, value in scanned:
+                if kind == ITEM_LINK or kind == ITEM_MENTION:
+                    evaluate(value, kind == ITEM_LINK)
+                elif kind == ITEM_TEXT_MENTION and value.user.username:
+                    evaluate(value.user.username.lower(), False)
+
+        results: list[ScanResult] = []
+
+        for message, scanned in zip(messages, found):
+            reader = cls(
+                message,
+                deep_scan=deep_scan,
+                language=language,
+                verdicts=verdicts,
+                listed=listed,
+            )
+            text = message.text or message.caption or ""
+            unsafe = reader.scan_items(scanned)
+
+            if not unsafe and config.plain_text_scan and text:
+                # Only the text of the messages safe so far is worth scanning.
+                candidates = list(plaintext.find_candidates(text, link.Scanner.table))
+
+                for candidate in candidates:
+                    evaluate(candidate.value, candidate.kind == plaintext.KIND_LINK)
+
+                unsafe = reader.scan_plain_text(candidates)
+
+            if not unsafe:
+                entities = message.entities or message.caption_entities or ()
+                results.append(
+                    ScanResult(
+                        unsafe=False,
+                        is_reply_message=reader.is_reply_message,
+                        text=text,
+                        entities=[copy(e) for e in entities],
+                        targets=reader.find_targets(scanned),
+                    )
+                )
+                continue
+
+            # Cut out by the same verdicts. Replies are echoed,
+            # so the rest of their plain text is checked as well (see ``quick_scan``).
+            reader.secure_filter(cut_unsafe=True)
+
+            if (
+                config.plain_text_scan
+                and reader.is_reply_message
+                and not reader.found_in_plain_text
+            ):
+                reader.scan_plain_text()
+
+            results.append(
+                ScanResult(
+                    unsafe=True,
+                    is_reply_message=reader.is_reply_message,
+                    text=reader.filter.text,
+                    entities=[copy(e) for e in reader.filter.entities],
+                    rule=reader.rule,
+                    echoable=not reader.found_in_plain_text,
+                )
+            )
+
+        return results
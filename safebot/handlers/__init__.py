@@ -2,36 +2,108 @@ from typing import Type
 
 from pyrogram import Client
 from pyrogram.enums import ChatType
-from pyrogram.handlers import MessageHandler
+from pyrogram.handlers import EditedMessageHandler, MessageHandler
 from pyrogram.types import Message
 
-from safebot.client import client
+from safebot import metrics
+from safebot.client import clients
 from safebot.handlers.chat.abc import MessageProtocol
 from safebot.handlers.chat.private import PrivateMessage
 from safebot.handlers.chat.public import PublicMessage
+from safebot.handlers import deep, prescreen
+from safebot.handlers.albums import AlbumBuffer
+from safebot.handlers.catchup import progress
+from safebot.handlers.accounts import supervisor
+from safebot.handlers.pipeline import pipeline
 from safebot.logger import logger
+from safebot.settings import config
+
+
+async def _route(instance: MessageProtocol) -> None:
+    """
+    Queues the processing of the scanned message, or its deep scan.
+    """
+    if instance.requires_processing:
+        instance.schedule()
+        await pipeline.put(instance.chat_id, instance.process)
+    elif config.deep_scan and (targets := instance.deep_scan_targets):
+        deep.engine.submit(instance, targets)
+
+
+@logger.catch
+async def _album_handler(messages: list[Message]) -> None:
+    await _route(PublicMessage(messages[0], album=messages))
+
+
+album_buffer = AlbumBuffer(config.album_window, config.album_max_pending, _album_handler)
 
 
 @logger.catch
-async def _message_handler(_: Client, message: Message) -> None:
+async def _message_handler(client: Client, message: Message) -> None:
     """
     Routes the message to be processed by the appropriate class
     based on the chat type.
+    The message is scanned right away, while the processing is queued.
+    Messages which passed the quick scan may be checked by the deep scan later.
+    Group messages are processed only by the account acting in the chat,
+    and the items of albums sent by bots are gathered to be processed at once.
     """
     handler: Type[MessageProtocol]
     chat_type = message.chat.type
 
     if (chat_type == ChatType.SUPERGROUP) or (chat_type == ChatType.GROUP):
+        if not await supervisor.acquire(client, message.chat.id):
+            return
+        progress.seen(client, message.chat.id, message.id)
         handler = PublicMessage
     elif chat_type == ChatType.PRIVATE:
         handler = PrivateMessage
     else:
         return
 
-    await handler(message).process()
+    metrics.messages.inc(chat_type.name.lower())
+
+    if (
+        handler is PublicMessage
+        and message.media_group_id
+        and message.from_user
+        and message.from_user.is_bot
+    ):
+        album_buffer.add(message)
+        return
+
+    await _route(handler(message))
+
+
+@logger.catch
+async def _edited_message_handler(client: Client, message: Message) -> None:
+    """
+    Rescans the bot messages edited in groups (bots may edit advertising
+    into a message posted clean). Only the changes are scanned,
+    and the unsafe messages are processed as the new ones.
+    """
+    chat_type = message.chat.type
+
+    if not (
+        ((chat_type == ChatType.SUPERGROUP) or (chat_type == ChatType.GROUP))
+        and message.from_user
+        and message.from_user.is_bot
+    ):
+        return
+
+    if not await supervisor.acquire(client, message.chat.id):
+        return
+
+    metrics.edits.inc()
+    await _route(PublicMessage(message, edited=True))
 
 
 def init() -> None:
-    client.add_handler(MessageHandler(_message_handler))
+    for client in clients:
+        if config.prescreen_updates:
+            prescreen.install(client, _message_handler, _edited_message_handler)
+        else:
+            client.add_handler(MessageHandler(_message_handler))
+            client.add_handler(EditedMessageHandler(_edited_message_handler))
 
     logger.info("Handlers successfully initialized")
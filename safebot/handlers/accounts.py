@@ -0,0 +1,217 @@
+import asyncio
+from dataclasses import dataclass
+from time import monotonic
+from typing import Sequence
+
+from pyrogram import Client
+from pyrogram.errors import RPCError
+
+from safebot import metrics
+from safebot.client import clients
+from safebot.handlers import database
+from safebot.logger import logger
+from safebot.settings import config
+
+
+@dataclass
+class Account:
+    # Position in the list of clients, stored in the database
+    index: int
+    client: Client
+    # Number of chats in which the account acts
+    owned: int = 0
+    # Time (monotonic) until which the account is restricted by FloodWait
+    paused_until: float = 0.0
+
+    @property
+    def paused(self) -> bool:
+        return self.paused_until > monotonic()
+
+
+class Supervisor:
+    """
+    Distributes chats among the accounts, so each chat is served by only one of them
+    (the owner), and every account has its own rate limits.
+
+    A new chat belongs to the account chosen by the stable hash of its ID,
+    if that account is present in the chat, otherwise to the account which
+    received the message. Chats joined via invitation links belong to the least
+    loaded account. The owners are stored in the database.
+
+    When an account receives a long ``FloodWait``, its chats are handed over
+    to the other accounts that have been seen in them.
+    """
+
+    def __init__(self, clients: Sequence[Client], rebalance_after: float) -> None:
+        self.accounts: list[Account] = [Account(i, c) for i, c in enumerate(clients)]
+        self.rebalance_after: float = rebalance_after
+
+        # Maps a chat ID to the index of its owner.
+        self.owners: dict[int, int] = {}
+        # Maps a chat ID to the indexes of accounts that received messages from it.
+        self.members: dict[int, set[int]] = {}
+        # Chats being assigned, so that concurrent messages wait for the same owner.
+        self._assigning: dict[int, asyncio.Future[int]] = {}
+
+    @property
+    def primary(self) -> Account:
+        return self.accounts[0]
+
+    def account_of(self, client: Client) -> Account:
+        for account in self.accounts:
+            if account.client is client:
+                return account
+
+        return self.primary
+
+    def owner_of(self, chat_id: int) -> Account | None:
+        if (index := self.owners.get(chat_id)) is None or index >= len(self.accounts):
+            # Chats of the removed accounts are assigned again.
+            return None
+
+        return self.accounts[index]
+
+    def client_for(self, chat_id: int) -> Client:
+        """
+        Client of the account acting in the chat (the main one, if unknown).
+        """
+        return (self.owner_of(chat_id) or self.primary).client
+
+    def preferred(self, chat_id: int) -> Account:
+        return self.accounts[chat_id % len(self.accounts)]
+
+    def least_loaded(self, accounts: Sequence[Account] = ()) -> Account:
+        """
+        Account with the fewest chats, preferably not restricted at the moment.
+
+        :param accounts: Accounts to choose from (all by default).
+        """
+        accounts = accounts or self.accounts
+        active = [a for a in accounts if not a.paused] or accounts
+        return min(active, key=lambda a: a.owned)
+
+    async def load(self) -> None:
+        for chat_id, index in (await database.get_accounts()).items():
+            self._set_owner(chat_id, index)
+
+        logger.info(
+            f"{len(self.accounts)} accounts, chats owned: "
+            f"{', '.join(str(a.owned) for a in self.accounts)}"
+        )
+
+    def _set_owner(self, chat_id: int, index: int) -> None:
+        if (previous := self.owner_of(chat_id)) is not None:
+            previous.owned -= 1
+
+        self.owners[chat_id] = index
+
+        if index < len(self.accounts):
+            self.accounts[index].owned += 1
+
+    async def acquire(self, client: Client, chat_id: int) -> bool:
+        """
+        Registers the message received by the client in the chat.
+
+        :return: Whether the account of the client has to process the message.
+        """
+        if len(self.accounts) == 1:
+            return True
+
+        account = self.account_of(client)
+        self.members.setdefault(chat_id, set()).add(account.index)
+
+        if (owner := self.owner_of(chat_id)) is None:
+            if (future := self._assigning.get(chat_id)) is None:
+                future = asyncio.ensure_future(self._assign(chat_id, account))
+                self._assigning[chat_id] = future
+                future.add_done_callback(lambda _: self._assigning.pop(chat_id, None))
+
+            return await asyncio.shield(future) == account.index
+
+        return owner is account
+
+    async def _assign(self, chat_id: int, receiver: Account) -> int:
+        owner = self.preferred(chat_id)
+
+        if owner is not receiver and not await self._is_member(owner, chat_id):
+            owner = receiver
+
+        await self.claim(chat_id, owner)
+        return owner.index
+
+    async def _is_member(self, account: Account, chat_id: int) -> bool:
+        if account.index in self.members.get(chat_id, ()):
+            return True
+
+        try:
+            await account.client.get_chat(chat_id)
+        except (RPCError, KeyError, ValueError):
+            return False
+
+        return True
+
+    async def claim(self, chat_id: int, account: Account) -> None:
+        """
+        Assigns the chat to the account, unless it already has an owner.
+        """
+        self.members.setdefault(chat_id, set()).add(account.index)
+
+        if self.owner_of(chat_id) is None:
+            self._set_owner(chat_id, account.index)
+            await database.set_account((chat_id,), account.index)
+
+    @staticmethod
+    def pause(account: Account, seconds: float) -> None:
+        """
+        Marks the account as restricted, so it isn't chosen to join chats.
+        """
+        account.paused_until = max(account.paused_until, monotonic() + seconds)
+
+    def flood_wait(self, chat_id: int, seconds: float) -> None:
+        """
+        Pauses the owner of the chat, handing its chats over if the wait is long.
+        """
+        account = self.owner_of(chat_id) or self.primary
+        self.pause(account, seconds)
+
+        if seconds >= self.rebalance_after and len(self.accounts) > 1:
+            asyncio.create_task(self.rebalance(account))
+
+    async def rebalance(self, account: Account) -> None:
+        """
+        Hands the chats of the account over to the least loaded of the accounts
+        present in them. Chats without other accounts stay with the owner.
+        """
+        moved: dict[int, list[int]] = {}
+
+        for chat_id, index in list(self.owners.items()):
+            if index != account.index:
+                continue
+
+            candidates = [
+                self.accounts[i]
+                for i in self.members.get(chat_id, ())
+                if i != account.index and not self.accounts[i].paused
+            ]
+
+            if candidates:
+                target = min(candidates, key=lambda a: a.owned)
+                self._set_owner(chat_id, target.index)
+                moved.setdefault(target.index, []).append(chat_id)
+
+        for index, chat_ids in moved.items():
+            await database.set_account(chat_ids, index)
+
+        logger.warning(
+            f"Account #{account.index} is restricted, "
+            f"{sum(map(len, moved.values()))} chats handed over"
+        )
+
+
+supervisor = Supervisor(clients, config.account_rebalance_flood_wait)
+
+metrics.Gauge(
+    "safebot_accounts_paused",
+    "Accounts restricted by FloodWait",
+    lambda: sum(a.paused for a in supervisor.accounts),
+)
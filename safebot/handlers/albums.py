@@ -0,0 +1,83 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine
+
+from pyrogram.types import Message
+
+# Telegram doesn't allow more items in an album.
+MAX_ALBUM_SIZE = 10
+
+_Callback = Callable[[list[Message]], Coroutine[Any, Any, None]]
+
+
+@dataclass(slots=True)
+class _Album:
+    messages: list[Message] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+class AlbumBuffer:
+    """
+    Gathers the items of media albums, which arrive as separate messages,
+    to process each album as a whole.
+
+    An album is passed to the callback ``window`` seconds after its first item,
+    or as soon as it's complete, so an album missing some items is only delayed.
+    At most ``max_pending`` albums are gathered at once, and the oldest one
+    is passed on early to make room for a new one.
+    """
+
+    def __init__(self, window: float, max_pending: int, callback: _Callback) -> None:
+        self.window: float = window
+        self.max_pending: int = max_pending
+        self.callback: _Callback = callback
+
+        # Maps a chat ID and a media group ID to the album, oldest first.
+        self._pending: dict[tuple[int, str], _Album] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, message: Message) -> None:
+        """
+        Buffers the item of the album without waiting.
+        """
+        key = (message.chat.id, message.media_group_id)
+
+        if (album := self._pending.get(key)) is None:
+            if len(self._pending) >= self.max_pending:
+                self._flush(next(iter(self._pending)))
+
+            album = self._pending[key] = _Album()
+            album.timer = asyncio.get_running_loop().call_later(
+                self.window, self._flush, key
+            )
+
+        album.messages.append(message)
+
+        if len(album.messages) >= MAX_ALBUM_SIZE:
+            self._flush(key)
+
+    def _flush(self, key: tuple[int, str]) -> None:
+        if (album := self._pending.pop(key, None)) is None:
+            return
+
+        if album.timer is not None:
+            album.timer.cancel()
+
+        album.messages.sort(key=lambda m: m.id)
+
+        task = asyncio.create_task(self.callback(album.messages))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        """
+        Passes on the albums gathered so far and waits until they're processed.
+        """
+        for key in list(self._pending):
+            self._flush(key)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
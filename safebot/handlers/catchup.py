@@ -0,0 +1,201 @@
+import asyncio
+import functools
+from typing import AsyncGenerator, cast
+
+from pyrogram import Client
+from pyrogram.errors import FloodWait, RPCError
+from pyrogram.types import Message
+
+from safebot import metrics
+from safebot.detect.scan import Reader
+from safebot.handlers import database, deletion, moderation
+from safebot.handlers.accounts import supervisor
+from safebot.logger import logger
+from safebot.settings import config
+
+# Number of messages in a page of chat history (the maximum allowed by Telegram).
+PAGE_SIZE = 100
+
+
+class Progress:
+    """
+    Remembers the last message received in each chat,
+    and stores them in the database in batches every ``interval`` seconds.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval: float = interval
+
+        # Maps a chat ID to the last message ID, not stored yet.
+        self._pending: dict[int, int] = {}
+        self._task: asyncio.Task | None = None
+
+    def seen(self, client: Client, chat_id: int, message_id: int) -> None:
+        """
+        Registers the message received by the client in the group chat.
+        Message IDs in (basic) groups differ between accounts,
+        so only the messages received by the account acting in the chat are counted.
+        """
+        if len(supervisor.accounts) > 1 and (
+            supervisor.owner_of(chat_id) is not supervisor.account_of(client)
+        ):
+            return
+
+        if message_id > self._pending.get(chat_id, 0):
+            self._pending[chat_id] = message_id
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        await database.save_last_messages(pending)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Unable to save the last processed messages")
+
+
+class CatchUp:
+    """
+    Scans the messages posted while the app was offline, starting from the last
+    processed message of each chat, and deletes the unsafe ones.
+
+    Only ``concurrency`` chats are scanned at once, pausing between pages of history,
+    so the live traffic keeps most of the rate limits.
+    Nothing is sent to the chats, deletions are silent.
+    """
+
+    def __init__(self, concurrency: int, limit: int, page_delay: float) -> None:
+        self.limit: int = limit
+        self.page_delay: float = page_delay
+
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+        self.scanned: int = 0
+        self.deleted: int = 0
+
+    async def run(self) -> None:
+        last_messages = await database.get_last_messages()
+
+        await asyncio.gather(
+            *(self._run_chat(chat_id, last) for chat_id, last in last_messages.items())
+        )
+        logger.info(
+            f"Caught up on {len(last_messages)} chats: {self.scanned} messages scanned, "
+            f"{self.deleted} deleted"
+        )
+
+    async def _run_chat(self, chat_id: int, last_message_id: int) -> None:
+        async with self._semaphore:
+            try:
+                await self.scan_chat(chat_id, last_message_id)
+            except Exception:
+                logger.exception(f"Unable to catch up on the chat ({chat_id=})")
+
+    async def scan_chat(self, chat_id: int, last_message_id: int) -> None:
+        """
+        Scans the history of the chat page by page, from the newest message
+        down to the last processed one (but no more than ``limit`` messages).
+        """
+        client = supervisor.client_for(chat_id)
+        language = (await database.get_settings(chat_id)).language
+        offset_id = 0
+        scanned = 0
+        newest = last_message_id
+
+        while scanned < self.limit:
+            page: list[Message] = []
+
+            try:
+                # Annotated as optional by pyrogram, while it's always a generator.
+                history = cast(
+                    AsyncGenerator[Message, None],
+                    client.get_chat_history(
+                        chat_id,
+                        limit=min(PAGE_SIZE, self.limit - scanned),
+                        offset_id=offset_id,
+                    ),
+                )
+
+                # A page is fetched with a single request.
+                with metrics.api_seconds.time("get_chat_history"):
+                    async for message in history:
+                        if message.id <= last_message_id:
+                            break
+                        page.append(message)
+            except FloodWait as e:
+                logger.warning(f"Catch-up paused for {e.value}s ({chat_id=})")
+                metrics.flood_wait.inc(value=e.value)  # type: ignore
+                await asyncio.sleep(e.value)  # type: ignore
+                continue
+            except RPCError as e:
+                # For example, we have been removed from the chat.
+                logger.warning(f"Unable to read the history ({chat_id=}): {e}")
+                return
+
+            if not page:
+                break
+
+            newest = max(newest, page[0].id)
+            offset_id = page[-1].id
+            scanned += len(page)
+            self._scan(page, language)
+
+            if len(page) < PAGE_SIZE:
+                break
+
+            await asyncio.sleep(self.page_delay)
+
+        self.scanned += scanned
+        progress.seen(client, chat_id, newest)
+
+    def _scan(self, messages: list[Message], language: str | None) -> None:
+        """
+        Scans the bot messages of the page as a batch
+        and queues the unsafe ones for deletion, where they are gathered into batches.
+        """
+        messages = [m for m in messages if m.from_user and m.from_user.is_bot]
+        results = Reader.scan_batch(messages, language=language)
+
+        # Items of an album are deleted along with its unsafe (captioned) item.
+        albums = {
+            m.media_group_id: r
+            for m, r in zip(messages, results)
+            if r.unsafe and m.media_group_id
+        }
+
+        for message, result in zip(messages, results):
+            if not result.unsafe and message.media_group_id in albums:
+                result = albums[message.media_group_id]
+
+            if result.unsafe:
+                self.deleted += 1
+                metrics.ads_detected.inc()
+                deletion.batcher.submit(message.chat.id, message.id).add_done_callback(
+                    functools.partial(_record, message, result.rule)
+                )
+
+
+def _record(message: Message, rule: str | None, future: asyncio.Future[bool]) -> None:
+    deleted = not future.cancelled() and not future.exception() and future.result()
+    moderation.events.add(
+        message.chat.id, message.id, message.from_user.id, "catchup", rule, deleted
+    )
+
+
+progress = Progress(config.progress_flush_interval)
+catch_up = CatchUp(
+    config.catchup_concurrency, config.catchup_limit, config.catchup_page_delay
+)
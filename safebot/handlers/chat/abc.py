@@ -8,8 +8,30 @@ class MessageProtocol(abc.ABC):
         self.chat_id: int = message.chat.id
         self.message_id: int = message.id
         self.from_bot: bool = (message.from_user is not None) and message.from_user.is_bot
+        # Rule matched by the deep scan, set before the processing is queued
+        self.deep_rule: str | None = None
 
         self.message: Message = message
 
+    @property
+    def requires_processing(self) -> bool:
+        """
+        Whether the message has to be processed at all.
+        """
+        return True
+
+    @property
+    def deep_scan_targets(self) -> tuple[str, ...]:
+        """
+        Usernames to be resolved by the deep scan, if the message looks safe.
+        """
+        return ()
+
+    def schedule(self) -> None:
+        """
+        Starts the side effects that don't have to be awaited.
+        Called right after scanning, before the processing is queued.
+        """
+
     @abc.abstractmethod
     async def process(self) -> None: ...
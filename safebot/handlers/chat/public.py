@@ -1,25 +1,94 @@
-from safebot.client import client
-from safebot.detect.scan import Reader
-from safebot.handlers import database
+import asyncio
+from dataclasses import replace
+from time import perf_counter
+from typing import Sequence
+
+from pyrogram.types import Message
+
+from safebot import metrics
+from safebot.audit import verdicts
+from safebot.detect import fingerprint
+from safebot.handlers import database, deletion, moderation, outbound
+from safebot.handlers.accounts import supervisor
 from safebot.handlers.chat.abc import MessageProtocol
 from safebot.handlers.emitter import Emitter
 from safebot.logger import logger
 
 
 class PublicMessage(MessageProtocol):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(
+        self, message: Message, album: Sequence[Message] = (), edited: bool = False
+    ) -> None:
+        """
+        :param album: Items of the album, if the message is one of them.
+            The album is scanned, deleted and reported as a whole.
+        :param edited: Whether the message has been edited,
+            so only the changes are scanned (see ``fingerprint.rescan``).
+        """
+        super().__init__(album[0] if album else message)
+
+        # Scan that found the message unsafe ("quick" or "edit"), unless it's the deep one
+        self.stage: str = "edit" if edited else "quick"
+
+        self.message_ids: list[int] = [m.id for m in album] or [self.message_id]
 
-        self.reader: Reader | None = Reader(self.message) if self.from_bot else None
+        # Identical messages posted recently are not scanned again.
+        self.result: fingerprint.ScanResult | None = None
+
+        if self.from_bot:
+            start = perf_counter()
+            targets: dict[str, None] = {}
+
+            # Only the captions of an album have anything to scan (usually there
+            # is a single one), and the album is reported by its unsafe item.
+            for item in [m for m in album if m.caption] or [self.message]:
+                self.message, self.message_id = item, item.id
+                result = (fingerprint.rescan if edited else fingerprint.scan)(item)
+                targets.update(dict.fromkeys(result.targets))
+
+                if result.unsafe:
+                    break
+            else:
+                # The usernames of all the captions are left to the deep scan.
+                result = replace(result, targets=tuple(targets))
+
+            self.result = result
+            verdicts.record(
+                result.unsafe,
+                stage=self.stage,
+                chat_id=self.chat_id,
+                message_id=self.message_id,
+                sender=self.message.from_user.username,
+                rule=result.rule,
+                scan_ms=round((perf_counter() - start) * 1000, 3),
+            )
+        # Pending deletion, started before the processing is queued.
+        self._deletion: asyncio.Future[list[bool]] | None = None
+
+    @property
+    def requires_processing(self) -> bool:
+        return self.result is not None and self.result.unsafe
+
+    @property
+    def deep_scan_targets(self) -> tuple[str, ...]:
+        return self.result.targets if self.result is not None else ()
+
+    def schedule(self) -> None:
+        # Queue the deletion immediately, so it can be batched with the next
+        # messages of this chat while the previous ones are being processed.
+        # Items of an album are submitted together, so they're deleted at once.
+        self._deletion = asyncio.gather(
+            *(deletion.batcher.submit(self.chat_id, i) for i in self.message_ids)
+        )
 
     async def _delete_message(self) -> bool:
         """
         Deletes message and returns status of whether message has been deleted.
         """
-        deleted = bool(await client.delete_messages(self.chat_id, self.message_id))
-        logger.debug(f"Delete message ({self.message_id=}, {self.chat_id=}): {deleted}")
+        if self._deletion is None:
+            self.schedule()
 
-        return deleted
+        return all(await self._deletion)  # type: ignore
 
     async def _event_message_deleted(self, deleted: bool) -> None:
         """
@@ -38,21 +107,51 @@ class PublicMessage(MessageProtocol):
         Sends a message by completely copying the text
         and replacing links with safe ones.
         """
-        await client.send_message(
+        await outbound.scheduler.submit(
             self.chat_id,
-            self.reader.filter.text,  # type: ignore
-            entities=self.message.entities,
-            disable_web_page_preview=True,
+            outbound.Priority.ECHO,
+            lambda: supervisor.client_for(self.chat_id).send_message(
+                self.chat_id,
+                self.result.text,  # type: ignore
+                entities=self.result.entities,  # type: ignore
+                disable_web_page_preview=True,
+            ),
         )
 
     async def process(self) -> None:
-        if self.reader and self.reader.quick_scan():
+        """
+        Deletes the message found unsafe by either the quick or the deep scan.
+        """
+        if self.result is None:
+            return
+
+        if self.result.unsafe:
             logger.info(
-                f"Advertisement detected during quick scanning ({self.message_id=}, {self.chat_id=})"
+                f"Advertisement detected during {self.stage} scanning ({self.message_id=}, {self.chat_id=})"
             )
-            is_deleted = await self._delete_message()
 
-            if is_deleted and self.reader.is_reply_message:
-                await self._echo_message()
-            else:
-                await self._event_message_deleted(is_deleted)
+        metrics.ads_detected.inc()
+        is_deleted = await self._delete_message()
+
+        for message_id in self.message_ids:
+            moderation.events.add(
+                self.chat_id,
+                message_id,
+                self.message.from_user.id,
+                self.stage if self.result.unsafe else "deep",
+                self.result.rule if self.result.unsafe else self.deep_rule,
+                is_deleted,
+            )
+
+        # Only the quick scan cuts unsafe content out, so there is nothing to echo
+        # after the deep one.
+        if (
+            is_deleted
+            and self.result.unsafe
+            and self.result.echoable
+            and self.result.is_reply_message
+            and await database.is_echo_mode(self.chat_id)
+        ):
+            await self._echo_message()
+        else:
+            await self._event_message_deleted(is_deleted)
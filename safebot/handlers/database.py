@@ -1,26 +1,182 @@
-from peewee_async import IntegrityErrors  # noqa
+from datetime import datetime
+from typing import Any, Iterable
 
+from peewee import EXCLUDED, fn
+
+from safebot import metrics
+from safebot.database.cache import ChatSettings, chat_cache
 from safebot.database.client import manager
-from safebot.database.models import Chat
+from safebot.database.models import Chat, JoinCooldown, JoinRequest, ModerationEvent
+
+
+async def set_account(chat_ids: Iterable[int], account: int) -> None:
+    """
+    Assigns the account to the chats, creating their records if needed.
+    """
+    if rows := [{"t_id": chat_id, "account": account} for chat_id in set(chat_ids)]:
+        with metrics.db_seconds.time("set_account"):
+            await manager.execute(
+                Chat.insert_many(rows).on_conflict(
+                    conflict_target=[Chat.t_id], preserve=[Chat.account]
+                )
+            )
+
+
+async def get_chat_ids() -> list[int]:
+    """
+    Retrieves the IDs of all the moderated chats.
+    """
+    query = Chat.select(Chat.t_id)
+
+    with metrics.db_seconds.time("get_chat_ids"):
+        return [chat.t_id for chat in await manager.execute(query)]
+
+
+async def get_accounts() -> dict[int, int]:
+    """
+    Retrieves the accounts assigned to the chats.
+
+    :return: Maps a Telegram chat ID to the number of the account.
+    """
+    query = Chat.select(Chat.t_id, Chat.account).where(Chat.account.is_null(False))
 
+    with metrics.db_seconds.time("get_accounts"):
+        return {chat.t_id: chat.account for chat in await manager.execute(query)}
+
+
+async def get_last_messages() -> dict[int, int]:
+    """
+    Retrieves the last processed message of every chat.
+
+    :return: Maps a Telegram chat ID to the message ID.
+    """
+    query = Chat.select(Chat.t_id, Chat.last_message_id).where(
+        Chat.last_message_id.is_null(False)
+    )
+
+    with metrics.db_seconds.time("get_last_messages"):
+        return {chat.t_id: chat.last_message_id for chat in await manager.execute(query)}
+
+
+async def save_last_messages(messages: dict[int, int]) -> None:
+    """
+    Stores the last processed messages of the chats with a single query,
+    creating their records if needed. The stored ID never decreases.
+
+    :param messages: Maps a Telegram chat ID to the message ID.
+    """
+    if rows := [{"t_id": c, "last_message_id": m} for c, m in messages.items()]:
+        # EXCLUDED is the row proposed for insertion.
+        last_message_id = fn.GREATEST(
+            Chat.last_message_id, EXCLUDED.last_message_id  # type: ignore
+        )
+
+        with metrics.db_seconds.time("save_last_messages"):
+            await manager.execute(
+                Chat.insert_many(rows).on_conflict(
+                    conflict_target=[Chat.t_id],
+                    update={Chat.last_message_id: last_message_id},
+                )
+            )
+
+
+async def get_settings(chat_id: int) -> ChatSettings:
+    """
+    Retrieves settings of the specified chat.
+    Served from the cache when possible, otherwise the record is fetched
+    (or created) and cached. Safe method.
+    """
+    if (settings := chat_cache.get(chat_id)) is None:
+        with metrics.db_seconds.time("get_settings"):
+            chat = (await manager.get_or_create(Chat, t_id=chat_id))[0]
+        settings = ChatSettings.from_model(chat)
+        chat_cache.put(chat_id, settings)
 
-async def create_or_skip(chat_id: int) -> None:
-    try:
-        await manager.create(Chat, t_id=chat_id)
-    except IntegrityErrors:
-        # Ignore errors if record already exists
-        pass
+    return settings
 
 
 async def is_silent_mode(chat_id: int) -> bool:
     """
     Retrieves silent mode status in the specified chat. Safe method.
     """
-    return (await manager.get_or_create(Chat, t_id=chat_id))[0].silent_mode
+    return (await get_settings(chat_id)).silent_mode
 
 
 async def is_echo_mode(chat_id: int) -> bool:
     """
     Retrieves echo mode status in the specified chat. Safe method.
     """
-    return (await manager.get_or_create(Chat, t_id=chat_id))[0].echo_mode
+    return (await get_settings(chat_id)).echo_mode
+
+
+async def add_join_request(
+    invite_hash: str, url: str, user_id: int, account: int
+) -> None:
+    """
+    Queues the request to join the chat.
+    Repeated requests of the same user are skipped.
+    """
+    query = JoinRequest.insert(
+        invite_hash=invite_hash, url=url, user_id=user_id, account=account
+    ).on_conflict_ignore()
+
+    with metrics.db_seconds.time("add_join_request"):
+        await manager.execute(query)
+
+
+async def next_join_request() -> JoinRequest | None:
+    """
+    Retrieves the oldest request to join a chat.
+    """
+    query = JoinRequest.select().order_by(JoinRequest.id).limit(1)
+
+    with metrics.db_seconds.time("next_join_request"):
+        requests = list(await manager.execute(query))
+
+    return requests[0] if requests else None
+
+
+async def take_join_requests(invite_hash: str) -> list[JoinRequest]:
+    """
+    Removes all requests to join the chat using the invitation hash.
+
+    :return: Removed requests (one per user).
+    """
+    # A single statement, so that a request added meanwhile is either taken
+    # or left for the next time, but never deleted unanswered.
+    query = (
+        JoinRequest.delete()
+        .where(JoinRequest.invite_hash == invite_hash)
+        .returning(JoinRequest)
+    )
+
+    with metrics.db_seconds.time("take_join_requests"):
+        requests = list(await manager.execute(query))
+
+    return requests
+
+
+async def get_join_cooldowns() -> dict[int, datetime]:
+    """
+    Retrieves the time until which the accounts aren't allowed to join chats.
+    """
+    with metrics.db_seconds.time("get_join_cooldowns"):
+        return {c.account: c.until for c in await manager.execute(JoinCooldown.select())}
+
+
+async def set_join_cooldown(account: int, until: datetime) -> None:
+    query = JoinCooldown.insert(account=account, until=until).on_conflict(
+        conflict_target=[JoinCooldown.account], preserve=[JoinCooldown.until]
+    )
+
+    with metrics.db_seconds.time("set_join_cooldown"):
+        await manager.execute(query)
+
+
+async def add_moderation_events(rows: list[dict[str, Any]]) -> None:
+    """
+    Stores the moderation events with a single multi-row query.
+    """
+    if rows:
+        with metrics.db_seconds.time("add_moderation_events"):
+            await manager.execute(ModerationEvent.insert_many(rows))
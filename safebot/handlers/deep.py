@@ -0,0 +1,215 @@
+import asyncio
+from time import monotonic
+from typing import Iterable
+
+from pyrogram import Client
+from pyrogram.enums import ChatType
+from pyrogram.errors import FloodWait, RPCError
+
+from safebot import metrics
+from safebot.audit import verdicts
+from safebot.detect import link, lists, rules
+from safebot.handlers.accounts import supervisor
+from safebot.handlers.chat.abc import MessageProtocol
+from safebot.handlers.outbound import TokenBucket
+from safebot.handlers.pipeline import pipeline
+from safebot.logger import logger
+from safebot.lru import LRUCache
+from safebot.settings import config
+
+# Kind of the username that isn't occupied by anyone.
+KIND_MISSING = "missing"
+
+
+class DeepScanner:
+    """
+    Checks the messages that passed the quick scan outside the hot path,
+    by resolving the referenced usernames to learn what they lead to
+    (a bot, a channel, a user, etc.)
+
+    Usernames are resolved by the account acting in the chat of the message,
+    so the flood limits of all the accounts are used.
+    Resolution requests are limited both in number of simultaneous requests
+    and in rate, while their results are cached, since the same targets
+    are advertised over and over. ``FloodWait`` pauses all resolutions
+    of the account.
+    A message found unsafe is queued to the pipeline to be processed.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int,
+        rate: float,
+        burst: int,
+        max_pending: int,
+        cache_size: int,
+        cache_ttl: float | None,
+    ) -> None:
+        self.max_pending: int = max_pending
+
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        self._bucket: TokenBucket = TokenBucket(rate, burst)
+        # Maps a client to the time its resolutions are resumed after FloodWait.
+        self._resume_at: dict[Client, float] = {}
+
+        # Maps a username to its kind.
+        self.kinds: LRUCache[str, str] = LRUCache(cache_size, cache_ttl)
+        # Resolutions in progress, awaited by all the checks of the same username.
+        self._resolving: dict[str, asyncio.Future[str]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+        self.skipped: int = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, instance: MessageProtocol, targets: Iterable[str]) -> None:
+        """
+        Starts the deep scan of the message without waiting.
+        If too many messages are waiting, the message is skipped.
+        """
+        if len(self._tasks) >= self.max_pending:
+            self.skipped += 1
+            return
+
+        task = asyncio.create_task(self._scan(instance, tuple(targets)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+        logger.info(
+            f"Deep scan: {self.skipped} messages skipped, resolved usernames: {self.kinds}"
+        )
+
+    async def _scan(self, instance: MessageProtocol, targets: tuple[str, ...]) -> None:
+        try:
+            start = monotonic()
+            rule = await self.check(instance.chat_id, targets)
+
+            verdicts.record(
+                rule is not None,
+                stage="deep",
+                chat_id=instance.chat_id,
+                message_id=instance.message_id,
+                targets=targets,
+                rule=rule,
+                scan_ms=round((monotonic() - start) * 1000, 3),
+            )
+
+            if rule:
+                logger.info(
+                    f"Advertisement detected during deep scanning ({rule=}, "
+                    f"{instance.message_id=}, {instance.chat_id=})"
+                )
+                instance.deep_rule = rule
+                instance.schedule()
+                await pipeline.put(instance.chat_id, instance.process)
+        except Exception:
+            logger.exception("Deep scan failed")
+
+    async def check(self, chat_id: int, targets: Iterable[str]) -> str | None:
+        """
+        Matches the usernames against the deep rules of Telegram links,
+        resolving them when their path isn't enough.
+
+        :param chat_id: Chat of the message, whose account resolves the usernames.
+
+        :return: Name of the first matched rule, or ``None`` if they are safe.
+        """
+        if not (checks := link.Scanner.table.get(link.DOMAIN_TG_SHORT)):
+            return None
+
+        deep = checks.deep
+        unresolved: list[str] = []
+
+        for username in targets:
+            if (listed := lists.check(username)) is not None:
+                if listed:
+                    return rules.RULE_BLOCKLIST
+                continue
+            elif username in deep.allow:
+                continue
+            elif rule := deep.match(username):
+                return rule
+            unresolved.append(username)
+
+        if not deep.kinds:
+            return None
+
+        kinds = await asyncio.gather(*(self.resolve(u, chat_id) for u in unresolved))
+        return rules.RULE_KIND if deep.kinds.intersection(kinds) else None
+
+    async def resolve(self, username: str, chat_id: int) -> str:
+        """
+        Learns the kind of the username: "bot", "private" (a user), "channel",
+        "supergroup" or ``KIND_MISSING``.
+        Concurrent calls for the same username share a single request.
+        """
+        if (kind := self.kinds.get(username)) is not None:
+            return kind
+
+        if (future := self._resolving.get(username)) is None:
+            future = asyncio.ensure_future(
+                self._resolve(username, supervisor.client_for(chat_id))
+            )
+            self._resolving[username] = future
+            future.add_done_callback(lambda _: self._resolving.pop(username, None))
+
+        return await asyncio.shield(future)
+
+    async def _resolve(self, username: str, client: Client) -> str:
+        async with self._semaphore:
+            while True:
+                if (delay := self._resume_at.get(client, 0.0) - monotonic()) > 0:
+                    await asyncio.sleep(delay)
+
+                await self._bucket.acquire()
+
+                try:
+                    with metrics.api_seconds.time("resolve"):
+                        chat = await client.get_chat(username)
+                except FloodWait as e:
+                    logger.warning(f"Deep scan paused for {e.value}s ({client.name=})")
+                    metrics.flood_wait.inc(value=e.value)  # type: ignore
+                    self._resume_at[client] = monotonic() + e.value  # type: ignore
+                    continue
+                except (RPCError, KeyError, ValueError) as e:
+                    # Username isn't occupied, or it's invalid
+                    logger.debug(f"Unable to resolve @{username}: {e}")
+                    kind = KIND_MISSING
+                else:
+                    kind = ChatType(chat.type).name.lower()
+
+                self.kinds.put(username, kind)
+                return kind
+
+
+engine = DeepScanner(
+    concurrency=config.deep_scan_concurrency,
+    rate=config.deep_scan_rate,
+    burst=config.deep_scan_burst,
+    max_pending=config.deep_scan_max_pending,
+    cache_size=config.deep_scan_cache_size,
+    cache_ttl=config.deep_scan_cache_ttl,
+)
+
+metrics.Gauge(
+    "safebot_deep_scan_pending",
+    "Messages waiting for the deep scan",
+    lambda: engine.pending,
+)
+metrics.Gauge(
+    "safebot_deep_scan_skipped",
+    "Messages skipped due to overload",
+    lambda: engine.skipped,
+)
+metrics.Gauge(
+    "safebot_deep_scan_cache_hit_ratio",
+    "Share of usernames not resolved again",
+    lambda: engine.kinds.hit_rate,
+)
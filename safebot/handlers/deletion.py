@@ -0,0 +1,124 @@
+import asyncio
+from dataclasses import dataclass, field
+
+from safebot import metrics
+from safebot.handlers import outbound
+from safebot.handlers.accounts import supervisor
+from safebot.logger import debug_enabled, logger
+from safebot.settings import config
+
+
+@dataclass
+class _Batch:
+    # Messages waiting for deletion and the futures of their handlers
+    ids: list[int] = field(default_factory=list)
+    futures: list[asyncio.Future] = field(default_factory=list)
+    # Task that will send the batch when the window expires
+    timer: asyncio.Task | None = None
+
+
+class DeletionBatcher:
+    """
+    Coalesces deletions in the same chat into a single request.
+
+    Messages are gathered during ``window`` seconds (or until ``max_size``
+    is reached) and deleted at once. Each handler receives its own result.
+    """
+
+    def __init__(self, window: float, max_size: int) -> None:
+        self.window: float = window
+        self.max_size: int = max_size
+
+        # Maps a chat ID to the messages waiting for deletion.
+        self._pending: dict[int, _Batch] = {}
+
+    async def delete(self, chat_id: int, message_id: int) -> bool:
+        """
+        Queues the message for deletion and waits until the batch is sent.
+
+        :return: Whether the message has been deleted.
+        """
+        return await self.submit(chat_id, message_id)
+
+    def submit(self, chat_id: int, message_id: int) -> asyncio.Future[bool]:
+        """
+        Queues the message for deletion without waiting.
+
+        :return: Future resolved with whether the message has been deleted.
+        """
+        future = asyncio.get_running_loop().create_future()
+
+        batch = self._pending.setdefault(chat_id, _Batch())
+        batch.ids.append(message_id)
+        batch.futures.append(future)
+
+        if len(batch.ids) >= self.max_size:
+            self._send_now(chat_id)
+        elif batch.timer is None:
+            batch.timer = asyncio.create_task(self._send_later(chat_id, self.window))
+
+        return future
+
+    def _take(self, chat_id: int) -> _Batch:
+        """
+        Removes up to ``max_size`` messages of the chat from the queue.
+        The rest remain and will be sent after the window.
+        """
+        batch = self._pending.pop(chat_id)
+
+        if batch.timer is not None and batch.timer is not asyncio.current_task():
+            batch.timer.cancel()
+
+        if len(batch.ids) > self.max_size:
+            self._pending[chat_id] = rest = _Batch(
+                batch.ids[self.max_size :], batch.futures[self.max_size :]
+            )
+            rest.timer = asyncio.create_task(self._send_later(chat_id, self.window))
+
+        return _Batch(batch.ids[: self.max_size], batch.futures[: self.max_size])
+
+    def _send_now(self, chat_id: int) -> None:
+        asyncio.create_task(self._send(chat_id, self._take(chat_id)))
+
+    async def _send_later(self, chat_id: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._send(chat_id, self._take(chat_id))
+
+    async def _send(self, chat_id: int, batch: _Batch) -> None:
+        """
+        Deletes the batch of messages and resolves the futures.
+
+        Telegram returns only the number of affected messages.
+        It's zero when we aren't allowed to delete, while a partial result means
+        that some messages had already been deleted by someone else,
+        so any non-zero result is considered a success for the whole batch.
+        """
+        try:
+            # The scheduler retries the request after FloodWait itself.
+            deleted = bool(
+                await outbound.scheduler.submit(
+                    chat_id,
+                    outbound.Priority.DELETE,
+                    lambda: supervisor.client_for(chat_id).delete_messages(
+                        chat_id, batch.ids
+                    ),
+                )
+            )
+        except Exception as e:
+            metrics.deletions.inc("error", value=len(batch.ids))
+
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if debug_enabled():
+            logger.debug(f"Delete messages ({batch.ids=}, {chat_id=}): {deleted}")
+        metrics.deletions.inc("deleted" if deleted else "failed", value=len(batch.ids))
+
+        for future in batch.futures:
+            if not future.done():
+                future.set_result(deleted)
+
+
+batcher = DeletionBatcher(config.delete_batch_window, config.delete_batch_size)
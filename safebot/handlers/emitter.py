@@ -1,83 +1,112 @@
-from plate import Plate
+from pyrogram.enums import ChatType
 from pyrogram.types import Message
 
-from safebot.client import client
-from safebot.logger import logger
+from safebot import localization
+from safebot.handlers import database, outbound
+from safebot.handlers.accounts import supervisor
 
 
 class Emitter:
-    localizator: Plate
-
     def __init__(self, message: Message) -> None:
         self.message: Message = message
 
     @staticmethod
-    def prepare_text(key: str, **kwargs) -> str:
+    def prepare_text(key: str, language: str | None = None, **kwargs) -> str:
         """
-        Retrieves a text from the locale's dictionary using the specified key.
+        Retrieves a text from the compiled locales using the specified key.
 
         :param key: Locale key;
+        :param language: Language code (the default one if not set or unknown);
         :param kwargs: Named arguments to interpolate text.
         :return: Localized text
         """
-        # TODO: one language is temporarily solution.
-        return Emitter.localizator(key, "en_US", **kwargs)
+        return localization.locales.format(key, language, **kwargs)
+
+    async def _get_language(self) -> str | None:
+        """
+        Retrieves the language chosen in the chat.
+        Private chats have no settings, so the default language is used.
+        """
+        if self.message.chat.type == ChatType.PRIVATE:
+            return None
+
+        return (await database.get_settings(self.message.chat.id)).language
+
+    async def _send_now(self, text: str, *, reply: bool = False) -> None:
+        # Private chats are answered by the account that received the message.
+        client = (
+            self.message._client
+            if self.message.chat.type == ChatType.PRIVATE and self.message._client
+            else supervisor.client_for(self.message.chat.id)
+        )
+        await client.send_message(
+            self.message.chat.id,
+            text,
+            reply_to_message_id=self.message.id if reply else None,  # type: ignore
+        )
 
     async def send(self, key: str, *, reply: bool = False, **fmt) -> None:
         """
         Sends a message with the localized text to the chat.
+        The message is a notice, so it may be dropped if the chat is overloaded.
 
         :param key: Locale key;
         :param reply: Whether this message will be a reply;
         :param fmt: Named arguments to interpolate text.
         """
-        await client.send_message(
+        language = await self._get_language()
+
+        await outbound.scheduler.submit(
             self.message.chat.id,
-            self.prepare_text(key, **fmt),
-            reply_to_message_id=self.message.id if reply else None,  # type: ignore
+            outbound.Priority.NOTICE,
+            lambda: self._send_now(self.prepare_text(key, language, **fmt), reply=reply),
         )
 
     async def send_delete_message(self, deleted: bool) -> None:
         """
         Sends a different info message based on the ``deleted`` argument.
+        Deletion notices waiting to be sent are merged into a single one.
 
         :param deleted: Whether the message was deleted.
         """
-        if deleted:
-            await self.send("message_deleted", mention=self.message.from_user.mention)
-        else:
+        if not deleted:
             await self.send("not_enough_rights", reply=True)
+            return
 
+        mention = self.message.from_user.mention
+        language = await self._get_language()
 
-def _decode_plate_exception(exc: ValueError) -> str:
-    """
-    Since Plate doesn't have its own exceptions,
-    it is necessary to check for the specific type of error for proper information.
+        await outbound.scheduler.notify(
+            self.message.chat.id,
+            "message_deleted",
+            lambda count: self._send_now(
+                self.prepare_text("message_deleted", language, mention=mention)
+                if count == 1
+                else self.prepare_text("messages_deleted", language, count=count)
+            ),
+        )
 
-    Essentially, this method only formats the error text,
-    which contains all supported language codes (others will be returned unchanged).
-    This error occurs when a file with an incorrect code appears in locales directory.
 
-    :param exc: Plate exception.
-    :return: Formatted to string error text.
+async def send_private(user_id: int, account: int, key: str, **fmt) -> None:
     """
-    # We know that the description of the error comes before the sentence starting
-    # with "Possible" (method: Plate._check_valid_locale)
-    return (t := str(exc))[: i - 1 if (i := t.find("Possible")) != -1 else None]
+    Sends a notice with the localized text to the user,
+    on behalf of the account that received the user's message.
 
+    :param user_id: Telegram user ID;
+    :param account: Number of the account;
+    :param key: Locale key;
+    :param fmt: Named arguments to interpolate text.
+    """
+    accounts = supervisor.accounts
+    client = (accounts[account] if account < len(accounts) else supervisor.primary).client
 
-def _init_localizator() -> None:
-    try:
-        Emitter.localizator = Plate()
-    except ValueError as e:
-        logger.critical(f"Unable to load locales: {_decode_plate_exception(e)}")
-        exit(1)
+    await outbound.scheduler.submit(
+        user_id,
+        outbound.Priority.NOTICE,
+        lambda: client.send_message(user_id, Emitter.prepare_text(key, **fmt)),
+    )
 
 
 def init() -> None:
-    _init_localizator()
-
-    language_codes = Emitter.localizator.locales.keys()
-    logger.info(
-        f"{len(language_codes)} locales initialized: ({', '.join(language_codes)})"
-    )
+    if not localization.reload():
+        exit(1)
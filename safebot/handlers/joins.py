@@ -0,0 +1,179 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from pyrogram.errors import FloodWait, InviteHashExpired, UserAlreadyParticipant
+from pyrogram.types import Chat
+
+from safebot import metrics
+from safebot.database.models import JoinRequest
+from safebot.handlers import database, emitter
+from safebot.handlers.accounts import Account, supervisor
+from safebot.logger import logger
+from safebot.lru import LRUCache
+from safebot.settings import config
+
+
+@dataclass(frozen=True, slots=True)
+class Invite:
+    # Whether we are in the chat, otherwise the link is invalid
+    valid: bool
+
+
+class JoinQueue:
+    """
+    Joins chats using the invitation links sent in private messages.
+
+    Requests are stored in the database, so they survive restarts, and the requests
+    with the same invitation hash are served by a single join.
+    A single worker joins chats one by one with an ``interval`` between them.
+    ``FloodWait`` is stored as the cooldown of the account, which is respected
+    after restarts as well.
+
+    The outcome of each invitation is cached, so repeated links are answered
+    without requests to Telegram.
+    """
+
+    def __init__(self, interval: float, cache_size: int, cache_ttl: float | None) -> None:
+        self.interval: float = interval
+
+        # Maps an invitation hash to its outcome.
+        self.invites: LRUCache[str, Invite] = LRUCache(cache_size, cache_ttl)
+        # Maps the index of the account to the time until which it can't join.
+        self.cooldowns: dict[int, datetime] = {}
+
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self.cooldowns = await database.get_join_cooldowns()
+        self._worker = asyncio.create_task(self._work())
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+
+    async def submit(
+        self, invite_hash: str, url: str, user_id: int, account: Account
+    ) -> str | None:
+        """
+        Queues the request to join the chat, unless the outcome is already known.
+
+        :return: Locale key of the known outcome, or ``None`` if queued.
+        """
+        if (invite := self.invites.get(invite_hash)) is not None:
+            return _outcome(invite)
+
+        await database.add_join_request(invite_hash, url, user_id, account.index)
+        self._wakeup.set()
+
+        return None
+
+    def _available(self) -> Account | None:
+        """
+        The least loaded account which is allowed to join chats.
+        """
+        now = datetime.now()
+        accounts = [
+            a for a in supervisor.accounts if self.cooldowns.get(a.index, now) <= now
+        ]
+
+        return supervisor.least_loaded(accounts) if accounts else None
+
+    async def _work(self) -> None:
+        while True:
+            # Cleared beforehand, so a request added meanwhile isn't missed.
+            self._wakeup.clear()
+
+            try:
+                if (request := await database.next_join_request()) is None:
+                    await self._wakeup.wait()
+                    continue
+
+                if (account := self._available()) is None:
+                    delay = min(self.cooldowns.values()) - datetime.now()
+                    await asyncio.sleep(max(delay.total_seconds(), 0))
+                    continue
+
+                await self._process(request, account)
+            except Exception:
+                logger.exception("Join queue failed")
+
+            await asyncio.sleep(self.interval)
+
+    async def _process(self, request: JoinRequest, account: Account) -> None:
+        try:
+            key = await self._join(request, account)
+        except FloodWait as e:
+            # This happens when we entered or attempted to enter a chat too frequently.
+            # Normally, the cooldown lasts form 5 to 20 minutes.
+            # The request stays in the queue until it's over.
+            logger.warning(f"Account #{account.index} can't join chats for {e.value}s")
+            metrics.flood_wait.inc(value=e.value)  # type: ignore
+            supervisor.pause(account, e.value)  # type: ignore
+
+            until = datetime.now() + timedelta(seconds=e.value)  # type: ignore
+            self.cooldowns[account.index] = until
+            await database.set_join_cooldown(account.index, until)
+            return
+        except Exception:
+            # It's not necessary for the user to know about an unknown error.
+            # But it will be very helpful for debugging.
+            logger.exception(f"Unable to join the chat ({request.url=})")
+            key = None
+
+        for r in await database.take_join_requests(request.invite_hash):
+            if key is not None:
+                await emitter.send_private(r.user_id, r.account, key)
+
+    async def _join(self, request: JoinRequest, account: Account) -> str | None:
+        """
+        Attempts to join the chat using the invitation link.
+
+        :return: Locale key of the outcome to inform the users about,
+            or ``None`` if the chat has been joined.
+        """
+        client = account.client
+
+        try:
+            # Doing this to protect ourselves from unnecessary failed requests.
+            # This helps reduce the likelihood of temporary restrictions.
+            with metrics.api_seconds.time("get_chat"):
+                preview = await client.get_chat(request.url)
+
+            # If we are in the chat, an instance of `Chat` will be returned.
+            # Otherwise, `ChatPreview` is returned.
+            if isinstance(preview, Chat):
+                raise UserAlreadyParticipant()
+
+            with metrics.api_seconds.time("join_chat"):
+                chat = await client.join_chat(request.url)
+        except UserAlreadyParticipant:
+            invite = Invite(valid=True)
+        except InviteHashExpired:
+            # Actually, this error occurs not only when the link is invalid.
+            # It also happens if the bot failed to enter the chat due to some problem.
+            # For example, if it's banned from the chat.
+            invite = Invite(valid=False)
+        else:
+            await supervisor.claim(chat.id, account)
+            logger.info(f"Joined the chat: {chat.title} ({chat.id=})")
+            # Further links to the chat are answered as if we are already in it.
+            self.invites.put(request.invite_hash, Invite(valid=True))
+            return None
+
+        self.invites.put(request.invite_hash, invite)
+        return _outcome(invite)
+
+
+def _outcome(invite: Invite) -> str:
+    return "already_in_chat" if invite.valid else "invite_link_expired"
+
+
+queue = JoinQueue(config.join_interval, config.join_cache_size, config.join_cache_ttl)
+
+metrics.Gauge(
+    "safebot_invite_cache_hit_ratio",
+    "Share of invitations answered without requests",
+    lambda: queue.invites.hit_rate,
+)
@@ -0,0 +1,163 @@
+import asyncio
+from datetime import datetime
+from typing import Any
+
+from safebot import metrics
+from safebot.database.models import ModerationEvent
+from safebot.database.partitions import DailyPartitions
+from safebot.handlers import database
+from safebot.logger import logger
+from safebot.settings import config
+
+# Interval (in seconds) between the maintenance of partitions.
+MAINTENANCE_INTERVAL = 3600.0
+
+
+class EventWriter:
+    """
+    Write-behind log of the moderation actions: what has been deleted and why.
+
+    Events are buffered in memory and stored with a multi-row insert
+    every ``interval`` seconds or as soon as ``batch_size`` events are gathered,
+    so the handlers never wait for the database. If it's unavailable,
+    at most ``max_pending`` events are kept, and the newer ones are dropped.
+    The buffer is flushed on shutdown.
+
+    The table is partitioned by day, and partitions older than the retention
+    period are dropped (see ``DailyPartitions``).
+    """
+
+    def __init__(
+        self, interval: float, batch_size: int, max_pending: int, retention: int
+    ) -> None:
+        self.interval: float = interval
+        self.batch_size: int = batch_size
+        self.max_pending: int = max_pending
+
+        self.partitions: DailyPartitions = DailyPartitions(ModerationEvent, retention)
+
+        self._pending: list[dict[str, Any]] = []
+        self._full: asyncio.Event = asyncio.Event()
+        # Set on shutdown, so that the flusher stops after the batch being written.
+        self._closing: bool = False
+        self._flusher: asyncio.Task | None = None
+        self._maintainer: asyncio.Task | None = None
+
+        self.dropped: int = 0
+
+    def add(
+        self,
+        chat_id: int,
+        message_id: int,
+        sender_id: int | None,
+        stage: str,
+        rule: str | None,
+        deleted: bool,
+    ) -> None:
+        """
+        Buffers the event without waiting.
+
+        :param stage: Scan that found the message ("quick", "edit", "deep" or "catchup").
+        """
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+
+        self._pending.append(
+            {
+                "chat_id": chat_id,
+                "message_id": message_id,
+                "sender_id": sender_id,
+                "stage": stage,
+                "rule": rule,
+                "deleted": deleted,
+                "created_at": datetime.now(),
+            }
+        )
+
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    async def start(self) -> None:
+        await self.partitions.maintain()
+        self._flusher = asyncio.create_task(self._flush_periodically())
+        self._maintainer = asyncio.create_task(self._maintain_periodically())
+
+    async def close(self) -> None:
+        self._closing = True
+        self._full.set()
+
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+
+        # The batch being written is completed rather than cancelled.
+        await asyncio.gather(
+            *(t for t in (self._flusher, self._maintainer) if t is not None),
+            return_exceptions=True,
+        )
+
+        while self._pending:
+            if not await self.flush():
+                break
+
+        if self.dropped:
+            logger.warning(f"{self.dropped} moderation events dropped")
+
+    async def flush(self) -> bool:
+        """
+        Stores a batch of the buffered events.
+        On failure, the events are put back to be retried by the next flush.
+
+        :return: Whether the batch has been stored.
+        """
+        batch = self._pending[: self.batch_size]
+        del self._pending[: self.batch_size]
+
+        try:
+            await database.add_moderation_events(batch)
+        except Exception:
+            logger.exception(f"Unable to store {len(batch)} moderation events")
+            self._pending[:0] = batch
+            return False
+        except BaseException:
+            # Cancelled, so the batch is left to the next flush.
+            self._pending[:0] = batch
+            raise
+
+        return True
+
+    async def _flush_periodically(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._full.clear()
+
+            # A backlog gathered during an outage is written in several batches.
+            while self._pending and not self._closing and await self.flush():
+                pass
+
+    async def _maintain_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+
+            try:
+                await self.partitions.maintain()
+            except Exception:
+                logger.exception("Unable to maintain partitions of moderation events")
+
+
+events = EventWriter(
+    config.moderation_flush_interval,
+    config.moderation_batch_size,
+    config.moderation_max_pending,
+    config.moderation_retention_days,
+)
+
+metrics.Gauge(
+    "safebot_moderation_events_pending",
+    "Moderation events waiting to be stored",
+    lambda: len(events._pending),
+)
@@ -0,0 +1,272 @@
+import asyncio
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from enum import IntEnum
+from time import monotonic
+from typing import Any, Awaitable, Callable
+
+from pyrogram.errors import FloodWait
+
+from safebot import metrics
+from safebot.handlers.accounts import Supervisor, supervisor
+from safebot.logger import logger
+from safebot.settings import config
+
+
+class Priority(IntEnum):
+    # The lower the value, the sooner the request is sent
+    DELETE = 0
+    ECHO = 1
+    NOTICE = 2
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` requests per second on average,
+    and up to ``capacity`` requests in a burst.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate: float = rate
+        self.capacity: int = capacity
+
+        self._tokens: float = capacity
+        self._updated: float = monotonic()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """
+        Waits until a token is available and takes it.
+        """
+        while True:
+            self._refill()
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    # Keeps the order of jobs with the same priority
+    seq: int
+    # Receives the number of merged jobs
+    call: Callable[[int], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    # Pending jobs with the same key are merged into one
+    merge_key: str | None = field(default=None, compare=False)
+    count: int = field(default=1, compare=False)
+    # Futures of the jobs merged into this one
+    merged: list[asyncio.Future] = field(default_factory=list, compare=False)
+
+    def resolve(self, result: Any = None, exc: BaseException | None = None) -> None:
+        for future in (self.future, *self.merged):
+            if future.done():
+                continue
+            elif exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+@dataclass
+class _ChatQueue:
+    jobs: list[_Job] = field(default_factory=list)
+    worker: asyncio.Task | None = None
+
+
+class Scheduler:
+    """
+    Single point for all outbound requests to Telegram.
+
+    Each chat has its own queue, served in the order of priority and limited by
+    both the chat and the global rate. ``FloodWait`` pauses only the queue of the
+    chat in which it occurred. When a queue is full, notices are dropped.
+
+    With the ``supervisor``, the global rate is applied to each account separately,
+    and it is informed about ``FloodWait`` to hand the chats over if needed.
+    """
+
+    def __init__(
+        self,
+        *,
+        global_rate: float,
+        global_burst: int,
+        chat_rate: float,
+        chat_burst: int,
+        max_queue: int,
+        supervisor: Supervisor | None = None,
+    ) -> None:
+        self.global_rate: float = global_rate
+        self.global_burst: int = global_burst
+        self.chat_rate: float = chat_rate
+        self.chat_burst: int = chat_burst
+        self.max_queue: int = max_queue
+        self.supervisor: Supervisor | None = supervisor
+
+        # Maps the index of the account to its global rate limit.
+        self._global: dict[int, TokenBucket] = {}
+        # Rate limits are kept even when the chat queue is gone.
+        self._buckets: dict[int, TokenBucket] = {}
+        self._queues: dict[int, _ChatQueue] = {}
+        self._seq = itertools.count()
+
+        self.dropped: int = 0
+        self.merged: int = 0
+
+    async def submit(
+        self, chat_id: int, priority: Priority, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Queues the request and waits for its result.
+        """
+        return await self._enqueue(chat_id, priority, lambda _: call(), None)
+
+    async def notify(
+        self, chat_id: int, key: str, call: Callable[[int], Awaitable[Any]]
+    ) -> Any:
+        """
+        Queues the notice. If a notice with the same key is still waiting
+        in this chat, they are merged and ``call`` receives their number.
+        If the queue is full, the notice is dropped (``None`` is returned).
+        """
+        return await self._enqueue(chat_id, Priority.NOTICE, call, key)
+
+    def _enqueue(
+        self,
+        chat_id: int,
+        priority: Priority,
+        call: Callable[[int], Awaitable[Any]],
+        merge_key: str | None,
+    ) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(chat_id, _ChatQueue())
+
+        if merge_key is not None and (pending := self._find(queue, merge_key)):
+            pending.count += 1
+            pending.call = call
+            pending.merged.append(future)
+            self.merged += 1
+            return future
+
+        job = _Job(priority, next(self._seq), call, future, merge_key)
+
+        if len(queue.jobs) >= self.max_queue and not self._make_room(queue, job):
+            self.dropped += 1
+            future.set_result(None)
+            return future
+
+        heapq.heappush(queue.jobs, job)
+
+        if queue.worker is None:
+            queue.worker = asyncio.create_task(self._work(chat_id, queue))
+
+        return future
+
+    @staticmethod
+    def _find(queue: _ChatQueue, merge_key: str) -> _Job | None:
+        for job in queue.jobs:
+            if job.merge_key == merge_key:
+                return job
+
+        return None
+
+    def _make_room(self, queue: _ChatQueue, job: _Job) -> bool:
+        """
+        Drops the latest notice from the full queue, unless the new job is a notice
+        itself. Other requests are never dropped and may exceed the limit.
+
+        :return: Whether the job may be queued.
+        """
+        if job.priority == Priority.NOTICE:
+            return False
+
+        notices = [j for j in queue.jobs if j.priority == Priority.NOTICE]
+
+        if notices:
+            latest = max(notices, key=lambda j: j.seq)
+            queue.jobs.remove(latest)
+            heapq.heapify(queue.jobs)
+            latest.resolve(None)
+            self.dropped += 1
+
+        return True
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        if (bucket := self._buckets.get(chat_id)) is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+
+        return bucket
+
+    def _global_bucket(self, chat_id: int) -> TokenBucket:
+        """
+        Global rate limit of the account acting in the chat.
+        """
+        owner = self.supervisor.owner_of(chat_id) if self.supervisor else None
+        index = owner.index if owner is not None else 0
+
+        if (bucket := self._global.get(index)) is None:
+            bucket = self._global[index] = TokenBucket(
+                self.global_rate, self.global_burst
+            )
+
+        return bucket
+
+    async def _work(self, chat_id: int, queue: _ChatQueue) -> None:
+        """
+        Serves the chat queue until it is empty.
+        """
+        bucket = self._bucket(chat_id)
+
+        while queue.jobs:
+            await bucket.acquire()
+            # Looked up every time, since the chat may be handed over to another account.
+            await self._global_bucket(chat_id).acquire()
+
+            job = heapq.heappop(queue.jobs)
+
+            try:
+                with metrics.api_seconds.time(Priority(job.priority).name.lower()):
+                    result = await job.call(job.count)
+            except FloodWait as e:
+                logger.warning(f"Chat queue paused for {e.value}s ({chat_id=})")
+                metrics.flood_wait.inc(value=e.value)  # type: ignore
+                if self.supervisor is not None:
+                    self.supervisor.flood_wait(chat_id, e.value)  # type: ignore
+                heapq.heappush(queue.jobs, job)
+                await asyncio.sleep(e.value)  # type: ignore
+            except Exception as e:
+                job.resolve(exc=e)
+            else:
+                job.resolve(result)
+
+        del self._queues[chat_id]
+
+
+scheduler = Scheduler(
+    global_rate=config.outbound_global_rate,
+    global_burst=config.outbound_global_burst,
+    chat_rate=config.outbound_chat_rate,
+    chat_burst=config.outbound_chat_burst,
+    max_queue=config.outbound_max_queue,
+    supervisor=supervisor,
+)
+
+metrics.Gauge(
+    "safebot_notices_dropped",
+    "Notices dropped due to overload",
+    lambda: scheduler.dropped,
+)
+metrics.Gauge(
+    "safebot_notices_merged", "Notices merged into a single one", lambda: scheduler.merged
+)
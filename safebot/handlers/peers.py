@@ -0,0 +1,138 @@
+import asyncio
+from typing import cast
+
+from pyrogram import Client, raw, utils
+from pyrogram.errors import RPCError
+
+from safebot import metrics
+from safebot.handlers import database
+from safebot.handlers.accounts import supervisor
+from safebot.logger import logger
+from safebot.session import LeanFileStorage
+from safebot.settings import config
+
+# Number of dialogs in a page (the maximum allowed by Telegram).
+PAGE_SIZE = 100
+
+
+async def prefetch(client: Client, chat_ids: set[int]) -> set[int]:
+    """
+    Stores the peers of the chats in bulk, by pages of dialogs,
+    rather than resolving each of them on first use.
+    Paging stops as soon as all the chats are found.
+
+    :return: IDs of the chats found.
+    """
+    remaining = set(chat_ids)
+    offset_date, offset_id = 0, 0
+    offset_peer: raw.base.InputPeer = raw.types.InputPeerEmpty()
+
+    while remaining:
+        # The peers of the response are stored by the client itself.
+        with metrics.api_seconds.time("get_dialogs"):
+            r = await client.invoke(
+                raw.functions.messages.GetDialogs(
+                    offset_date=offset_date,
+                    offset_id=offset_id,
+                    offset_peer=offset_peer,
+                    limit=PAGE_SIZE,
+                    hash=0,
+                ),
+                sleep_threshold=60,
+            )
+        dialogs = [d for d in r.dialogs if isinstance(d, raw.types.Dialog)]
+
+        for dialog in dialogs:
+            remaining.discard(utils.get_peer_id(dialog.peer))
+
+        if not isinstance(r, raw.types.messages.DialogsSlice) or not dialogs:
+            # All the dialogs have been received.
+            break
+
+        last = dialogs[-1]
+        last_id = utils.get_peer_id(last.peer)
+        dates = {
+            (utils.get_peer_id(m.peer_id), m.id): m.date
+            for m in r.messages
+            if not isinstance(m, raw.types.MessageEmpty)
+        }
+
+        offset_id = last.top_message
+        offset_date = dates.get((last_id, last.top_message), 0)
+        # A peer ID always resolves to an input peer.
+        offset_peer = cast(raw.base.InputPeer, await client.resolve_peer(last_id))
+
+    return chat_ids - remaining
+
+
+class PeerKeeper:
+    """
+    Keeps the sessions of the accounts lean (see ``LeanFileStorage``).
+
+    On startup, the moderated chats of each account are pinned in its storage
+    and their peers are prefetched. Then the unused peers are evicted
+    every ``interval`` seconds.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval: float = interval
+
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def storages() -> list[tuple[Client, LeanFileStorage]]:
+        return [
+            (a.client, a.client.storage)
+            for a in supervisor.accounts
+            if isinstance(a.client.storage, LeanFileStorage)
+        ]
+
+    async def prefetch(self) -> None:
+        chat_ids = await database.get_chat_ids()
+
+        for client, storage in self.storages():
+            # Chats without an owner are served by the main account.
+            owned = {c for c in chat_ids if supervisor.client_for(c) is client}
+            storage.pinned = owned
+
+            try:
+                found = await prefetch(client, owned)
+            except RPCError:
+                logger.exception(f"Unable to prefetch peers ({client.name=})")
+                continue
+
+            logger.info(
+                f"Peers of {len(found)}/{len(owned)} chats prefetched ({client.name=})"
+            )
+
+    def prune(self) -> None:
+        for client, storage in self.storages():
+            if evicted := storage.prune():
+                logger.info(f"{evicted} peers evicted ({client.name=})")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+        # Written out while the storages are still open.
+        self.prune()
+
+    async def _run(self) -> None:
+        try:
+            await self.prefetch()
+        except Exception:
+            logger.exception("Unable to prefetch peers")
+
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                self.prune()
+            except Exception:
+                logger.exception("Unable to evict peers")
+
+
+keeper = PeerKeeper(config.session_prune_interval)
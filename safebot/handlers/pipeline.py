@@ -0,0 +1,132 @@
+import asyncio
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Awaitable, Callable
+
+from safebot import metrics
+from safebot.logger import logger
+from safebot.settings import config
+
+_Job = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class _Chat:
+    # Serializes the jobs of the chat. Locks are fair, so the jobs run in order.
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Jobs of the chat waiting or running
+    jobs: int = 0
+
+
+class Pipeline:
+    """
+    Runs side effects of the message handlers (deletion, database lookups,
+    echo messages and notices) outside the pyrogram workers.
+
+    Every job runs in its own task, and the jobs of a chat are serialized
+    by the lock of the chat, so they are executed in order, while a chat waiting
+    for a long time (e.g. after FloodWait) doesn't delay the others
+    beyond taking one of the ``consumers`` running jobs at once.
+    When ``max_size`` jobs are pending, ``put`` waits, slowing down the producer
+    (backpressure).
+    """
+
+    def __init__(self, consumers: int, max_size: int) -> None:
+        self.consumers: int = consumers
+        self.max_size: int = max_size
+
+        # Maps a chat ID to the chat with pending jobs.
+        self._chats: dict[int, _Chat] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._slots: asyncio.Semaphore | None = None
+        self._running: asyncio.Semaphore | None = None
+
+        # Time jobs spend in the queue before being executed.
+        self.processed: int = 0
+        self.wait_total: float = 0.0
+        self.wait_max: float = 0.0
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of jobs waiting or running.
+        """
+        return len(self._tasks)
+
+    @property
+    def wait_avg(self) -> float:
+        return self.wait_total / self.processed if self.processed else 0.0
+
+    def start(self) -> None:
+        self._slots = asyncio.Semaphore(self.max_size)
+        self._running = asyncio.Semaphore(self.consumers)
+
+    async def close(self) -> None:
+        """
+        Waits for the queued jobs to complete.
+        """
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        logger.info(
+            f"Pipeline: {self.processed} jobs, "
+            f"wait avg {self.wait_avg * 1000:.1f}ms, max {self.wait_max * 1000:.1f}ms"
+        )
+
+    async def put(self, chat_id: int, job: _Job) -> None:
+        """
+        Queues the job of the chat, waiting for free space if needed.
+        """
+        slots: asyncio.Semaphore = self._slots  # type: ignore
+
+        if slots.locked():
+            logger.warning(f"Pipeline is full, applying backpressure ({chat_id=})")
+
+        await slots.acquire()
+
+        chat = self._chats.setdefault(chat_id, _Chat())
+        chat.jobs += 1
+
+        task = asyncio.create_task(self._run(chat_id, chat, monotonic(), job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, chat_id: int, chat: _Chat, queued_at: float, job: _Job) -> None:
+        try:
+            # Taken in the order of the chat, so a consumer never waits for the lock.
+            async with chat.lock, self._running:  # type: ignore
+                wait = monotonic() - queued_at
+                self.processed += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+
+                try:
+                    await job()
+                except Exception:
+                    logger.exception("Pipeline job failed")
+        finally:
+            chat.jobs -= 1
+
+            if not chat.jobs:
+                del self._chats[chat_id]
+
+            self._slots.release()  # type: ignore
+
+
+pipeline = Pipeline(config.pipeline_consumers, config.pipeline_queue_size)
+
+metrics.Gauge(
+    "safebot_pipeline_depth",
+    "Jobs waiting or running in the pipeline",
+    lambda: pipeline.depth,
+)
+metrics.Gauge(
+    "safebot_pipeline_wait_seconds_avg",
+    "Average time jobs wait",
+    lambda: pipeline.wait_avg,
+)
+metrics.Gauge(
+    "safebot_pipeline_wait_seconds_max",
+    "Maximum time jobs wait",
+    lambda: pipeline.wait_max,
+)
@@ -0,0 +1,99 @@
+from typing import Any, Awaitable, Callable, cast
+
+from pyrogram import Client, raw, utils
+from pyrogram.dispatcher import Dispatcher
+from pyrogram.handlers import RawUpdateHandler
+from pyrogram.types import Message
+
+from safebot import metrics
+from safebot.handlers.catchup import progress
+from safebot.settings import config
+
+_Callback = Callable[[Client, Message], Awaitable[None]]
+
+# New messages, except the scheduled ones (they are never sent by other users).
+_NEW_MESSAGE_UPDATES = (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)
+_EDIT_MESSAGE_UPDATES = (raw.types.UpdateEditMessage, raw.types.UpdateEditChannelMessage)
+
+skipped = metrics.Counter(
+    "safebot_prescreen_skipped_total", "Updates skipped without parsing the message"
+)
+
+
+def is_candidate(message: raw.base.Message, users: dict[int, Any]) -> bool:
+    """
+    Decides by the raw message whether it may require processing,
+    without building the ``Message`` object (resolving the chat, sender, reply, etc.)
+
+    In private chats, any message with entities may contain an invitation link.
+    In groups, only bot messages with entities or inline buttons are scanned,
+    and the items of albums, which are deleted along with the captioned one.
+    With the plain text scan, any bot message with text (or a caption) is scanned,
+    since links and mentions may be written without entities.
+    The sender missing from the users map is treated as a possible bot.
+    """
+    if not isinstance(message, raw.types.Message):
+        # Service or empty messages
+        return False
+
+    if isinstance(message.peer_id, raw.types.PeerUser):
+        return bool(message.entities)
+
+    if not (
+        message.entities
+        or message.grouped_id
+        or isinstance(message.reply_markup, raw.types.ReplyInlineMarkup)
+        or (config.plain_text_scan and message.message)
+    ):
+        return False
+
+    if not isinstance(sender := message.from_id, raw.types.PeerUser):
+        # Anonymous admins and channels
+        return False
+
+    user = users.get(sender.user_id)
+    return user is None or bool(user.bot)
+
+
+def install(client: Client, callback: _Callback, edited_callback: _Callback) -> None:
+    """
+    Replaces the parsing of new and edited messages by the dispatcher
+    with a raw handler, so that only the candidates are parsed and passed
+    to the ``callback`` (or the ``edited_callback``).
+    """
+    dispatcher: Dispatcher = client.dispatcher
+    # Built by the tuples of the update types, then keyed by every type of them.
+    parsers = cast(dict[type, Any], dispatcher.update_parsers)
+
+    for update_type in _NEW_MESSAGE_UPDATES + _EDIT_MESSAGE_UPDATES:
+        # Without a parser, the update is only passed to the raw handlers.
+        parsers.pop(update_type, None)
+
+    async def handler(client: Client, update: Any, users: dict, chats: dict) -> None:
+        if isinstance(update, _EDIT_MESSAGE_UPDATES):
+            if is_candidate(update.message, users):
+                message = await Message._parse(client, update.message, users, chats)
+                await edited_callback(client, message)
+            else:
+                skipped.inc()
+
+            return
+
+        if not isinstance(update, _NEW_MESSAGE_UPDATES):
+            return
+
+        if not is_candidate(update.message, users):
+            skipped.inc()
+
+            # Skipped messages still advance the restart catch-up.
+            if isinstance(update.message, raw.types.Message) and not isinstance(
+                peer := update.message.peer_id, raw.types.PeerUser
+            ):
+                progress.seen(client, utils.get_peer_id(peer), update.message.id)
+
+            return
+
+        message = await Message._parse(client, update.message, users, chats)
+        await callback(client, message)
+
+    client.add_handler(RawUpdateHandler(handler))
@@ -0,0 +1,168 @@
+import asyncio
+import os
+from string import Formatter
+
+from plate import Plate
+
+from safebot.logger import logger
+from safebot.settings import config
+
+# Delimits the plural forms of a phrase (the same as in Plate).
+PLURAL_SEPARATOR = "|"
+
+
+class Template:
+    """
+    Phrase, prepared to be formatted without parsing the locale again.
+    Plural forms are selected by the ``count`` argument:
+    the first one for 0, the second for 1 and the last one for the rest.
+    """
+
+    __slots__ = ("forms",)
+
+    def __init__(self, phrase: str) -> None:
+        self.forms: tuple[str, ...] = tuple(
+            form.strip() for form in phrase.split(PLURAL_SEPARATOR)
+        )
+
+    def format(self, **kwargs) -> str:
+        form = self.forms[0]
+
+        if len(self.forms) > 1 and (count := kwargs.get("count")) is not None:
+            form = self.forms[min(count, len(self.forms) - 1)]
+
+        return form.format(**kwargs)
+
+
+class Locales:
+    """
+    Phrases of all languages, compiled once.
+    Phrases without arguments are stored as ready texts,
+    the rest are stored as templates.
+    Missing languages are replaced with the default one.
+    """
+
+    def __init__(self, phrases: dict[str, dict[str, str]], default: str) -> None:
+        self.default: str = default
+        self.texts: dict[str, dict[str, str]] = {}
+        self.templates: dict[str, dict[str, Template]] = {}
+
+        for language, data in phrases.items():
+            texts = self.texts[language] = {}
+            templates = self.templates[language] = {}
+
+            for key, phrase in data.items():
+                if _has_fields(phrase):
+                    templates[key] = Template(phrase)
+                else:
+                    texts[key] = phrase
+
+    @property
+    def languages(self) -> list[str]:
+        return list(self.texts)
+
+    def text(self, key: str, language: str | None = None) -> str:
+        """
+        Retrieves the phrase that takes no arguments.
+
+        :raise KeyError: If the phrase doesn't exist or takes arguments.
+        """
+        return self.texts.get(language or self.default, self.texts[self.default])[key]
+
+    def format(self, key: str, language: str | None = None, **kwargs) -> str:
+        """
+        Retrieves the phrase and interpolates the arguments into it.
+
+        :raise KeyError: If the phrase doesn't exist or an argument is missing.
+        """
+        language = language if language in self.texts else self.default
+
+        if (template := self.templates[language].get(key)) is None:
+            return self.texts[language][key]
+
+        return template.format(**kwargs)
+
+
+def _has_fields(phrase: str) -> bool:
+    return PLURAL_SEPARATOR in phrase or any(
+        field is not None for _, field, _, _ in Formatter().parse(phrase)
+    )
+
+
+def _decode_plate_exception(exc: ValueError) -> str:
+    """
+    Since Plate doesn't have its own exceptions,
+    it is necessary to check for the specific type of error for proper information.
+
+    Essentially, this method only formats the error text,
+    which contains all supported language codes (others will be returned unchanged).
+    This error occurs when a file with an incorrect code appears in locales directory.
+
+    :param exc: Plate exception.
+    :return: Formatted to string error text.
+    """
+    # We know that the description of the error comes before the sentence starting
+    # with "Possible" (method: Plate._check_valid_locale)
+    return (t := str(exc))[: i - 1 if (i := t.find("Possible")) != -1 else None]
+
+
+def compile_locales(path: str, default: str) -> Locales:
+    """
+    Reads the locale files (validated by Plate) and compiles them.
+
+    :raise ValueError: If the locales are malformed.
+    """
+    try:
+        plate = Plate(root=path, locale=default)
+    except (ValueError, KeyError, OSError) as e:
+        message = _decode_plate_exception(e) if isinstance(e, ValueError) else str(e)
+        raise ValueError(message) from e
+
+    return Locales({code: data for code, (_, data) in plate.locales.items()}, default)
+
+
+# Compiled phrases, replaced as a whole on reload.
+locales: Locales = Locales({config.default_language: {}}, config.default_language)
+
+
+def reload() -> bool:
+    """
+    Compiles the locale files and atomically replaces the current phrases.
+    If the files are broken, the current phrases are kept.
+
+    :return: Whether the phrases were replaced.
+    """
+    global locales
+
+    try:
+        locales = compile_locales(config.locales_path, config.default_language)
+    except ValueError as e:
+        logger.error(f"Unable to load locales: {e}")
+        return False
+
+    logger.info(
+        f"{len(locales.languages)} locales initialized: ({', '.join(locales.languages)})"
+    )
+    return True
+
+
+async def watch() -> None:
+    """
+    Reloads the locales every time any of the files is modified.
+    """
+    mtime = _get_locales_mtime()
+
+    while True:
+        await asyncio.sleep(config.locales_reload_interval)
+
+        if (current := _get_locales_mtime()) != mtime:
+            mtime = current
+            reload()
+
+
+def _get_locales_mtime() -> tuple[float, ...]:
+    try:
+        with os.scandir(config.locales_path) as entries:
+            return tuple(sorted(e.stat().st_mtime for e in entries))
+    except OSError:
+        return ()
@@ -7,8 +7,39 @@ from safebot.settings import config
 
 LOG_LEVEL = logging.INFO if config.production else logging.DEBUG
 
+# Records with this extra key belong to the verdict log (see ``safebot.audit``).
+VERDICT_KEY = "verdict"
+
 logger = loguru.logger
 
-# setup log level
-logger.remove(0)
-logger.add(sys.stderr, level=LOG_LEVEL)
+_debug: bool = False
+
+
+def setup(level: int | str) -> None:
+    """
+    Writes the log to stderr through a queue, handled by a separate thread,
+    so that logging never blocks the event loop.
+    """
+    global _debug
+
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        level=level,
+        enqueue=True,
+        filter=lambda record: VERDICT_KEY not in record["extra"],
+    )
+    _debug = (level if isinstance(level, int) else logger.level(level).no) <= (
+        logging.DEBUG
+    )
+
+
+def debug_enabled() -> bool:
+    """
+    Whether debug messages are written.
+    Hot paths check it first, so the message isn't formatted in vain.
+    """
+    return _debug
+
+
+setup(LOG_LEVEL)
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Bounded in-memory cache.
+    The least recently used entries are evicted when the size limit is reached,
+    and (if ``ttl`` is set) every entry expires after ``ttl`` seconds.
+    By default the lifetime counts from storing, while a ``sliding`` cache
+    counts it from the last access.
+    """
+
+    def __init__(
+        self, maxsize: int, ttl: float | None = None, *, sliding: bool = False
+    ) -> None:
+        self.maxsize: int = maxsize
+        self.ttl: float | None = ttl
+        self.sliding: bool = sliding
+
+        # Maps a key to the value and the moment it expires.
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        """
+        Retrieves the value if it is present and not expired.
+        """
+        if (entry := self._data.get(key)) is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+
+        if expires_at <= (now := monotonic()):
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        if self.sliding:
+            self._data[key] = (value, self._expires_at(now))
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _expires_at(self, now: float) -> float:
+        return now + self.ttl if self.ttl is not None else float("inf")
+
+    def put(self, key: K, value: V) -> None:
+        """
+        Stores the value, evicting the least recently used entry if necessary.
+        """
+        self._data[key] = (value, self._expires_at(monotonic()))
+        self._data.move_to_end(key)
+
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Share of lookups served from memory.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.1%}), "
+            f"{self.evictions} evictions"
+        )
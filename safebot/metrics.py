@@ -0,0 +1,188 @@
+import asyncio
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Generator
+
+from safebot.logger import logger
+from safebot.settings import config
+
+# Upper bounds (in seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
+_Labels = tuple[str, ...]
+
+# All the registered metrics, in the order of registration.
+_registry: list["_Metric"] = []
+
+
+def _format_labels(names: _Labels, values: _Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    kind: str
+
+    def __init__(self, name: str, description: str, labels: _Labels = ()) -> None:
+        self.name: str = name
+        self.description: str = description
+        self.labels: _Labels = labels
+
+        _registry.append(self)
+
+    @abstractmethod
+    def _samples(self) -> Generator[str, None, None]:
+        """
+        Yields the lines of the samples.
+        """
+
+    def render(self) -> str:
+        """
+        Renders the metric in the Prometheus text format.
+        """
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[_Labels, float] = {}
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def _samples(self) -> Generator[str, None, None]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value}"
+
+
+class Gauge(_Metric):
+    """
+    Value is read from the callback at the moment of rendering.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, description: str, callback: Callable[[], float]
+    ) -> None:
+        super().__init__(name, description)
+        self.callback: Callable[[], float] = callback
+
+    def _samples(self) -> Generator[str, None, None]:
+        yield f"{self.name} {self.callback()}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, *args, buckets: tuple[float, ...] = LATENCY_BUCKETS, **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets: tuple[float, ...] = buckets
+
+        # Maps labels to the (non-cumulative) bucket counts, sum and count.
+        self._values: dict[_Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if (state := self._values.get(labels)) is None:
+            # The last bucket is "+Inf".
+            state = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+
+        counts, total = state
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Generator[None, None, None]:
+        """
+        Observes the time spent in the block.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, *labels)
+
+    def _samples(self) -> Generator[str, None, None]:
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = _format_labels(self.labels, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {total[0]}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}"
+
+
+def render() -> str:
+    return "\n".join(m.render() for m in _registry) + "\n"
+
+
+messages = Counter(
+    "safebot_messages_total", "Messages routed by type of chat", ("chat_type",)
+)
+ads_detected = Counter("safebot_ads_detected_total", "Messages with advertising")
+edits = Counter("safebot_edits_total", "Edited bot messages rescanned")
+deletions = Counter("safebot_deletions_total", "Deleted messages by result", ("result",))
+flood_wait = Counter("safebot_flood_wait_seconds_total", "Seconds of FloodWait received")
+
+scan_seconds = Histogram("safebot_scan_seconds", "Duration of the quick scan")
+db_seconds = Histogram("safebot_db_query_seconds", "Duration of queries", ("query",))
+api_seconds = Histogram(
+    "safebot_telegram_request_seconds", "Duration of Telegram requests", ("request",)
+)
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Minimal HTTP handler: any request receives the metrics.
+    """
+    try:
+        await reader.readuntil(b"\r\n\r\n")
+        body = render().encode()
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/plain; version=0.0.4\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+            b"Connection: close\r\n\r\n" + body
+        )
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def init() -> asyncio.Server | None:
+    """
+    Starts the metrics endpoint (if enabled).
+    """
+    if config.metrics_port is None:
+        return None
+
+    server = await asyncio.start_server(_handle, config.metrics_host, config.metrics_port)
+    logger.info(
+        f"Metrics available at http://{config.metrics_host}:{config.metrics_port}"
+    )
+
+    return server
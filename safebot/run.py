@@ -1,10 +1,69 @@
-from safebot import handlers
-from safebot.client import client
+import asyncio
+from contextlib import AsyncExitStack
+
+from pyrogram import idle
+
+from safebot import audit, handlers, localization, metrics
+from safebot.client import client, clients
+from safebot.database import cache
 from safebot.detect import link
-from safebot.handlers import emitter
+from safebot.handlers import deep, emitter, joins, moderation
+from safebot.handlers.catchup import catch_up, progress
+from safebot.handlers.accounts import supervisor
+from safebot.handlers.peers import keeper
+from safebot.handlers.pipeline import pipeline
+from safebot.logger import logger
+
+
+async def main() -> None:
+    await cache.init()
+    await supervisor.load()
+    metrics_server = await metrics.init()
+    watchers = [
+        asyncio.create_task(link.watch()),
+        asyncio.create_task(localization.watch()),
+    ]
+    await moderation.events.start()
+    pipeline.start()
+
+    async with AsyncExitStack() as stack:
+        for account_client in clients:
+            await stack.enter_async_context(account_client)
+
+        # Pending joins are resumed once the accounts are connected.
+        await joins.queue.start()
+        # Messages posted while offline are scanned in the background.
+        catching_up = asyncio.create_task(catch_up.run())
+        progress.start()
+        # Peers of the moderated chats are prefetched, then the unused ones evicted.
+        keeper.start()
+        await idle()
+        catching_up.cancel()
+        joins.queue.close()
+        # Complete the queued processing while the clients are still connected.
+        await handlers.album_buffer.close()
+        await deep.engine.close()
+        await pipeline.close()
+        await progress.close()
+        keeper.close()
+
+    await moderation.events.close()
+
+    for watcher in watchers:
+        watcher.cancel()
+
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+
+    await cache.close()
+    # Write out the queued log records.
+    await logger.complete()
+
 
+audit.init()
 link.init()
 emitter.init()
 handlers.init()
 
-client.run()
+client.run(main())
@@ -0,0 +1,114 @@
+import sqlite3
+import time
+from pathlib import Path
+
+from pyrogram.storage import FileStorage
+
+# Eviction picks the least recently used peers.
+_LAST_UPDATE_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_peers_last_update_on ON peers (last_update_on)"
+)
+
+
+class LeanFileStorage(FileStorage):
+    """
+    Session file of pyrogram whose table of peers (users and chats with their
+    access hashes) is kept bounded.
+
+    An account in large groups sees countless users, and the default storage
+    keeps every one of them forever, while the file is vacuumed on every startup.
+    Here, peers which haven't been stored or looked up for ``max_age`` seconds
+    are evicted by ``prune``, as well as the least recently used ones
+    beyond ``max_peers``. The ``pinned`` peers (e.g. the moderated chats)
+    are never evicted.
+
+    Lookups are only remembered in memory and written out by ``prune``,
+    so they stay read-only, and their time is precise to the pruning interval.
+    """
+
+    def __init__(self, name: str, workdir: Path, max_peers: int, max_age: float) -> None:
+        super().__init__(name, workdir)
+
+        self.max_peers: int = max_peers
+        self.max_age: float = max_age
+
+        # IDs of the peers never evicted
+        self.pinned: set[int] = set()
+        # IDs of the peers looked up since the last pruning
+        self._used: set[int] = set()
+
+    async def open(self) -> None:
+        file_exists = self.database.is_file()
+        self.conn = sqlite3.connect(
+            str(self.database), timeout=1, check_same_thread=False
+        )
+
+        if not file_exists:
+            self.create()
+        else:
+            self.update()
+
+        with self.conn:
+            self.conn.execute(_LAST_UPDATE_INDEX)
+            # Overwrites the time of any update with the current one,
+            # while ``prune`` sets it explicitly.
+            self.conn.execute("DROP TRIGGER IF EXISTS trg_peers_last_update_on")
+
+        # After a long downtime every peer is stale, so only the limit is enforced
+        # until the pinned peers are known.
+        self.prune(evict_stale=False)
+
+        # Vacuuming rewrites the whole file,
+        # so it's only worth it once most of the pages are free.
+        free_pages = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        if free_pages * 2 > self.conn.execute("PRAGMA page_count").fetchone()[0]:
+            self.conn.execute("VACUUM")
+
+    async def get_peer_by_id(self, peer_id: int):
+        peer = await super().get_peer_by_id(peer_id)
+        self._used.add(peer_id)
+        return peer
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM peers").fetchone()[0]
+
+    def prune(self, evict_stale: bool = True) -> int:
+        """
+        Marks the peers used since the last pruning (and the pinned ones)
+        as recently updated, then evicts the stale ones
+        and the least recently used ones beyond the limit.
+
+        :param evict_stale: Whether to evict the peers unused for ``max_age`` seconds.
+        :return: Number of evicted peers.
+        """
+        now = int(time.time())
+        used, self._used = self._used | self.pinned, set()
+
+        with self.conn:
+            self.conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS used (id INTEGER PRIMARY KEY)"
+            )
+            self.conn.execute("DELETE FROM used")
+            self.conn.executemany("INSERT INTO used VALUES (?)", ((i,) for i in used))
+            self.conn.execute(
+                "UPDATE peers SET last_update_on = ? WHERE id IN (SELECT id FROM used)",
+                (now,),
+            )
+            evicted = 0
+
+            if evict_stale:
+                evicted += self.conn.execute(
+                    "DELETE FROM peers WHERE last_update_on < ?", (now - self.max_age,)
+                ).rowcount
+
+            if (excess := self.count() - self.max_peers) > 0:
+                # The time is precise to a second, so the used peers are excluded
+                # explicitly rather than by the order.
+                evicted += self.conn.execute(
+                    "DELETE FROM peers WHERE id IN (SELECT id FROM peers "
+                    "WHERE id NOT IN (SELECT id FROM used) ORDER BY last_update_on LIMIT ?)",
+                    (excess,),
+                ).rowcount
+
+        return evicted
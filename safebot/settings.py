@@ -8,10 +8,132 @@ class _Settings(BaseSettings):
     # @username that will be specified when replacing unsafe links
     username: str = ""
 
+    # JSON file with domain rules used by the link scanner
+    link_rules_path: str = "rules/links.json"
+    # Interval (in seconds) between checks of the rules file for changes
+    link_rules_reload_interval: float = 5.0
+    # Blocklist and allowlist of usernames and domains, reloaded with the rules.
+    # Built from text lists with "python -m safebot.detect.lists" (optional)
+    blocklist_path: str = "rules/blocklist.idx"
+    allowlist_path: str = "rules/allowlist.idx"
+    # Number of link verdicts kept in memory, and their lifetime in seconds
+    # (unlimited if not set)
+    link_cache_size: int = 4096
+    link_cache_ttl: float | None = None
+
+    # File of the structured verdict log (JSON lines) used to audit false positives,
+    # disabled if not set. Share of the safe and unsafe verdicts written,
+    # the size at which the file is rotated and the number of rotated files kept
+    verdict_log_path: str | None = None
+    verdict_log_sample_safe: float = 0.01
+    verdict_log_sample_unsafe: float = 1.0
+    verdict_log_rotation: str = "50 MB"
+    verdict_log_retention: int = 5
+
+    # Moderation events (what has been deleted and why) are buffered and stored
+    # every number of seconds or once the batch is gathered. Events beyond the limit
+    # are dropped while the database is unavailable. The table is partitioned by day,
+    # and the partitions older than the number of days are dropped
+    moderation_flush_interval: float = 1.0
+    moderation_batch_size: int = 500
+    moderation_max_pending: int = 50_000
+    moderation_retention_days: int = 30
+
+    # Directory with the locale files, reloaded on change (same as the link rules),
+    # and the language used in chats which haven't chosen one
+    locales_path: str = "locales"
+    locales_reload_interval: float = 5.0
+    default_language: str = "en_US"
+
+    # Look for links and mentions written as plain text, without entities
+    # (including obfuscated ones, e.g. "t . me/ads_bot")
+    plain_text_scan: bool = True
+
+    # Number of scanned messages remembered to skip rescanning of the same message,
+    # and the time (in seconds) since its last occurrence after which it's forgotten
+    fingerprint_cache_size: int = 1024
+    fingerprint_window: float = 60.0
+    # Recently scanned bot messages whose edits are checked incrementally
+    # (only the added links and mentions), and for how long (in seconds)
+    edit_cache_size: int = 20_000
+    edit_window: float = 3600.0
+
+    # Deep scan of the messages which passed the quick one: referenced usernames are
+    # resolved to learn whether they lead to a bot, channel, etc. (see "deep" rules)
+    deep_scan: bool = False
+    # Limits of resolution requests: simultaneous, per second and in a burst
+    deep_scan_concurrency: int = 4
+    deep_scan_rate: float = 0.5
+    deep_scan_burst: int = 5
+    # Number of messages waiting for the deep scan, after which new ones are skipped
+    deep_scan_max_pending: int = 1000
+    # Number of resolved usernames kept in memory, and their lifetime in seconds
+    deep_scan_cache_size: int = 10_000
+    deep_scan_cache_ttl: float | None = 86400.0
+
+    # Number of jobs (processing of unsafe messages) running at once,
+    # and the number of jobs pending, after which new messages wait.
+    # Chats are processed in parallel, each one in order.
+    pipeline_consumers: int = 8
+    pipeline_queue_size: int = 1000
+    # Skip parsing of the messages that can't require processing
+    # (e.g. sent by users in groups), judging by the raw updates
+    prescreen_updates: bool = True
+
+    # The last processed message of each chat is stored every number of seconds.
+    # After restart, the messages posted while offline are scanned, in a number of chats
+    # at once, but no more than the limit per chat, pausing between pages of history
+    progress_flush_interval: float = 10.0
+    catchup_concurrency: int = 2
+    catchup_limit: int = 1000
+    catchup_page_delay: float = 1.0
+
+    # Deletions in the same chat are gathered for this number of seconds
+    # (or until the batch size is reached) and sent as a single request
+    delete_batch_window: float = 0.5
+    delete_batch_size: int = 100
+    # Items of an album sent by a bot are gathered for this number of seconds
+    # (or until it's complete) to be scanned, deleted and reported at once
+    album_window: float = 1.0
+    # Albums gathered at once, the oldest one is processed early to make room
+    album_max_pending: int = 1000
+    # Limits of outbound requests (per second and in a burst), globally and per chat
+    outbound_global_rate: float = 20.0
+    outbound_global_burst: int = 30
+    outbound_chat_rate: float = 1.0
+    outbound_chat_burst: int = 5
+    # Number of requests waiting in a chat, after which notices are dropped
+    outbound_max_queue: int = 20
+
+    # Address of the local endpoint serving metrics in Prometheus format
+    # (disabled if the port isn't set)
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int | None = 9100
+
     # Telegram data
     api_id: int
     api_hash: str
     phone_number: str
+    # Session storage of the accounts: "lean" evicts the peers (users and chats)
+    # unused for a while (see "session_*" settings), "file" is the default of pyrogram
+    session_storage: str = "lean"
+    # Peers kept in the session of each account, and the time (in seconds)
+    # after which the unused ones are evicted
+    session_max_peers: int = 100_000
+    session_peer_ttl: float = 7 * 24 * 3600.0
+    # Seconds between evictions of the peers
+    session_prune_interval: float = 3600.0
+    # Additional accounts sharing the chats (and the rate limits) with the main one,
+    # as a JSON list, e.g. ["+10000000000"]
+    extra_phone_numbers: list[str] = []
+    # FloodWait (in seconds) after which the chats of the account are taken over
+    # by the other accounts present in them
+    account_rebalance_flood_wait: float = 300.0
+    # Seconds between joining chats by invitation links (one at a time),
+    # and the number of invitation outcomes kept in memory with their lifetime
+    join_interval: float = 30.0
+    join_cache_size: int = 1024
+    join_cache_ttl: float | None = 3600.0
 
     # Database
     postgres_host: str
@@ -19,6 +141,15 @@ class _Settings(BaseSettings):
     postgres_user: str
     postgres_password: str
     postgres_db: str
+    # Bounds of the connection pool shared by all handlers
+    postgres_pool_min: int = 1
+    postgres_pool_max: int = 10
+
+    # Chat settings cache
+    # Maximum number of chats kept in memory
+    chat_cache_size: int = 10_000
+    # Seconds after which cached settings are reloaded from the database
+    chat_cache_ttl: float = 3600.0
 
 
 config = _Settings()
@@ -0,0 +1,81 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from pyrogram.errors import ChannelPrivate
+
+from safebot.handlers import accounts
+
+
+@pytest.fixture(autouse=True)
+def database(monkeypatch: pytest.MonkeyPatch) -> mock.AsyncMock:
+    set_account = mock.AsyncMock()
+    monkeypatch.setattr(accounts.database, "set_account", set_account)
+    return set_account
+
+
+def make_supervisor(count: int) -> accounts.Supervisor:
+    clients = [mock.Mock(get_chat=mock.AsyncMock()) for _ in range(count)]
+    return accounts.Supervisor(clients, rebalance_after=60)
+
+
+def test_preferred_owner(database: mock.AsyncMock) -> None:
+    """
+    The chat should belong to the account chosen by its ID, if it's present there,
+    and only the owner should process the messages.
+    """
+    supervisor = make_supervisor(2)
+    first, second = (a.client for a in supervisor.accounts)
+
+    async def main() -> list[bool]:
+        return [
+            await supervisor.acquire(first, 3),
+            await supervisor.acquire(second, 3),
+        ]
+
+    assert asyncio.run(main()) == [False, True]
+    database.assert_awaited_once_with((3,), 1)
+
+
+def test_receiver_owner() -> None:
+    """
+    The chat should belong to the account which received the message,
+    if the preferred one isn't present there.
+    """
+    supervisor = make_supervisor(2)
+    first, second = (a.client for a in supervisor.accounts)
+    second.get_chat.side_effect = ChannelPrivate()
+
+    assert asyncio.run(supervisor.acquire(first, 3))
+    assert supervisor.client_for(3) is first
+
+
+def test_least_loaded() -> None:
+    supervisor = make_supervisor(3)
+    supervisor.owners = {1: 0, 2: 0, 3: 1}
+    supervisor.accounts[0].owned = 2
+    supervisor.accounts[1].owned = 1
+    supervisor.pause(supervisor.accounts[2], 60)
+
+    assert supervisor.least_loaded() is supervisor.accounts[1]
+
+
+def test_rebalance(database: mock.AsyncMock) -> None:
+    """
+    Chats of the restricted account should be handed over to the accounts present
+    in them.
+    """
+    supervisor = make_supervisor(2)
+    supervisor._set_owner(1, 0)
+    supervisor._set_owner(2, 0)
+    supervisor.members = {1: {0, 1}, 2: {0}}
+
+    async def main() -> None:
+        supervisor.flood_wait(1, 600)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    assert supervisor.owners == {1: 1, 2: 0}
+    assert supervisor.accounts[0].paused
+    database.assert_awaited_once_with([1], 1)
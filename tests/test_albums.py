@@ -0,0 +1,110 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from safebot.detect.scan import ScanResult
+from safebot.handlers import albums
+from safebot.handlers.chat import public
+
+
+def make_item(
+    message_id: int, group: str = "1", chat_id: int = -100, caption: str | None = None
+) -> mock.Mock:
+    message = mock.Mock(id=message_id, media_group_id=group, caption=caption)
+    message.chat.id = chat_id
+    message.from_user.is_bot = True
+    return message
+
+
+def run_buffer(items: list[mock.Mock], wait: float, **kwargs) -> list[list[int]]:
+    """
+    Adds the items to the buffer and returns the IDs of the albums passed on
+    after ``wait`` seconds.
+    """
+    received: list[list[int]] = []
+
+    async def callback(messages: list[mock.Mock]) -> None:
+        received.append([m.id for m in messages])
+
+    async def main() -> None:
+        options = {"window": 0.05, "max_pending": 10, **kwargs}
+        buffer = albums.AlbumBuffer(callback=callback, **options)
+
+        for item in items:
+            buffer.add(item)
+
+        await asyncio.sleep(wait)
+
+    asyncio.run(main())
+    return received
+
+
+def test_window() -> None:
+    """
+    Items should be grouped by the chat and the album.
+    """
+    items = [make_item(2), make_item(1), make_item(3, chat_id=-200), make_item(4, "2")]
+
+    assert run_buffer(items, wait=0) == []
+    assert sorted(run_buffer(items, wait=0.1)) == [[1, 2], [3], [4]]
+
+
+def test_complete() -> None:
+    """
+    A complete album shouldn't wait for the window.
+    """
+    items = [make_item(i) for i in range(albums.MAX_ALBUM_SIZE)]
+
+    assert run_buffer(items, wait=0.01, window=60) == [list(range(albums.MAX_ALBUM_SIZE))]
+
+
+def test_max_pending() -> None:
+    """
+    The oldest album should be passed on to make room for a new one.
+    """
+    items = [make_item(1, "1"), make_item(2, "2"), make_item(3, "1")]
+
+    assert run_buffer(items, wait=0.01, window=60, max_pending=1) == [[1], [2]]
+
+
+def test_public_album(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    The album should be scanned by its caption and deleted as a whole.
+    """
+    scan = mock.Mock(return_value=ScanResult(True, False, "", [], rule="url"))
+    monkeypatch.setattr(public.fingerprint, "scan", scan)
+    submit = mock.Mock(side_effect=lambda *_: asyncio.sleep(0, result=True))
+    monkeypatch.setattr(public.deletion.batcher, "submit", submit)
+
+    items = [make_item(1), make_item(2, caption="t.me/example"), make_item(3)]
+    instance = public.PublicMessage(items[0], album=items)
+
+    assert instance.requires_processing
+    assert instance.message_id == 2
+    scan.assert_called_once_with(items[1])
+
+    async def main() -> bool:
+        instance.schedule()
+        return await instance._delete_message()
+
+    assert asyncio.run(main())
+    assert [c.args for c in submit.call_args_list] == [(-100, 1), (-100, 2), (-100, 3)]
+
+
+def test_public_album_targets(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    The usernames of every caption of a safe album should be left to the deep scan.
+    """
+    scan = mock.Mock(
+        side_effect=lambda m: ScanResult(
+            False, False, m.caption, [], targets=(m.caption,)
+        )
+    )
+    monkeypatch.setattr(public.fingerprint, "scan", scan)
+
+    items = [make_item(1, caption="first"), make_item(2), make_item(3, caption="second")]
+    instance = public.PublicMessage(items[0], album=items)
+
+    assert not instance.requires_processing
+    assert instance.deep_scan_targets == ("first", "second")
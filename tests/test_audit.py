@@ -0,0 +1,38 @@
+import json
+
+from safebot import audit
+from safebot.logger import VERDICT_KEY, logger
+
+
+def test_sampling() -> None:
+    verdicts = audit.VerdictLog(sample_safe=0, sample_unsafe=1)
+    assert not verdicts.sampled(True)
+
+    verdicts.enabled = True
+    assert verdicts.sampled(True)
+    assert not verdicts.sampled(False)
+
+
+def test_record() -> None:
+    """
+    Only the verdict records should reach the sink, as JSON lines.
+    """
+    lines: list[str] = []
+    sink = logger.add(
+        lines.append,
+        format="{message}",
+        filter=lambda record: VERDICT_KEY in record["extra"],
+    )
+    verdicts = audit.VerdictLog(sample_safe=0, sample_unsafe=1)
+    verdicts.enabled = True
+
+    try:
+        logger.info("not a verdict")
+        verdicts.record(True, chat_id=-100, message_id=1, rule="bot")
+        verdicts.record(False, chat_id=-100, message_id=2, rule=None)
+    finally:
+        logger.remove(sink)
+
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["unsafe"] and record["rule"] == "bot" and record["message_id"] == 1
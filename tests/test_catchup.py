@@ -0,0 +1,96 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from safebot.detect.scan import ScanResult
+from safebot.handlers import accounts, catchup
+
+
+def make_message(message_id: int, is_bot: bool = True) -> mock.Mock:
+    message = mock.Mock(id=message_id)
+    message.chat.id = -100
+    message.from_user.is_bot = is_bot
+    return message
+
+
+@pytest.fixture
+def supervisor(monkeypatch: pytest.MonkeyPatch) -> accounts.Supervisor:
+    supervisor = accounts.Supervisor([mock.Mock(), mock.Mock()], rebalance_after=60)
+    supervisor._set_owner(-100, 1)
+    monkeypatch.setattr(catchup, "supervisor", supervisor)
+    return supervisor
+
+
+def test_progress_owner(supervisor: accounts.Supervisor) -> None:
+    """
+    Only the messages received by the owner should be counted, keeping the maximum.
+    """
+    first, second = (a.client for a in supervisor.accounts)
+    progress = catchup.Progress(interval=0)
+
+    progress.seen(first, -100, 50)
+    progress.seen(second, -100, 10)
+    progress.seen(second, -100, 5)
+
+    assert progress._pending == {-100: 10}
+
+
+def test_catch_up(
+    monkeypatch: pytest.MonkeyPatch, supervisor: accounts.Supervisor
+) -> None:
+    """
+    The history should be scanned down to the last processed message,
+    deleting unsafe bot messages, and the newest message should be remembered.
+    """
+    history = [make_message(i, is_bot=i != 8) for i in range(10, 0, -1)]
+
+    async def get_chat_history(chat_id: int, limit: int, offset_id: int):
+        for message in history:
+            if not offset_id or message.id < offset_id:
+                yield message
+
+    supervisor.accounts[1].client.get_chat_history = get_chat_history
+    monkeypatch.setattr(
+        catchup.Reader,
+        "scan_batch",
+        lambda messages, **_: [ScanResult(True, False, "", []) for _ in messages],
+    )
+    monkeypatch.setattr(
+        catchup.database,
+        "get_settings",
+        mock.AsyncMock(return_value=mock.Mock(language=None)),
+    )
+    submit = mock.Mock()
+    monkeypatch.setattr(catchup.deletion.batcher, "submit", submit)
+    monkeypatch.setattr(catchup, "PAGE_SIZE", 2)
+    progress = catchup.Progress(interval=0)
+    monkeypatch.setattr(catchup, "progress", progress)
+
+    catch_up = catchup.CatchUp(concurrency=1, limit=100, page_delay=0)
+    asyncio.run(catch_up.scan_chat(-100, 6))
+
+    assert catch_up.scanned == 4
+    assert [c.args for c in submit.call_args_list] == [(-100, 10), (-100, 9), (-100, 7)]
+    assert progress._pending == {-100: 10}
+
+
+def test_album(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Items of an album should be deleted along with the unsafe one.
+    """
+    messages = [make_message(i) for i in range(1, 5)]
+    for message, group in zip(messages, ["1", "1", "2", None]):
+        message.media_group_id = group
+
+    monkeypatch.setattr(
+        catchup.Reader,
+        "scan_batch",
+        lambda messages, **_: [ScanResult(m.id == 2, False, "", []) for m in messages],
+    )
+    submit = mock.Mock()
+    monkeypatch.setattr(catchup.deletion.batcher, "submit", submit)
+
+    catchup.CatchUp(concurrency=1, limit=100, page_delay=0)._scan(messages, None)
+
+    assert [c.args for c in submit.call_args_list] == [(-100, 1), (-100, 2)]
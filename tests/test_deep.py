@@ -0,0 +1,116 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from pyrogram.enums import ChatType
+from pyrogram.errors import FloodWait, UsernameNotOccupied
+from pyrogram.types import Chat
+
+from safebot.detect import link, rules
+from safebot.handlers import deep
+
+_RULES = {"t.me": {"deep": {"deny": ["spam"], "allow": ["news"], "kinds": ["bot"]}}}
+
+
+@pytest.fixture(autouse=True)
+def table(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(link.Scanner, "table", rules.compile_rules(_RULES))
+
+
+def make_engine() -> deep.DeepScanner:
+    return deep.DeepScanner(
+        concurrency=2, rate=1000, burst=1000, max_pending=10, cache_size=16, cache_ttl=60
+    )
+
+
+def run_check(side_effect, *batches: tuple[str, ...]) -> tuple[list, mock.AsyncMock]:
+    """
+    Checks the batches of usernames concurrently.
+    """
+    engine = make_engine()
+
+    async def main() -> list:
+        return await asyncio.gather(*(engine.check(-100, b) for b in batches))
+
+    get_chat = mock.AsyncMock(side_effect=side_effect)
+    client = mock.Mock(get_chat=get_chat)
+
+    with mock.patch.object(deep.supervisor, "client_for", return_value=client):
+        return asyncio.run(main()), get_chat
+
+
+def test_kind() -> None:
+    results, _ = run_check(
+        lambda username: Chat(id=1, type=ChatType[username.upper()]),
+        ("bot",),
+        ("channel",),
+    )
+
+    assert results == [rules.RULE_KIND, None]
+
+
+def test_path_rules() -> None:
+    """
+    Usernames matched by their path (or allowed) shouldn't be resolved.
+    """
+    results, get_chat = run_check(None, ("spam",), ("news",))
+
+    assert results == [rules.RULE_DENY, None]
+    get_chat.assert_not_awaited()
+
+
+def test_resolved_once() -> None:
+    """
+    Concurrent and later checks of the same username should share the result.
+    """
+    results, get_chat = run_check(
+        [Chat(id=1, type=ChatType.BOT)], ("some",), ("some", "some")
+    )
+
+    assert results == [rules.RULE_KIND] * 2
+    get_chat.assert_awaited_once_with("some")
+
+
+def test_missing() -> None:
+    results, _ = run_check(UsernameNotOccupied(), ("nobody",))
+
+    assert results == [None]
+
+
+def test_flood_wait() -> None:
+    """
+    Resolution should be retried after FloodWait.
+    """
+    results, get_chat = run_check(
+        [FloodWait(value=0), Chat(id=1, type=ChatType.BOT)], ("some",)
+    )
+
+    assert results == [rules.RULE_KIND]
+    assert get_chat.await_count == 2
+
+
+def test_account_of_chat() -> None:
+    """
+    Usernames should be resolved by the account acting in the chat.
+    """
+    engine = make_engine()
+    clients = {
+        -100: mock.Mock(
+            get_chat=mock.AsyncMock(return_value=Chat(id=1, type=ChatType.BOT))
+        ),
+        -200: mock.Mock(
+            get_chat=mock.AsyncMock(return_value=Chat(id=2, type=ChatType.BOT))
+        ),
+    }
+
+    async def main() -> list:
+        return [
+            await engine.check(-100, ("first",)),
+            await engine.check(-200, ("second",)),
+        ]
+
+    with mock.patch.object(deep.supervisor, "client_for", side_effect=clients.get):
+        assert asyncio.run(main()) == [rules.RULE_KIND] * 2
+
+    clients[-100].get_chat.assert_awaited_once_with("first")
+    clients[-200].get_chat.assert_awaited_once_with("second")
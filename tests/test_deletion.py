@@ -0,0 +1,64 @@
+import asyncio
+from unittest import mock
+
+from pyrogram.errors import FloodWait
+
+from safebot.client import client
+from safebot.handlers import deletion, outbound
+
+
+def run_deletions(
+    side_effect, ids: list[int], **kwargs
+) -> tuple[list[bool], mock.AsyncMock]:
+    """
+    Deletes messages with the given IDs concurrently in the same chat.
+    """
+    batcher = deletion.DeletionBatcher(**{"window": 0.01, "max_size": 10, **kwargs})
+
+    async def main() -> list[bool]:
+        return await asyncio.gather(*(batcher.delete(1, i) for i in ids))
+
+    scheduler = outbound.Scheduler(
+        global_rate=1000, global_burst=1000, chat_rate=1000, chat_burst=1000, max_queue=10
+    )
+
+    with mock.patch.object(
+        client, "delete_messages", new=mock.AsyncMock(side_effect=side_effect)
+    ) as delete, mock.patch.object(outbound, "scheduler", scheduler):
+        return asyncio.run(main()), delete
+
+
+def test_coalesced() -> None:
+    """
+    Messages should be deleted with a single request.
+    """
+    results, delete = run_deletions([3], [1, 2, 3])
+
+    assert results == [True] * 3
+    delete.assert_awaited_once_with(1, [1, 2, 3])
+
+
+def test_max_size() -> None:
+    """
+    Batch should be split when it exceeds the maximum size.
+    """
+    results, delete = run_deletions([2, 1], [1, 2, 3], max_size=2)
+
+    assert results == [True] * 3
+    assert [c.args[1] for c in delete.await_args_list] == [[1, 2], [3]]
+
+
+def test_not_deleted() -> None:
+    results, _ = run_deletions([0], [1, 2])
+
+    assert results == [False] * 2
+
+
+def test_flood_wait() -> None:
+    """
+    Batch should be sent again after the flood wait (by the scheduler).
+    """
+    results, delete = run_deletions([FloodWait(value=0), 2], [1, 2])
+
+    assert results == [True] * 2
+    assert delete.await_count == 2
@@ -1,11 +1,14 @@
 import pytest
 from pyrogram.enums import MessageEntityType
+from pyrogram.types import Message, MessageEntity
 
+from safebot import localization
 from safebot.detect import filters
 from tests.dataset import MessageData, TG_URL
 
 _URL_WITHOUT_PROTOCOL = TG_URL.split("://")[1]
 _PLACEHOLDER = "test"
+_CUT = "<cut>"
 
 # MessageData list with "url" entity type
 _MESSAGES_WITH_URL = [
@@ -18,28 +21,26 @@ _MESSAGES_WITH_TEXT_LINK = [
     MessageData.auto(text=_PLACEHOLDER, expected=[TG_URL]),
     MessageData.auto(text=f"{_PLACEHOLDER} {_PLACEHOLDER}", expected=[TG_URL] * 2),
 ]
-# Message entities both with "url" and "text link" type
-_MESSAGES_COMBINED = [
-    _MESSAGES_WITH_URL[0].generate_entities(MessageEntityType.URL)[0],
-    _MESSAGES_WITH_TEXT_LINK[0].generate_entities(MessageEntityType.TEXT_LINK)[0],
-]
 
 
-def assert_urls(collection: list[MessageData], t: MessageEntityType) -> None:
-    """
-    Calls assert on each result of the ``retrieve_urls`` function and compares
-    it with the expected result.
-    """
-    for ent in collection:
-        result = filters.retrieve_urls(ent.text, ent.generate_entities(t))
-        assert list(result) == ent.expected
+@pytest.fixture(autouse=True)
+def locale(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        localization,
+        "locales",
+        localization.Locales({"en_US": {"cut_unsafe": _CUT}}, "en_US"),
+    )
+
+
+def make_filter(text: str, entities: list[MessageEntity] | None) -> filters.Filter:
+    return filters.Filter(Message(id=1, text=text, entities=entities))
 
 
-def test_retrieve_urls_empty() -> None:
+def test_first_url_empty() -> None:
     """
-    Should return empty generator if there are no entities.
+    Should return None if there are no entities.
     """
-    assert len(list(filters.retrieve_urls("", None))) == 0
+    assert make_filter("", None).first_url is None
 
 
 @pytest.mark.parametrize(
@@ -49,15 +50,59 @@ def test_retrieve_urls_empty() -> None:
         (_MESSAGES_WITH_TEXT_LINK, MessageEntityType.TEXT_LINK),
     ],
 )
-def test_retrieve_urls(collection: list[MessageData], t: MessageEntityType) -> None:
+def test_first_url(collection: list[MessageData], t: MessageEntityType) -> None:
+    """
+    Should be correctly parsed and standardized.
+    """
+    for data in collection:
+        assert make_filter(data.text, data.generate_entities(t)).first_url == TG_URL
+
+
+def test_slice_utf16() -> None:
     """
-    Should be correctly parsed.
+    Offsets after emoji (two UTF-16 code units) should point to the same text.
     """
-    assert_urls(collection, t)
+    text = f"😀😀 {TG_URL}"
+    assert make_filter(text, None).slice(5, len(TG_URL)) == TG_URL
 
 
-def test_retrieve_urls_combine() -> None:
+def test_apply() -> None:
     """
-    Both types of links should be parsed.
+    All unsafe entities should be replaced at once,
+    and the rest of entities should be shifted.
     """
-    assert list(filters.retrieve_urls(TG_URL, _MESSAGES_COMBINED)) == ([TG_URL] * 2)
+    data = MessageData.auto(text=f"{TG_URL} text {TG_URL} bold", expected=None)
+    entities = data.generate_entities(MessageEntityType.URL)
+    entities[1].type = entities[3].type = MessageEntityType.BOLD
+    flt = make_filter(data.text, entities)
+
+    for ent in list(flt.unsafe_entities):
+        flt.make_entity_safe(ent)
+    flt.apply()
+
+    assert flt.text == f"{_CUT} text {_CUT} bold"
+    assert [flt.slice(e.offset, e.length) for e in entities] == [
+        _CUT,
+        "text",
+        _CUT,
+        "bold",
+    ]
+    assert entities[0].type == MessageEntityType.ITALIC
+
+
+def test_apply_utf16() -> None:
+    """
+    Replacement after emoji should keep offsets in UTF-16 code units.
+    """
+    text = f"😀 {TG_URL} 😀 end"
+    entities = [
+        MessageEntity(type=MessageEntityType.URL, offset=3, length=len(TG_URL)),
+        MessageEntity(type=MessageEntityType.BOLD, offset=len(TG_URL) + 7, length=3),
+    ]
+    flt = make_filter(text, entities)
+
+    flt.make_entity_safe(entities[0])
+    flt.apply()
+
+    assert flt.text == f"😀 {_CUT} 😀 end"
+    assert flt.slice(entities[1].offset, entities[1].length) == "end"
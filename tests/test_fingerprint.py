@@ -0,0 +1,162 @@
+import json
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from pyrogram.enums import ChatType, MessageEntityType
+from pyrogram.types import Chat, Message, MessageEntity, User
+
+from safebot import localization
+from safebot.detect import fingerprint, link, lists, rules
+from safebot.lru import LRUCache
+from tests.dataset import TG_URL
+
+_TEXT = f"{TG_URL}/adsbot"
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        localization,
+        "locales",
+        localization.Locales({"en_US": {"cut_unsafe": "<cut>"}}, "en_US"),
+    )
+    monkeypatch.setattr(
+        link.Scanner,
+        "table",
+        rules.compile_rules({"t.me": {"quick": {"suffix": ["bot"]}}}),
+    )
+    monkeypatch.setattr(fingerprint, "results", LRUCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(fingerprint, "snapshots", LRUCache(maxsize=16, ttl=60))
+
+
+def make_message(text: str, username: str = "sender_bot") -> Message:
+    return Message(
+        id=1,
+        from_user=User(id=1, is_bot=True, username=username),
+        text=text,
+        entities=[MessageEntity(type=MessageEntityType.URL, offset=0, length=len(text))],
+    )
+
+
+def test_same_message_scanned_once() -> None:
+    first = fingerprint.scan(make_message(_TEXT))
+    second = fingerprint.scan(make_message(_TEXT))
+
+    assert first is second
+    assert first.unsafe and first.text == "<cut>"
+
+
+def test_sender_changes_fingerprint() -> None:
+    """
+    The result depends on the sender, so it shouldn't be shared.
+    """
+    assert fingerprint.fingerprint(make_message(_TEXT)) != fingerprint.fingerprint(
+        make_message(_TEXT, username="other_bot")
+    )
+
+
+def test_cached_entities_are_copies() -> None:
+    message = make_message(_TEXT)
+    result = fingerprint.scan(message)
+
+    assert result.entities[0] is not message.entities[0]
+
+
+def test_deep_scan_targets() -> None:
+    """
+    Safe messages should keep the referenced usernames (except the sender).
+    """
+    text = "@news t.me/sender_bot t.me/news t.me/deals"
+    message = make_message(text)
+    message.entities = [
+        MessageEntity(type=MessageEntityType.MENTION, offset=0, length=5),
+        MessageEntity(type=MessageEntityType.URL, offset=6, length=15),
+        MessageEntity(type=MessageEntityType.URL, offset=22, length=9),
+        MessageEntity(type=MessageEntityType.URL, offset=32, length=10),
+    ]
+    result = fingerprint.scan(message)
+
+    assert not result.unsafe
+    assert result.targets == ("news", "deals")
+
+
+def make_edited(**links: str) -> Message:
+    """
+    Message of a group with the words linked to the URLs (hidden links).
+    """
+    message = make_message(" ".join(links))
+    message.chat = Chat(id=-100, type=ChatType.SUPERGROUP)
+    message.entities = []
+    offset = 0
+
+    for word, url in links.items():
+        if url:
+            message.entities.append(
+                MessageEntity(
+                    type=MessageEntityType.TEXT_LINK,
+                    offset=offset,
+                    length=len(word),
+                    url=url,
+                )
+            )
+        offset += len(word) + 1
+
+    return message
+
+
+def test_edit_scans_added_items() -> None:
+    """
+    Only the links added by an edit should be scanned,
+    and the unsafe message should be scanned in full.
+    """
+    channel = f"{TG_URL}/channel"
+    assert not fingerprint.scan(make_edited(channel=channel, more="")).unsafe
+
+    with mock.patch.object(link, "scan", wraps=link.scan) as scan:
+        result = fingerprint.rescan(make_edited(channel=channel, more=f"{TG_URL}/news"))
+
+    assert [c.args[0] for c in scan.call_args_list] == [f"{TG_URL}/news"]
+    assert not result.unsafe
+    assert result.targets == ("news",)
+
+    result = fingerprint.rescan(make_edited(channel=channel, more=f"{TG_URL}/adsbot"))
+
+    assert result.unsafe
+    assert result.text == "channel <cut>"
+
+
+def test_edit_of_unknown_message() -> None:
+    """
+    A message which hasn't been scanned recently should be scanned in full.
+    """
+    result = fingerprint.rescan(make_edited(ads=f"{TG_URL}/adsbot"))
+
+    assert result.unsafe
+    assert result.text == "<cut>"
+
+
+def test_reload_clears_results(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    A message found safe should be scanned again once the rules change,
+    however often it's posted.
+    """
+    rules_path = tmp_path / "links.json"
+    rules_path.write_text(json.dumps({"t.me": {"quick": {"suffix": ["bot"]}}}))
+    blocklist_path = str(tmp_path / "block.idx")
+    monkeypatch.setattr(link.config, "link_rules_path", str(rules_path))
+    monkeypatch.setattr(link.config, "blocklist_path", blocklist_path)
+    monkeypatch.setattr(link.config, "allowlist_path", str(tmp_path / "allow.idx"))
+    monkeypatch.setattr(lists, "blocklist", frozenset())
+    monkeypatch.setattr(lists, "allowlist", frozenset())
+    monkeypatch.setattr(link, "verdicts", LRUCache(maxsize=16, ttl=60))
+
+    assert link.reload()
+    message = make_message(f"{TG_URL}/example_channel")
+    assert not fingerprint.scan(message).unsafe
+
+    lists.MembershipIndex.build(["example_channel"], blocklist_path)
+    assert link.reload()
+
+    assert fingerprint.scan(make_message(f"{TG_URL}/example_channel")).unsafe
+    assert len(fingerprint.snapshots) == 0
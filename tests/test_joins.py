@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime
+from unittest import mock
+
+import pytest
+from pyrogram.enums import ChatType
+from pyrogram.errors import FloodWait, InviteHashExpired
+from pyrogram.types import Chat, ChatPreview
+
+from safebot.database.models import JoinRequest
+from safebot.handlers import joins
+
+_REQUEST = JoinRequest(invite_hash="hash", url="https://t.me/+hash", user_id=1, account=0)
+
+
+@pytest.fixture(autouse=True)
+def database(monkeypatch: pytest.MonkeyPatch) -> mock.Mock:
+    database = mock.Mock(
+        take_join_requests=mock.AsyncMock(return_value=[_REQUEST]),
+        set_join_cooldown=mock.AsyncMock(),
+        add_join_request=mock.AsyncMock(),
+    )
+    monkeypatch.setattr(joins, "database", database)
+    monkeypatch.setattr(joins.supervisor, "claim", mock.AsyncMock())
+    return database
+
+
+@pytest.fixture
+def send_private(monkeypatch: pytest.MonkeyPatch) -> mock.AsyncMock:
+    send = mock.AsyncMock()
+    monkeypatch.setattr(joins.emitter, "send_private", send)
+    return send
+
+
+def process(get_chat=None, join_chat=None) -> tuple[joins.JoinQueue, mock.Mock]:
+    queue = joins.JoinQueue(interval=0, cache_size=16, cache_ttl=None)
+    account = joins.Account(
+        0,
+        mock.Mock(
+            get_chat=mock.AsyncMock(side_effect=get_chat),
+            join_chat=mock.AsyncMock(side_effect=join_chat),
+        ),
+    )
+
+    asyncio.run(queue._process(_REQUEST, account))
+    return queue, account.client
+
+
+def test_joined(send_private: mock.AsyncMock) -> None:
+    queue, client = process(
+        [ChatPreview(title="chat", type="group", members_count=1)],
+        [Chat(id=-100, type=ChatType.SUPERGROUP)],
+    )
+
+    client.join_chat.assert_awaited_once_with(_REQUEST.url)
+    joins.supervisor.claim.assert_awaited_once()  # type: ignore
+    # Joining isn't reported
+    send_private.assert_not_awaited()
+    assert queue.invites.get("hash") == joins.Invite(valid=True)
+
+
+def test_already_in_chat(send_private: mock.AsyncMock) -> None:
+    _, client = process([Chat(id=-100, type=ChatType.SUPERGROUP)])
+
+    client.join_chat.assert_not_awaited()
+    send_private.assert_awaited_once_with(1, 0, "already_in_chat")
+
+
+def test_expired(send_private: mock.AsyncMock) -> None:
+    queue, _ = process(InviteHashExpired())
+
+    send_private.assert_awaited_once_with(1, 0, "invite_link_expired")
+    assert queue.invites.get("hash") == joins.Invite(valid=False)
+
+
+def test_flood_wait(database: mock.Mock, send_private: mock.AsyncMock) -> None:
+    """
+    The request should stay in the queue, and the cooldown should be stored.
+    """
+    queue, _ = process(FloodWait(value=60))
+
+    database.take_join_requests.assert_not_awaited()
+    database.set_join_cooldown.assert_awaited_once()
+    send_private.assert_not_awaited()
+    assert queue.cooldowns[0] > datetime.now()
+
+
+def test_cached_outcome(database: mock.Mock) -> None:
+    """
+    Known invitations should be answered without queueing.
+    """
+    queue = joins.JoinQueue(interval=0, cache_size=16, cache_ttl=None)
+    queue.invites.put("hash", joins.Invite(valid=True))
+    account = joins.supervisor.primary
+
+    key = asyncio.run(queue.submit("hash", _REQUEST.url, 1, account))
+
+    assert key == "already_in_chat"
+    database.add_join_request.assert_not_awaited()
@@ -0,0 +1,83 @@
+import pytest
+
+from safebot.detect import link, rules
+from safebot.lru import LRUCache
+
+_RULES = {"t.me": {"quick": {"suffix": ["bot"]}}}
+
+
+@pytest.fixture(autouse=True)
+def table(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(link.Scanner, "table", rules.compile_rules(_RULES))
+    monkeypatch.setattr(link, "verdicts", LRUCache(maxsize=16))
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["https://t.me/AdsBot", "t.me/adsbot", "HTTPS://T.ME/adsbot/", " t.me/adsbot "],
+)
+def test_normalize_url(url: str) -> None:
+    """
+    Equivalent links should be normalized to the same URL.
+    """
+    assert link.normalize_url(url) == "https://t.me/adsbot"
+
+
+def test_scan_cached() -> None:
+    """
+    Equivalent links should be scanned only once.
+    """
+    first = link.scan("https://t.me/adsbot")
+    second = link.scan("t.me/AdsBot/")
+
+    assert first is second
+    assert first.unsafe and first.rule == rules.RULE_SUFFIX
+    assert (link.verdicts.hits, link.verdicts.misses) == (1, 1)
+
+
+def test_scan_modes_cached_separately() -> None:
+    link.scan("https://t.me/adsbot")
+
+    assert not link.scan("https://t.me/adsbot", deep_scan=True).unsafe
+
+
+def test_scan_unknown_domain() -> None:
+    verdict = link.scan("https://example.com/page")
+
+    assert verdict.unsafe and verdict.rule == rules.RULE_UNKNOWN_DOMAIN
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("t.me/Channel_Name", "channel_name"),
+        ("https://t.me/channel_name/", "channel_name"),
+        ("https://t.me/joinchat/abcdefabcdefabcd", None),
+        ("https://t.me/+abcdefabcdefabcd", None),
+        ("https://example.com/channel_name", None),
+    ],
+)
+def test_get_username(url: str, expected: str | None) -> None:
+    assert link.get_username(url) == expected
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("https://t.me/+AbCdEfGhIjKlMnOp", "AbCdEfGhIjKlMnOp"),
+        ("https://t.me/joinchat/AbCdEfGhIjKlMnOp", "AbCdEfGhIjKlMnOp"),
+        ("https://t.me/+short", None),
+        ("https://t.me/channel_name", None),
+    ],
+)
+def test_invite_hash(
+    monkeypatch: pytest.MonkeyPatch, url: str, expected: str | None
+) -> None:
+    invite = {"prefixes": ["+", "joinchat/"], "hash_length": 16}
+    monkeypatch.setattr(
+        link.Scanner,
+        "table",
+        rules.compile_rules({"t.me": {"quick": {"invite": invite}}}),
+    )
+
+    assert link.Link(url).invite_hash == expected
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+from safebot.detect import lists
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> lists.MembershipIndex:
+    path = str(tmp_path / "list.idx")
+    entries = ["@Ads_Bot", "spam.example", "", *(f"user{i}" for i in range(1000))]
+    assert lists.MembershipIndex.build(entries, path) == 1002
+
+    return lists.MembershipIndex(path)
+
+
+def test_lookup(index: lists.MembershipIndex) -> None:
+    assert "ads_bot" in index
+    assert "spam.example" in index
+    assert "user999" in index
+    assert "other_bot" not in index
+    assert len(index) == 1002
+
+
+def test_empty(tmp_path: Path) -> None:
+    path = str(tmp_path / "list.idx")
+    lists.MembershipIndex.build([], path)
+
+    assert "ads_bot" not in lists.MembershipIndex(path)
+
+
+def test_broken(tmp_path: Path) -> None:
+    path = tmp_path / "list.idx"
+    path.write_bytes(b"not an index at all, but long enough")
+
+    with pytest.raises(ValueError):
+        lists.MembershipIndex(str(path))
+
+
+def test_reload(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    The allowlist should take precedence, and missing files mean empty lists.
+    """
+    monkeypatch.setattr(lists, "blocklist", frozenset())
+    monkeypatch.setattr(lists, "allowlist", frozenset())
+    block, allow = str(tmp_path / "block.idx"), str(tmp_path / "allow.idx")
+    lists.MembershipIndex.build(["ads_bot", "useful_bot"], block)
+    lists.MembershipIndex.build(["useful_bot"], allow)
+
+    lists.reload(block, allow)
+    assert lists.check("ads_bot") is True
+    assert lists.check("useful_bot") is False
+    assert lists.check("other_bot") is None
+
+    lists.reload(block, str(tmp_path / "missing.idx"))
+    assert lists.check("useful_bot") is True
@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from safebot import localization
+
+_PHRASES = {
+    "cut_unsafe": "<ad>",
+    "greeting": "hello, {name}",
+    "deleted": "nothing deleted | {count} message deleted | {count} messages deleted",
+}
+
+
+def test_lookup() -> None:
+    locales = localization.Locales(
+        {"en_US": _PHRASES, "ru_RU": {**_PHRASES, "cut_unsafe": "<реклама>"}}, "en_US"
+    )
+
+    # Phrases without arguments are ready texts
+    assert locales.texts["en_US"]["cut_unsafe"] == "<ad>"
+    assert "greeting" in locales.templates["en_US"]
+
+    assert locales.text("cut_unsafe") == "<ad>"
+    assert locales.text("cut_unsafe", "ru_RU") == "<реклама>"
+    # Unknown language falls back to the default one
+    assert locales.text("cut_unsafe", "de_DE") == "<ad>"
+    assert locales.format("cut_unsafe", "ru_RU") == "<реклама>"
+    assert locales.format("greeting", name="bob") == "hello, bob"
+
+    with pytest.raises(KeyError):
+        locales.text("greeting")
+
+
+def test_plurals() -> None:
+    locales = localization.Locales({"en_US": _PHRASES}, "en_US")
+
+    assert locales.format("deleted", count=0) == "nothing deleted"
+    assert locales.format("deleted", count=1) == "1 message deleted"
+    assert locales.format("deleted", count=5) == "5 messages deleted"
+
+
+def test_repo_locales() -> None:
+    """
+    Locales shipped with the repo should compile,
+    and "messages_deleted" should accept any count.
+    """
+    locales = localization.compile_locales("locales", "en_US")
+
+    assert {"en_US", "ru_RU"} <= set(locales.languages)
+    assert "5" in locales.format("messages_deleted", "ru_RU", count=5)
+
+
+def test_reload(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Should replace the phrases, keeping the current ones if the files are broken.
+    """
+    monkeypatch.setattr(localization.config, "locales_path", str(tmp_path))
+    monkeypatch.setattr(localization, "locales", localization.locales)
+    file = tmp_path / "en_US.json"
+
+    file.write_text(json.dumps({"cut_unsafe": "<ad>"}))
+    assert localization.reload()
+    assert localization.locales.text("cut_unsafe") == "<ad>"
+
+    file.write_text("{")
+    assert not localization.reload()
+    assert localization.locales.text("cut_unsafe") == "<ad>"
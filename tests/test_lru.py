@@ -0,0 +1,92 @@
+from unittest import mock
+
+from safebot.lru import LRUCache
+
+_VALUE = object()
+
+
+def test_get_missing() -> None:
+    """
+    Should return None and count a miss.
+    """
+    cache = LRUCache(maxsize=2, ttl=60)
+
+    assert cache.get(1) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_get_stored() -> None:
+    """
+    Should return stored value and count a hit.
+    """
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.put(1, _VALUE)
+
+    assert cache.get(1) is _VALUE
+    assert cache.hit_rate == 1.0
+
+
+def test_lru_eviction() -> None:
+    """
+    The least recently used chat should be evicted first.
+    """
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.put(1, _VALUE)
+    cache.put(2, _VALUE)
+    cache.get(1)
+    cache.put(3, _VALUE)
+
+    assert cache.get(2) is None
+    assert cache.get(1) is _VALUE
+    assert cache.get(3) is _VALUE
+    assert cache.evictions == 1
+
+
+def test_ttl_expiration() -> None:
+    """
+    Expired values should not be returned.
+    """
+    cache = LRUCache(maxsize=2, ttl=60)
+
+    with mock.patch("safebot.lru.monotonic", return_value=0):
+        cache.put(1, _VALUE)
+    with mock.patch("safebot.lru.monotonic", return_value=61):
+        assert cache.get(1) is None
+
+    assert len(cache) == 0
+
+
+def test_sliding_ttl() -> None:
+    """
+    Access should prolong the lifetime of the sliding cache entry.
+    """
+    cache = LRUCache(maxsize=2, ttl=60, sliding=True)
+
+    with mock.patch("safebot.lru.monotonic", return_value=0):
+        cache.put(1, _VALUE)
+    with mock.patch("safebot.lru.monotonic", return_value=50):
+        assert cache.get(1) is _VALUE
+    with mock.patch("safebot.lru.monotonic", return_value=100):
+        assert cache.get(1) is _VALUE
+    with mock.patch("safebot.lru.monotonic", return_value=161):
+        assert cache.get(1) is None
+
+
+def test_without_ttl() -> None:
+    """
+    Values should never expire if TTL isn't set.
+    """
+    cache = LRUCache(maxsize=2)
+    cache.put(1, _VALUE)
+
+    with mock.patch("safebot.lru.monotonic", return_value=10**9):
+        assert cache.get(1) is _VALUE
+
+
+def test_invalidate() -> None:
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.put(1, _VALUE)
+    cache.invalidate(1)
+    cache.invalidate(2)
+
+    assert cache.get(1) is None
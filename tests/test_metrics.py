@@ -0,0 +1,26 @@
+from safebot import metrics
+
+
+def test_counter_render() -> None:
+    counter = metrics.Counter("test_total", "Test counter", ("kind",))
+    counter.inc("a")
+    counter.inc("a", value=2)
+
+    assert 'test_total{kind="a"} 3' in counter.render()
+
+
+def test_histogram_render() -> None:
+    """
+    Bucket counts should be cumulative.
+    """
+    histogram = metrics.Histogram("test_seconds", "Test histogram", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = histogram.render().splitlines()
+
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_seconds_count 3" in lines
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from safebot.database.models import ModerationEvent
+from safebot.database.partitions import DailyPartitions
+from safebot.handlers import moderation
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch) -> mock.AsyncMock:
+    store = mock.AsyncMock()
+    monkeypatch.setattr(moderation.database, "add_moderation_events", store)
+    return store
+
+
+def make_writer(**kwargs) -> moderation.EventWriter:
+    options = {"interval": 60, "batch_size": 2, "max_pending": 3, "retention": 30}
+    return moderation.EventWriter(**{**options, **kwargs})
+
+
+def add(writer: moderation.EventWriter, count: int) -> None:
+    for i in range(count):
+        writer.add(-100, i, 1, "quick", "bot", True)
+
+
+def test_close_flushes_in_batches(store: mock.AsyncMock) -> None:
+    writer = make_writer()
+    add(writer, 3)
+
+    asyncio.run(writer.close())
+
+    assert [len(c.args[0]) for c in store.await_args_list] == [2, 1]
+    assert not writer._pending
+
+
+def test_failed_flush_is_retried(store: mock.AsyncMock) -> None:
+    """
+    Events should be kept on failure, and the ones beyond the limit dropped.
+    """
+    store.side_effect = [ConnectionError(), None]
+    writer = make_writer()
+    add(writer, 4)
+
+    assert not asyncio.run(writer.flush())
+    assert [e["message_id"] for e in writer._pending] == [0, 1, 2]
+    assert writer.dropped == 1
+
+    assert asyncio.run(writer.flush())
+    assert [e["message_id"] for e in writer._pending] == [2]
+
+
+def slow_store(store: mock.AsyncMock) -> list[int]:
+    """
+    Makes the store take a while, to shut down while a batch is being written.
+
+    :return: IDs of the stored messages.
+    """
+    stored: list[int] = []
+
+    async def write(batch: list[dict]) -> None:
+        await asyncio.sleep(0.05)
+        stored.extend(e["message_id"] for e in batch)
+
+    store.side_effect = write
+    return stored
+
+
+def test_close_during_flush(store: mock.AsyncMock) -> None:
+    """
+    The batch being written on shutdown should be stored along with the rest.
+    """
+    stored = slow_store(store)
+    writer = make_writer()
+
+    async def main() -> None:
+        with mock.patch.object(writer.partitions, "maintain", mock.AsyncMock()):
+            await writer.start()
+
+        add(writer, 3)
+        await asyncio.sleep(0.01)
+        await writer.close()
+
+    asyncio.run(main())
+
+    assert sorted(stored) == [0, 1, 2]
+
+
+def test_cancelled_flush_kept(store: mock.AsyncMock) -> None:
+    stored = slow_store(store)
+    writer = make_writer()
+    add(writer, 3)
+
+    async def main() -> None:
+        task = asyncio.create_task(writer.flush())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+
+    assert not stored
+    assert [e["message_id"] for e in writer._pending] == [0, 1, 2]
+
+
+def test_partitions() -> None:
+    partitions = DailyPartitions(ModerationEvent, retention=30, ahead=1)
+    today = date(2024, 3, 31)
+
+    statements = partitions.create_sql(today)
+    assert "PARTITION BY RANGE" in statements[0]
+    assert statements[-1].endswith("FOR VALUES FROM ('2024-04-01') TO ('2024-04-02')")
+
+    names = ["moderationevent_20240229", "moderationevent_20240301", "other"]
+    assert partitions.expired(names, today) == ["moderationevent_20240229"]
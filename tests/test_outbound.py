@@ -0,0 +1,96 @@
+import asyncio
+
+from pyrogram.errors import FloodWait
+
+from safebot.handlers import outbound
+
+
+def make_scheduler(max_queue: int = 10) -> outbound.Scheduler:
+    return outbound.Scheduler(
+        global_rate=1000,
+        global_burst=1000,
+        chat_rate=1000,
+        chat_burst=1000,
+        max_queue=max_queue,
+    )
+
+
+def test_priority_order() -> None:
+    """
+    Queued requests should be sent in the order of priority.
+    """
+    scheduler = make_scheduler()
+    sent: list[str] = []
+
+    async def send(name: str) -> str:
+        sent.append(name)
+        return name
+
+    async def main() -> list[str]:
+        return await asyncio.gather(
+            scheduler.submit(1, outbound.Priority.NOTICE, lambda: send("notice")),
+            scheduler.submit(1, outbound.Priority.ECHO, lambda: send("echo")),
+            scheduler.submit(1, outbound.Priority.DELETE, lambda: send("delete")),
+        )
+
+    assert asyncio.run(main()) == ["notice", "echo", "delete"]
+    assert sent == ["delete", "echo", "notice"]
+
+
+def test_notices_merged() -> None:
+    """
+    Pending notices with the same key should be sent once with their number.
+    """
+    scheduler = make_scheduler()
+    counts: list[int] = []
+
+    async def send(count: int) -> int:
+        counts.append(count)
+        return count
+
+    async def main() -> list[int]:
+        return await asyncio.gather(
+            *(scheduler.notify(1, "deleted", send) for _ in range(3))
+        )
+
+    assert asyncio.run(main()) == [3] * 3
+    assert counts == [3]
+
+
+def test_notice_dropped_when_full() -> None:
+    scheduler = make_scheduler(max_queue=1)
+
+    async def send() -> bool:
+        return True
+
+    async def main() -> list[bool | None]:
+        return await asyncio.gather(
+            scheduler.submit(1, outbound.Priority.ECHO, send),
+            scheduler.submit(1, outbound.Priority.NOTICE, send),
+        )
+
+    assert asyncio.run(main()) == [True, None]
+    assert scheduler.dropped == 1
+
+
+def test_flood_wait_pauses_chat() -> None:
+    """
+    Only the chat that hit FloodWait should wait, the request is retried.
+    """
+    scheduler = make_scheduler()
+    calls: list[int] = []
+
+    async def send(chat_id: int) -> int:
+        calls.append(chat_id)
+        if chat_id == 1 and calls.count(1) == 1:
+            raise FloodWait(value=0)
+        return chat_id
+
+    async def main() -> list[int]:
+        return await asyncio.gather(
+            scheduler.submit(1, outbound.Priority.DELETE, lambda: send(1)),
+            scheduler.submit(2, outbound.Priority.DELETE, lambda: send(2)),
+        )
+
+    assert asyncio.run(main()) == [1, 2]
+    assert calls == [1, 2, 1]
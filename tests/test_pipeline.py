@@ -0,0 +1,132 @@
+import asyncio
+from time import monotonic
+
+from pyrogram.errors import FloodWait
+
+from safebot.handlers import outbound
+from safebot.handlers.pipeline import Pipeline
+
+
+def test_chat_order() -> None:
+    """
+    Jobs of the same chat should be executed in order,
+    while different chats don't wait for each other.
+    """
+    pipeline = Pipeline(consumers=2, max_size=10)
+    done: list[tuple[int, int]] = []
+
+    def job(chat_id: int, n: int, delay: float):
+        async def run() -> None:
+            await asyncio.sleep(delay)
+            done.append((chat_id, n))
+
+        return run
+
+    async def main() -> None:
+        pipeline.start()
+        await pipeline.put(0, job(0, 1, 0.05))
+        await pipeline.put(0, job(0, 2, 0))
+        await pipeline.put(1, job(1, 1, 0))
+        await pipeline.close()
+
+    asyncio.run(main())
+
+    assert done == [(1, 1), (0, 1), (0, 2)]
+    assert pipeline.processed == 3
+
+
+def test_backpressure() -> None:
+    """
+    Producer should wait while the queue is full.
+    """
+    pipeline = Pipeline(consumers=2, max_size=2)
+    release = asyncio.Event()
+
+    async def blocked() -> None:
+        await release.wait()
+
+    async def main() -> bool:
+        pipeline.start()
+        # Jobs of both chats fill the pipeline.
+        await pipeline.put(0, blocked)
+        await pipeline.put(1, blocked)
+
+        put = asyncio.create_task(pipeline.put(2, blocked))
+        await asyncio.sleep(0.01)
+        waited = not put.done()
+
+        release.set()
+        await put
+        await pipeline.close()
+        return waited
+
+    assert asyncio.run(main())
+    assert pipeline.depth == 0
+
+
+def test_flood_wait_isolated() -> None:
+    """
+    A chat waiting after FloodWait shouldn't delay the jobs of another chat.
+    """
+    pipeline = Pipeline(consumers=2, max_size=10)
+    scheduler = outbound.Scheduler(
+        global_rate=1000, global_burst=1000, chat_rate=1000, chat_burst=1000, max_queue=10
+    )
+    calls: list[int] = []
+    done: dict[int, float] = {}
+
+    async def send(chat_id: int) -> None:
+        calls.append(chat_id)
+        if chat_id == 1 and calls.count(1) == 1:
+            raise FloodWait(value=1)
+
+    def job(chat_id: int):
+        async def run() -> None:
+            await scheduler.submit(
+                chat_id, outbound.Priority.DELETE, lambda: send(chat_id)
+            )
+            done[chat_id] = monotonic() - start
+
+        return run
+
+    async def main() -> None:
+        pipeline.start()
+        await pipeline.put(1, job(1))
+        await pipeline.put(1, job(1))
+        await pipeline.put(2, job(2))
+        await pipeline.close()
+
+    start = monotonic()
+    asyncio.run(main())
+
+    assert done[2] < 0.5
+    assert done[1] >= 1
+    assert calls == [1, 2, 1, 1]
+
+
+def test_consumers() -> None:
+    """
+    No more than ``consumers`` jobs should run at once, whatever the chats.
+    """
+    pipeline = Pipeline(consumers=2, max_size=10)
+    running: list[int] = [0]
+    peak: list[int] = [0]
+
+    async def job() -> None:
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+
+    async def main() -> None:
+        pipeline.start()
+
+        for chat_id in range(5):
+            await pipeline.put(chat_id, job)
+
+        await pipeline.close()
+
+    asyncio.run(main())
+
+    assert peak[0] == 2
+    assert pipeline.processed == 5
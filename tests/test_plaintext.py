@@ -0,0 +1,45 @@
+import pytest
+
+from safebot.detect import plaintext
+from safebot.detect.plaintext import KIND_LINK, KIND_MENTION, Candidate
+
+_DOMAINS = ("t.me", "telegram.org")
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "join t . me/ads_bot",
+        "join t​.me/ads_bot",
+        "join ｔ．ｍｅ／ads_bot",  # fullwidth
+        "join т.mе/ads_bot",  # Cyrillic "т" and "е"
+        "join t [dot] me / ads_bot",
+        "join T。ME/Ads_Bot",
+    ],
+)
+def test_obfuscated_link(text: str) -> None:
+    assert list(plaintext.find_candidates(text, _DOMAINS)) == [
+        Candidate(KIND_LINK, "https://t.me/ads_bot")
+    ]
+
+
+@pytest.mark.parametrize("text", ["write to @ ads_bot", "`@ads_bot`", "@​ads_bot"])
+def test_mention(text: str) -> None:
+    assert list(plaintext.find_candidates(text, _DOMAINS)) == [
+        Candidate(KIND_MENTION, "ads_bot")
+    ]
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["mail me at admin@ads_bot.com", "chat.me/ads_bot", "See you. Meet me/there", "@ab"],
+)
+def test_not_found(text: str) -> None:
+    assert not list(plaintext.find_candidates(text, _DOMAINS))
+
+
+def test_trie_pattern() -> None:
+    """
+    Words sharing a beginning should share a branch.
+    """
+    assert plaintext._trie_pattern(["ab", "ac", "a"]) == "a(?:b|c)?"
@@ -0,0 +1,74 @@
+import pytest
+from pyrogram import raw
+
+from safebot.detect import plaintext
+from safebot.handlers import prescreen
+from safebot.handlers.prescreen import is_candidate
+
+_URL = [raw.types.MessageEntityUrl(offset=0, length=12)]
+
+
+def _message(peer: raw.base.Peer, sender: int | None, **kwargs) -> raw.types.Message:
+    return raw.types.Message(
+        id=1,
+        peer_id=peer,
+        from_id=raw.types.PeerUser(user_id=sender) if sender else None,
+        date=0,
+        message="t.me/example",
+        **kwargs,
+    )
+
+
+def _user(user_id: int, bot: bool) -> raw.types.User:
+    return raw.types.User(id=user_id, bot=bot)
+
+
+def test_group(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(prescreen.config, "plain_text_scan", False)
+    group = raw.types.PeerChannel(channel_id=1)
+    users = {1: _user(1, bot=False), 2: _user(2, bot=True)}
+
+    assert not is_candidate(_message(group, 1, entities=_URL), users)
+    assert is_candidate(_message(group, 2, entities=_URL), users)
+    # Nothing to scan
+    assert not is_candidate(_message(group, 2), users)
+    # Item of an album
+    assert is_candidate(_message(group, 2, grouped_id=1), users)
+    assert is_candidate(
+        _message(group, 2, reply_markup=raw.types.ReplyInlineMarkup(rows=[])), users
+    )
+    # Unknown senders are parsed to be safe
+    assert is_candidate(_message(group, 3, entities=_URL), users)
+    # Anonymous admin
+    assert not is_candidate(_message(group, None, entities=_URL), users)
+
+
+def test_plain_text(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Bot messages without entities should be scanned for obfuscated links.
+    """
+    group = raw.types.PeerChannel(channel_id=1)
+    users = {1: _user(1, bot=False), 2: _user(2, bot=True)}
+    message = _message(group, 2)
+    message.message = "join t . me/ads_bot now"
+
+    assert is_candidate(message, users)
+    assert not is_candidate(_message(group, 1), users)
+    assert [c.value for c in plaintext.find_candidates(message.message, ["t.me"])] == [
+        "https://t.me/ads_bot"
+    ]
+
+    monkeypatch.setattr(prescreen.config, "plain_text_scan", False)
+    assert not is_candidate(message, users)
+
+
+def test_private() -> None:
+    private = raw.types.PeerUser(user_id=1)
+    users = {1: _user(1, bot=False)}
+
+    assert is_candidate(_message(private, 1, entities=_URL), users)
+    assert not is_candidate(_message(private, 1), users)
+
+
+def test_service() -> None:
+    assert not is_candidate(raw.types.MessageEmpty(id=1), {})
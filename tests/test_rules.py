@@ -0,0 +1,67 @@
+import pytest
+
+from safebot.detect import rules
+
+_RULES = {
+    "t.me": {
+        "aliases": ["telegram.org"],
+        "quick": {
+            "allow": ["goodbot"],
+            "deny": ["spam"],
+            "prefix": ["promo_"],
+            "suffix": ["bot"],
+            "invite": {"prefixes": ["+", "joinchat/"], "hash_length": 4},
+        },
+    }
+}
+
+
+@pytest.fixture
+def table() -> rules.RuleTable:
+    return rules.compile_rules(_RULES)
+
+
+def test_aliases(table: rules.RuleTable) -> None:
+    """
+    Aliases should reference the same rules as the original domain.
+    """
+    assert table["telegram.org"] is table["t.me"]
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("user", None),
+        ("", None),
+        ("goodbot", None),
+        ("spam", rules.RULE_DENY),
+        ("promo_channel", rules.RULE_PREFIX),
+        ("adsbot", rules.RULE_SUFFIX),
+        ("+abcd", rules.RULE_INVITE),
+        ("joinchat/abcd", rules.RULE_INVITE),
+        ("+abcde", None),
+    ],
+)
+def test_match(table: rules.RuleTable, path: str, expected: str | None) -> None:
+    assert table["t.me"].quick.match(path) == expected
+
+
+def test_empty_deep_tier(table: rules.RuleTable) -> None:
+    """
+    Missing tier should not match anything.
+    """
+    assert table["t.me"].deep.match("adsbot") is None
+
+
+def test_malformed() -> None:
+    with pytest.raises(ValueError):
+        rules.compile_rules({"t.me": ["bot"]})
+
+
+def test_empty_affix() -> None:
+    """
+    An empty prefix or suffix matches any path.
+    """
+    table = rules.compile_rules({"t.me": {"quick": {"prefix": [""]}}})
+
+    assert table["t.me"].quick.match("user") == rules.RULE_PREFIX
@@ -0,0 +1,163 @@
+from copy import copy
+from unittest import mock
+
+import pytest
+from pyrogram.enums import MessageEntityType
+from pyrogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Message,
+    MessageEntity,
+    User,
+)
+
+from safebot import localization
+from safebot.detect import link, lists, rules
+from safebot.detect.scan import Reader
+from safebot.lru import LRUCache
+from tests.dataset import TG_URL
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        localization,
+        "locales",
+        localization.Locales({"en_US": {"cut_unsafe": "<cut>"}}, "en_US"),
+    )
+    monkeypatch.setattr(
+        link.Scanner,
+        "table",
+        rules.compile_rules({"t.me": {"quick": {"suffix": ["bot"]}}}),
+    )
+    monkeypatch.setattr(link, "verdicts", LRUCache(0))
+
+
+def make_message(
+    text: str, username: str = "sender_bot", mention: bool = False
+) -> Message:
+    entity_type = MessageEntityType.MENTION if mention else MessageEntityType.URL
+    return Message(
+        id=1,
+        from_user=User(id=1, is_bot=True, username=username),
+        text=text,
+        entities=[MessageEntity(type=entity_type, offset=0, length=len(text))],
+    )
+
+
+def test_batch_scans_unique_links() -> None:
+    """
+    Every unique link should be scanned once, regardless of its occurrences.
+    """
+    messages = [
+        make_message(f"{TG_URL}/adsbot"),
+        make_message(f"{TG_URL}/adsbot"),
+        make_message(f"{TG_URL}/channel"),
+    ]
+
+    with mock.patch.object(link, "scan", wraps=link.scan) as scan:
+        results = Reader.scan_batch(messages)
+
+    assert scan.call_count == 2
+    assert [r.unsafe for r in results] == [True, True, False]
+    assert results[0].text == "<cut>"
+    assert results[2].text == f"{TG_URL}/channel"
+
+
+def test_batch_evaluates_unique_targets() -> None:
+    """
+    Every unique link and username of the batch should be evaluated once,
+    wherever it occurs: entities, buttons or plain text.
+    """
+    url = f"{TG_URL}/adsbot"
+    text = f"{url} @promo_bot"
+    entities = [
+        MessageEntity(type=MessageEntityType.URL, offset=0, length=len(url)),
+        MessageEntity(
+            type=MessageEntityType.MENTION, offset=len(url) + 1, length=len("@promo_bot")
+        ),
+    ]
+    markup = InlineKeyboardMarkup([[InlineKeyboardButton("Open", url=url)]])
+    messages = [
+        Message(
+            id=i,
+            from_user=User(id=1, is_bot=True, username="sender_bot"),
+            text=text,
+            entities=[copy(e) for e in entities],
+            reply_markup=markup,
+        )
+        for i in range(2)
+    ]
+    messages += [make_message(f"{TG_URL}/channel")] * 2
+    messages += [
+        Message(
+            id=i,
+            from_user=User(id=1, is_bot=True, username="sender_bot"),
+            text="join t . me/adsbot",
+        )
+        for i in range(2)
+    ]
+
+    with (
+        mock.patch.object(link, "scan", wraps=link.scan) as scan,
+        mock.patch.object(lists, "check", wraps=lists.check) as check,
+    ):
+        results = Reader.scan_batch(messages)
+
+    assert [c.args for c in scan.call_args_list] == [(url,), (f"{TG_URL}/channel",)]
+    # Links are looked up in the lists by the scan itself.
+    assert check.call_args_list.count(mock.call("promo_bot")) == 1
+    assert [r.unsafe for r in results] == [True, True, False, False, True, True]
+    assert results[0].text == "<cut> <cut>"
+    assert not results[4].echoable
+
+
+def test_batch_sender_reference() -> None:
+    """
+    The shared verdict shouldn't make the link to the sender itself unsafe.
+    """
+    messages = [
+        make_message(f"{TG_URL}/adsbot"),
+        make_message(f"{TG_URL}/adsbot", username="adsbot"),
+    ]
+
+    assert [r.unsafe for r in Reader.scan_batch(messages)] == [True, False]
+
+
+def test_plain_text_link() -> None:
+    """
+    The obfuscated link without an entity should be found,
+    but the text can't be echoed, since it isn't cut out.
+    """
+    message = Message(
+        id=1,
+        from_user=User(id=1, is_bot=True, username="sender_bot"),
+        text="join t . me/ads_bot",
+    )
+    result = Reader(message).scan()
+
+    assert result.unsafe and not result.echoable
+    assert result.rule == rules.RULE_SUFFIX
+
+
+def test_plain_text_after_cut() -> None:
+    """
+    Content cut out of the text shouldn't be found again in plain text.
+    """
+    result = Reader(make_message(f"{TG_URL}/adsbot")).scan()
+
+    assert result.unsafe and result.echoable
+
+
+def test_lists(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Allowed bots should be safe, and blocked usernames unsafe, whatever they are.
+    """
+    monkeypatch.setattr(lists, "allowlist", frozenset({"useful_bot"}))
+    monkeypatch.setattr(lists, "blocklist", frozenset({"spammer"}))
+
+    assert not Reader(make_message("@useful_bot", mention=True)).scan().unsafe
+    assert not Reader(make_message(f"{TG_URL}/useful_bot")).scan().unsafe
+
+    result = Reader(make_message("@spammer", mention=True)).scan()
+    assert result.unsafe and result.rule == rules.RULE_BLOCKLIST
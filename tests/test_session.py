@@ -0,0 +1,106 @@
+import asyncio
+import time
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from pyrogram import raw
+
+from safebot.handlers import peers
+from safebot.session import LeanFileStorage
+
+
+def make_peers(ids: range) -> list[tuple[int, int, str, str | None, str | None]]:
+    return [(i, i, "user", None, None) for i in ids]
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> LeanFileStorage:
+    storage = LeanFileStorage("test", tmp_path, max_peers=5, max_age=60)
+    asyncio.run(storage.open())
+    return storage
+
+
+def test_least_recently_used_evicted(storage: LeanFileStorage) -> None:
+    """
+    Peers beyond the limit should be evicted, except the used and pinned ones.
+    """
+    asyncio.run(storage.update_peers(make_peers(range(1, 9))))
+    # Stored earlier than the rest
+    storage.conn.execute("UPDATE peers SET last_update_on = last_update_on - 10")
+    asyncio.run(storage.update_peers(make_peers(range(6, 9))))
+    asyncio.run(storage.get_peer_by_id(1))
+    storage.pinned = {2}
+
+    assert storage.prune() == 3
+    ids = {row[0] for row in storage.conn.execute("SELECT id FROM peers")}
+    assert ids == {1, 2, 6, 7, 8}
+
+
+def test_stale_evicted(storage: LeanFileStorage) -> None:
+    asyncio.run(storage.update_peers(make_peers(range(1, 4))))
+    storage.conn.execute(
+        "UPDATE peers SET last_update_on = ? WHERE id != 3", (int(time.time()) - 120,)
+    )
+    storage.pinned = {2}
+
+    assert storage.prune(evict_stale=False) == 0
+    assert storage.prune() == 1
+    assert storage.count() == 2
+
+
+def make_dialogs(
+    ids: list[int], last: bool
+) -> raw.types.messages.Dialogs | raw.types.messages.DialogsSlice:
+    dialogs = [
+        raw.types.Dialog(
+            peer=raw.types.PeerUser(user_id=i),
+            top_message=i,
+            read_inbox_max_id=0,
+            read_outbox_max_id=0,
+            unread_count=0,
+            unread_mentions_count=0,
+            unread_reactions_count=0,
+            notify_settings=raw.types.PeerNotifySettings(),
+        )
+        for i in ids
+    ]
+    messages = [
+        raw.types.Message(id=i, peer_id=raw.types.PeerUser(user_id=i), date=i, message="")
+        for i in ids
+    ]
+
+    if last:
+        return raw.types.messages.Dialogs(
+            dialogs=dialogs, messages=messages, chats=[], users=[]
+        )
+
+    return raw.types.messages.DialogsSlice(
+        count=100, dialogs=dialogs, messages=messages, chats=[], users=[]
+    )
+
+
+def test_prefetch_pages() -> None:
+    """
+    Dialogs should be paged until all the chats are found.
+    """
+    client = mock.Mock()
+    client.invoke = mock.AsyncMock(
+        side_effect=[make_dialogs([1, 2], False), make_dialogs([3, 4], False)]
+    )
+    client.resolve_peer = mock.AsyncMock(return_value=raw.types.InputPeerSelf())
+
+    assert asyncio.run(peers.prefetch(client, {1, 3})) == {1, 3}
+    assert client.invoke.await_count == 2
+    request = client.invoke.await_args_list[1].args[0]
+    assert (request.offset_id, request.offset_date) == (2, 2)
+
+
+def test_prefetch_missing_chat() -> None:
+    """
+    Paging should stop after the last dialog.
+    """
+    client = mock.Mock()
+    client.invoke = mock.AsyncMock(side_effect=[make_dialogs([1, 2], True)])
+
+    assert asyncio.run(peers.prefetch(client, {1, 3})) == {1}